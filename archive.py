@@ -0,0 +1,230 @@
+from database import Task, parse_due_date
+from search import tokenize
+from file_lock import file_lock
+from datetime import date
+import gzip
+import json
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+# A task as it was when it left the active set
+class ArchivedTask:
+    __slots__ = ("task", "reason", "archived")
+
+    def __init__(self, task, reason, archived):
+        self.task = task
+        self.reason = reason  # "completed" or "expired"
+        self.archived = archived  # date it was moved
+
+
+# Cold store for completed and expired tasks.
+#
+# Tasks are appended in batches, each batch one gzip member at the end of
+# `file_name` (concatenated members are still a valid .gz file). After the
+# member is synced, a line is added to the `.idx` file with its offset,
+# length and how many tasks of each tenant it holds. The index is all that
+# is kept in memory: /history reads and decompresses only the members
+# holding the user's tasks, newest first, and the active task store never
+# sees any of it. Appends hold a file lock and first read index lines other
+# worker processes added, so several workers can share one archive.
+class TaskArchive:
+
+    def __init__(self, file_name):
+        self.file_name = file_name
+        self.index_name = file_name + ".idx"
+        self.lock_name = file_name + ".lock"
+        self.segments = []  # index entries, oldest first
+        self.by_tenant = {}  # (guild_id, owner_id) -> positions in segments
+        self.size = 0  # end of the last indexed member
+        self.index_size = 0  # bytes of the index file read so far
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return sum(sum(segment["tenants"].values()) for segment in self.segments)
+
+    @staticmethod
+    def tenant_key(tenant):
+        return f"{tenant[0]}:{tenant[1]}"
+
+    # Loads the index. A member without an index line (the bot stopped
+    # between the two writes) and a torn last index line are cut off.
+    def open(self):
+        with self.lock, file_lock(self.lock_name):
+            self.segments = []
+            self.by_tenant = {}
+            self.size = 0
+            self.index_size = 0
+            if os.path.exists(self.index_name):
+                with open(self.index_name, "rb") as index_file:
+                    data = index_file.read()
+                complete = data[: data.rfind(b"\n") + 1]
+                for line in complete.splitlines():
+                    self.add_segment(json.loads(line))
+                self.index_size = len(complete)
+                if len(complete) < len(data):
+                    logger.warning("Dropping a torn line from %s", self.index_name)
+                    with open(self.index_name, "r+b") as index_file:
+                        index_file.truncate(len(complete))
+
+            if os.path.exists(self.file_name):
+                actual = os.path.getsize(self.file_name)
+                if actual > self.size:
+                    logger.warning(
+                        "Dropping %d unindexed bytes from %s",
+                        actual - self.size,
+                        self.file_name,
+                    )
+                    with open(self.file_name, "r+b") as archive_file:
+                        archive_file.truncate(self.size)
+                elif actual < self.size:
+                    # Index lines pointing past the end can't be read back
+                    while self.segments and (
+                        self.segments[-1]["offset"] + self.segments[-1]["length"] > actual
+                    ):
+                        self.segments.pop()
+                    self.rebuild_tenants()
+        logger.info("Archive holds %d tasks in %d batches", len(self), len(self.segments))
+
+    # Picks up batches other workers indexed since we last looked. Caller
+    # holds self.lock.
+    def refresh(self):
+        if not os.path.exists(self.index_name):
+            return
+        if os.path.getsize(self.index_name) <= self.index_size:
+            return
+        with open(self.index_name, "rb") as index_file:
+            index_file.seek(self.index_size)
+            data = index_file.read()
+        complete = data[: data.rfind(b"\n") + 1]
+        for line in complete.splitlines():
+            self.add_segment(json.loads(line))
+        self.index_size += len(complete)
+
+    def add_segment(self, segment):
+        position = len(self.segments)
+        self.segments.append(segment)
+        for key in segment["tenants"]:
+            guild_id, owner_id = key.split(":")
+            self.by_tenant.setdefault((int(guild_id), int(owner_id)), []).append(position)
+        self.size = segment["offset"] + segment["length"]
+
+    def rebuild_tenants(self):
+        segments = self.segments
+        self.segments = []
+        self.by_tenant = {}
+        self.size = 0
+        for segment in segments:
+            self.add_segment(segment)
+
+    @staticmethod
+    def record(task, reason, archived):
+        due = task.due
+        return {
+            "id": task.index,
+            "description": task.description,
+            "due": due.isoformat() if isinstance(due, date) else str(due),
+            "status": task.status,
+            "guild": task.guild_id,
+            "owner": task.owner_id,
+            "reason": reason,
+            "archived": archived.isoformat(),
+        }
+
+    @staticmethod
+    def from_record(record):
+        task = Task(
+            record["description"],
+            record["due"],
+            record["status"],
+            record["id"],
+            record["guild"],
+            record["owner"],
+        )
+        return ArchivedTask(task, record["reason"], parse_due_date(record["archived"]))
+
+    # Appends one batch as a single gzip member, then indexes it
+    def append(self, tasks, reason):
+        if not tasks:
+            return 0
+        archived = date.today()
+        tenants = {}
+        lines = []
+        for task in tasks:
+            lines.append(json.dumps(self.record(task, reason, archived)))
+            key = self.tenant_key(task.tenant)
+            tenants[key] = tenants.get(key, 0) + 1
+        member = gzip.compress(("\n".join(lines) + "\n").encode("utf-8"))
+
+        with self.lock, file_lock(self.lock_name):
+            self.refresh()
+            segment = {
+                "offset": self.size,
+                "length": len(member),
+                "archived": archived.isoformat(),
+                "tenants": tenants,
+            }
+            with open(self.file_name, "ab") as archive_file:
+                archive_file.write(member)
+                archive_file.flush()
+                os.fsync(archive_file.fileno())
+            line = (json.dumps(segment) + "\n").encode("utf-8")
+            with open(self.index_name, "ab") as index_file:
+                index_file.write(line)
+                index_file.flush()
+                os.fsync(index_file.fileno())
+            self.add_segment(segment)
+            self.index_size += len(line)
+        logger.debug("Archived %d %s tasks", len(tasks), reason)
+        return len(tasks)
+
+    def read_segment(self, archive_file, segment):
+        archive_file.seek(segment["offset"])
+        data = gzip.decompress(archive_file.read(segment["length"]))
+        return [json.loads(line) for line in data.decode("utf-8").splitlines()]
+
+    def count(self, tenant):
+        with self.lock:
+            self.refresh()
+        key = self.tenant_key(tenant)
+        return sum(
+            self.segments[position]["tenants"][key]
+            for position in self.by_tenant.get(tenant, ())
+        )
+
+    # One page of a tenant's archived tasks, newest first, optionally only
+    # those matching every word prefix in `query`. Returns (page, more).
+    def history(self, tenant, query=None, offset=0, limit=10):
+        with self.lock:
+            self.refresh()
+            positions = list(self.by_tenant.get(tenant, ()))
+        if not positions:
+            return [], False
+        terms = tokenize(query) if query else []
+        guild_id, owner_id = tenant
+        found = []
+        seen = set()  # a batch can be archived twice after a crash
+        with open(self.file_name, "rb") as archive_file:
+            for position in reversed(positions):
+                segment = self.segments[position]
+                for record in reversed(self.read_segment(archive_file, segment)):
+                    if record["guild"] != guild_id or record["owner"] != owner_id:
+                        continue
+                    if record["id"] in seen:
+                        continue
+                    seen.add(record["id"])
+                    if terms:
+                        words = tokenize(record["description"])
+                        if not all(
+                            any(word.startswith(term) for word in words) for term in terms
+                        ):
+                            continue
+                    found.append(record)
+                    if len(found) > offset + limit:
+                        page = found[offset : offset + limit]
+                        return [self.from_record(record) for record in page], True
+        page = found[offset : offset + limit]
+        return [self.from_record(record) for record in page], False
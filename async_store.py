@@ -0,0 +1,259 @@
+from concurrent.futures import ThreadPoolExecutor
+from events import ChangeFeed, TaskEvent
+from metrics import metrics
+from functools import partial
+from itertools import islice
+import asyncio
+import time
+
+
+# Async facade over a TaskStorage backend.
+#
+# All disk work runs on a small thread pool so the event loop (and the
+# gateway heartbeat) never waits on openpyxl or SQLite. Writers are
+# serialized with an asyncio lock, readers share a snapshot per tenant (plus
+# one for the whole table) that is only rebuilt after a write. Every
+# committed write is published on `feed`. With an `archive` (TaskArchive),
+# completed and expired tasks are moved there instead of being destroyed.
+class AsyncTaskStore:
+
+    def __init__(self, storage, max_workers=4, archive=None):
+        self.storage = storage
+        self.archive = archive
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="task-store"
+        )
+        self.write_lock = asyncio.Lock()
+        self.snapshots = {}  # (guild_id, owner_id) or (None, None) -> tasks
+        self.snapshot_loading = {}
+        self.generation = 0  # bumped by every write
+        self.feed = ChangeFeed()
+        self.loading = None  # backend setup, running in the background
+        self.in_flight = 0  # storage calls queued or running on the executor
+
+    # Starts loading the backend without waiting for it, so the bot can
+    # connect meanwhile. Every storage call waits for the load to finish.
+    def start(self):
+        if self.loading is None:
+            loop = asyncio.get_running_loop()
+            self.loading = loop.run_in_executor(self.executor, self.open_storage)
+        return self.loading
+
+    def open_storage(self):
+        self.storage.setup()
+        if self.archive is not None:
+            self.archive.open()
+
+    async def setup(self):
+        await asyncio.shield(self.start())
+
+    # Waits at most `timeout` seconds for the backend (asyncio.TimeoutError
+    # if it's still loading)
+    async def wait_ready(self, timeout=None):
+        await asyncio.wait_for(asyncio.shield(self.start()), timeout)
+
+    # Runs a blocking storage call on the executor. The time recorded per
+    # operation includes waiting for a free worker.
+    async def run(self, func, *args):
+        await self.setup()
+        loop = asyncio.get_running_loop()
+        self.in_flight += 1
+        started = time.perf_counter()
+        try:
+            return await loop.run_in_executor(self.executor, partial(func, *args))
+        finally:
+            self.in_flight -= 1
+            metrics.observe(
+                "storage_seconds",
+                time.perf_counter() - started,
+                op=getattr(func, "__name__", "call"),
+            )
+
+    # Reading -- served from the snapshot while nothing has changed
+    async def get_tasks(self, guild_id=None, owner_id=None):
+        key = (guild_id, owner_id)
+        snapshot = self.snapshots.get(key)
+        if snapshot is None:
+            # Concurrent readers share one load instead of each hitting the disk
+            loading = self.snapshot_loading.get(key)
+            if loading is None:
+                loading = asyncio.ensure_future(self.load_snapshot(key))
+                self.snapshot_loading[key] = loading
+            snapshot = await asyncio.shield(loading)
+        return list(snapshot)
+
+    async def load_snapshot(self, key):
+        generation = self.generation
+        try:
+            tasks = await self.run(self.storage.get_tasks, *key)
+        finally:
+            if self.snapshot_loading.get(key) is asyncio.current_task():
+                del self.snapshot_loading[key]
+
+        # A write landed while loading, so this copy may already be stale
+        if generation == self.generation:
+            self.snapshots[key] = tasks
+        return tasks
+
+    async def get_task(self, task_id):
+        return await self.run(self.storage.get_task, task_id)
+
+    async def get_due_between(self, due_from=None, due_to=None, status=None):
+        return await self.run(self.storage.get_due_between, due_from, due_to, status)
+
+    # Streams matching tasks in ID order, one chunk per executor call, so a
+    # huge table is walked with bounded memory and callers can stop early
+    async def iter_tasks(
+        self,
+        guild_id=None,
+        owner_id=None,
+        status=None,
+        due_from=None,
+        due_to=None,
+        chunk_size=500,
+    ):
+        await self.setup()
+        tasks = self.storage.iter_tasks(guild_id, owner_id, status, due_from, due_to)
+        while True:
+            chunk = await self.run(self.next_chunk, tasks, chunk_size)
+            for task in chunk:
+                yield task
+            if len(chunk) < chunk_size:
+                return
+
+    # Runs on the executor: pulls the next chunk from a storage generator
+    @staticmethod
+    def next_chunk(tasks, chunk_size):
+        return list(islice(tasks, chunk_size))
+
+    # Reads just one page from the backend rather than the whole table
+    async def get_page(
+        self, guild_id, owner_id, offset, limit, status=None, due_from=None, due_to=None
+    ):
+        return await self.run(
+            self.storage.get_page,
+            guild_id,
+            owner_id,
+            offset,
+            limit,
+            status,
+            due_from,
+            due_to,
+        )
+
+    # Writing -- one writer at a time, then the snapshots are dropped
+    async def write(self, func, *args):
+        async with self.write_lock:
+            try:
+                return await self.run(func, *args)
+            finally:
+                self.generation += 1
+                self.snapshots = {}
+                self.snapshot_loading = {}
+
+    # Returns a queue that receives a TaskEvent for every committed change
+    def subscribe(self):
+        return self.feed.subscribe()
+
+    def unsubscribe(self, queue):
+        self.feed.unsubscribe(queue)
+
+    async def add_tasks(self, task):
+        task = await self.write(self.storage.add_tasks, task)
+        if task:
+            self.feed.publish([TaskEvent(TaskEvent.ADDED, task.index, task)])
+        return task
+
+    async def complete_task(self, task_id, new_details):
+        result = await self.write(self.storage.complete_task, task_id, new_details)
+        task = await self.get_task(task_id)
+        if task is not None:
+            self.feed.publish([TaskEvent(TaskEvent.UPDATED, task.index, task)])
+        return result
+
+    async def delete_task(self, task_id):
+        result, task = await self.write(self.delete_and_return, task_id)
+        if result:
+            self.feed.publish([TaskEvent(TaskEvent.DELETED, int(task_id), task)])
+        return result
+
+    # Runs on the executor: deletes a task and hands back what it was, so
+    # subscribers know whose task went away
+    def delete_and_return(self, task_id):
+        task = self.storage.get_task(task_id) if str(task_id).isdigit() else None
+        return self.storage.delete_task(task_id), task
+
+    async def add_many_tasks(self, tasks):
+        stored = await self.write(self.storage.add_many_tasks, tasks)
+        self.feed.publish([TaskEvent(TaskEvent.ADDED, task.index, task) for task in stored])
+        return stored
+
+    async def complete_tasks(self, task_ids, new_details, remove=False, tenant=None):
+        changed = await self.write(
+            self.storage.complete_tasks, task_ids, new_details, remove, tenant
+        )
+        kind = TaskEvent.DELETED if remove else TaskEvent.UPDATED
+        self.feed.publish([TaskEvent(kind, task.index, task) for task in changed])
+        return changed
+
+    async def delete_tasks(self, task_ids, tenant=None):
+        removed = await self.write(self.storage.delete_tasks, task_ids, tenant)
+        self.feed.publish(
+            [TaskEvent(TaskEvent.DELETED, task.index, task) for task in removed]
+        )
+        return removed
+
+    # Moves every completed task out of the active set (into the archive
+    # when there is one). `owns(task)` limits it to this worker's tasks.
+    async def delete_completed_task(self, owns=None):
+        if self.archive is not None or owns is not None:
+            return await self.archive_matching("completed", owns=owns, status="C")
+        deleted = await self.write(self.storage.delete_completed_task)
+        self.feed.publish([TaskEvent(TaskEvent.DELETED, task_id) for task_id in deleted])
+        return deleted
+
+    # Moves tasks out of the active set into the archive in one write,
+    # optionally setting their status on the way. Without an archive they
+    # are simply deleted. Returns the moved tasks.
+    async def archive_tasks(self, task_ids, reason, status=None, tenant=None):
+        if self.archive is None:
+            if status is not None:
+                return await self.complete_tasks(task_ids, status, True, tenant)
+            return await self.delete_tasks(task_ids, tenant)
+        moved = await self.write(self.archive_and_delete, task_ids, reason, status, tenant)
+        self.feed.publish([TaskEvent(TaskEvent.DELETED, task.index, task) for task in moved])
+        return moved
+
+    # Runs on the executor. The archive batch is synced before the tasks are
+    # deleted, so a crash in between leaves a duplicate, never a loss.
+    def archive_and_delete(self, task_ids, reason, status, tenant):
+        tasks = []
+        for task_id in dict.fromkeys(task_ids):
+            task = self.storage.get_task(task_id)
+            if task is not None and (tenant is None or task.tenant == tenant):
+                tasks.append(task if status is None else task.replace(status=status))
+        if not tasks:
+            return []
+        self.archive.append(tasks, reason)
+        self.storage.delete_tasks([task.index for task in tasks], tenant)
+        return tasks
+
+    # Archives every task matching the filters (and `owns`), a batch per write
+    async def archive_matching(self, reason, batch_size=500, owns=None, **filters):
+        moved = []
+        batch = []
+        async for task in self.iter_tasks(**filters):
+            if owns is not None and not owns(task):
+                continue
+            batch.append(task.index)
+            if len(batch) >= batch_size:
+                moved += await self.archive_tasks(batch, reason)
+                batch = []
+        if batch:
+            moved += await self.archive_tasks(batch, reason)
+        return [task.index for task in moved]
+
+    # Waits for in-flight work, then closes the backend (called on shutdown)
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+        self.storage.close()
@@ -0,0 +1,100 @@
+# Stand-ins for the discord objects the bot touches, so the slash commands
+# and reminder loops can run without a gateway connection. Everything that
+# would have been sent is recorded on the object instead.
+
+
+class FakeChannel:
+
+    def __init__(self, name="task-manager"):
+        self.name = name
+        self.sent = []
+
+    async def send(self, content=None, **kwargs):
+        self.sent.append(content)
+
+    async def purge(self, limit=100):
+        return []
+
+
+class FakeUser:
+
+    def __init__(self, user_id):
+        self.id = user_id
+        self.dm_channel = None
+
+    async def create_dm(self):
+        self.dm_channel = FakeChannel(name=f"dm-{self.id}")
+        return self.dm_channel
+
+
+class FakeResponse:
+
+    def __init__(self):
+        self.sent = []
+        self.deferred = False
+
+    async def send_message(self, content=None, **kwargs):
+        self.sent.append(content)
+
+    async def defer(self, **kwargs):
+        self.deferred = True
+
+    def is_done(self):
+        return self.deferred or bool(self.sent)
+
+
+class FakeFollowup:
+
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, content=None, **kwargs):
+        self.sent.append(content)
+
+
+class FakeInteraction:
+
+    def __init__(self, user_id, guild_id=1, channel=None):
+        self.user = FakeUser(user_id)
+        self.guild_id = guild_id
+        self.channel = channel or FakeChannel()
+        self.response = FakeResponse()
+        self.followup = FakeFollowup()
+
+    # Last message the command answered with
+    @property
+    def reply(self):
+        sent = self.response.sent + self.followup.sent
+        return sent[-1] if sent else None
+
+
+class FakeAttachment:
+
+    def __init__(self, data, filename="tasks.csv"):
+        self.data = data
+        self.filename = filename
+        self.size = len(data)
+
+    async def read(self):
+        return self.data
+
+
+# Enough of commands.Bot for Reminder and DeliveryQueue
+class FakeBot:
+
+    def __init__(self):
+        self.users = {}
+
+    def get_user(self, user_id):
+        return self.users.get(user_id)
+
+    async def fetch_user(self, user_id):
+        return self.users.setdefault(user_id, FakeUser(user_id))
+
+    # Every DM sent so far, by user ID
+    def sent(self):
+        return {
+            user_id: user.dm_channel.sent
+            for user_id, user in self.users.items()
+            if user.dm_channel is not None
+        }
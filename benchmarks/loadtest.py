@@ -0,0 +1,400 @@
+# Load test: replays command traffic against the real slash-command handlers
+# and reminder loop, with fake Discord objects and a virtual clock.
+#
+#   python -m benchmarks.loadtest --users 200 --hours 24
+#   python -m benchmarks.loadtest --users 500 --record trace.jsonl
+#   python -m benchmarks.loadtest --trace trace.jsonl --backend sqlite --output report.json
+#
+# A trace is JSON lines, one command each, in time order:
+#
+#   {"at": 3.5, "user": 1004, "guild": 1, "command": "create",
+#    "args": {"description": "Write report", "due_in_days": 2}}
+#
+# `at` is seconds from the start of the trace. Commands sharing an `at` run
+# concurrently (a burst). /complete and /remove take {"which": "oldest"} or
+# {"which": "newest"} and act on one of that user's tasks, since task IDs
+# differ between runs.
+#
+# The clock runs at real speed while there is work and jumps ahead to the
+# next command or reminder when everything is idle, so hours of reminder
+# intervals pass in seconds while measured latencies stay real. The report
+# has p50/p99 command latency, event-loop stalls and reminder lateness (when
+# a DM went out versus when its reminder was due).
+
+from collections import deque
+from datetime import date, timedelta
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import FakeBot, FakeInteraction
+from benchmarks.run import generate, load_bot, percentile
+from benchmarks import workload
+from async_store import AsyncTaskStore
+from delivery import DeliveryQueue
+from events import TaskEvent
+from pages import PageCache
+from reminder import Reminder
+from scheduler import ReminderScheduler
+from search import TaskSearch
+from storage import create_storage
+
+COMMAND_MIX = {  # share of synthetic commands
+    "create": 0.35,
+    "show": 0.35,
+    "complete": 0.15,
+    "search": 0.1,
+    "remove": 0.05,
+}
+SEARCH_WORDS = ["report", "review", "invoice", "meeting", "deploy", "call"]
+STALL_INTERVAL = 0.01  # seconds between event-loop lag probes
+STALL_THRESHOLD = 0.05  # lag counted as a stall
+SETTLE_TIMEOUT = 60.0  # longest wait for reminders to go out before jumping
+
+
+# Real time plus an offset that grows whenever the run skips ahead
+class VirtualClock:
+
+    def __init__(self, start=None):
+        self.offset = (start if start is not None else time.time()) - time.monotonic()
+
+    def __call__(self):
+        return time.monotonic() + self.offset
+
+    def today(self):
+        return date.fromtimestamp(self())
+
+    def advance_to(self, when):
+        now = self()
+        if when > now:
+            self.offset += when - now
+
+
+# Remembers when the batch it hands out was due
+class TracedScheduler(ReminderScheduler):
+
+    def __init__(self, clock):
+        super().__init__(clock)
+        self.batch_due = None
+
+    def pop_due(self, now):
+        self.batch_due = self.next_fire_time()
+        return super().pop_due(now)
+
+
+# Records, per recipient, when each queued reminder was due, and on delivery
+# how late it went out
+class TracedDelivery(DeliveryQueue):
+
+    def __init__(self, bot, clock, **kwargs):
+        super().__init__(bot, **kwargs)
+        self.clock = clock
+        self.due = {}  # user ID -> due times of queued reminders
+        self.sending = {}  # user ID -> due times being delivered now
+        self.lateness = []
+
+    def take_next(self):
+        job = super().take_next()
+        if job is not None:
+            self.sending[job[0]] = self.due.pop(job[0], [])
+        return job
+
+    async def deliver(self, user_id, message):
+        delivered = await super().deliver(user_id, message)
+        sent_at = self.clock()
+        for due in self.sending.pop(user_id, ()):
+            self.lateness.append(max(0.0, sent_at - due))
+        return delivered
+
+    @property
+    def idle(self):
+        return not self.pending and not self.in_flight
+
+
+class TracedReminder(Reminder):
+
+    async def send_reminder(self, owner_id, message):
+        self.delivery.due.setdefault(owner_id, []).append(self.scheduler.batch_due)
+        await super().send_reminder(owner_id, message)
+
+
+def percentiles(samples):
+    if not samples:
+        return {"count": 0}
+    samples = sorted(samples)
+
+    def at(q):
+        return round(percentile(samples, q) * 1000, 3)
+
+    return {"count": len(samples), "p50_ms": at(0.5), "p99_ms": at(0.99), "max_ms": at(1.0)}
+
+
+# Synthetic trace: every user sends commands at random (about `rate` per
+# hour each), and every `burst_every` hours half the users hit /create and
+# /show within the same second
+def synthetic_trace(users, hours, rate=2.0, burst_every=6, seed=0):
+    rng = random.Random(seed)
+    owners = workload.owner_ids(users)
+    names = list(COMMAND_MIX)
+    weights = list(COMMAND_MIX.values())
+    duration = hours * 3600
+    trace = []
+
+    def command(at, user, name):
+        if name == "create":
+            args = {
+                "description": f"{rng.choice(SEARCH_WORDS)} {rng.randint(1, 10**6)}",
+                "due_in_days": rng.randint(0, 14),
+            }
+        elif name == "show":
+            args = {"page": rng.choice([1, 1, 1, 2]), "status": rng.choice([None, "P"])}
+        elif name == "search":
+            args = {"query": rng.choice(SEARCH_WORDS)[: rng.randint(2, 6)]}
+        else:
+            args = {"which": rng.choice(["oldest", "newest"])}
+        trace.append(
+            {"at": round(at, 3), "user": user, "guild": workload.GUILD_ID, "command": name, "args": args}
+        )
+
+    for user in owners:
+        at = rng.expovariate(rate / 3600)
+        while at < duration:
+            command(at, user, rng.choices(names, weights)[0])
+            at += rng.expovariate(rate / 3600)
+
+    for burst in range(burst_every * 3600, duration, burst_every * 3600):
+        for user in rng.sample(owners, max(1, len(owners) // 2)):
+            command(float(burst), user, rng.choice(["create", "show"]))
+
+    trace.sort(key=lambda event: event["at"])
+    return trace
+
+
+def read_trace(file_name):
+    with open(file_name, encoding="utf-8") as trace_file:
+        return [json.loads(line) for line in trace_file if line.strip()]
+
+
+def write_trace(file_name, trace):
+    with open(file_name, "w", encoding="utf-8") as trace_file:
+        for event in trace:
+            trace_file.write(json.dumps(event) + "\n")
+
+
+async def watch_stalls(samples):
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(STALL_INTERVAL)
+        samples.append(max(0.0, loop.time() - started - STALL_INTERVAL))
+
+
+class LoadTest:
+
+    def __init__(self, backend, file_name, global_rate):
+        self.clock = VirtualClock()
+        self.bot_module = load_bot(backend, file_name)
+        self.storage = create_storage(backend, file_name)
+        self.store = AsyncTaskStore(self.storage)
+
+        # Point the command handlers at this run's store
+        self.bot_module.tasks = self.storage
+        self.bot_module.store = self.store
+        self.bot_module.page_cache = PageCache(self.store)
+        self.bot_module.search_index = TaskSearch(self.store)
+
+        self.bot = FakeBot()
+        self.delivery = TracedDelivery(self.bot, self.clock, global_rate=global_rate)
+        self.reminder = TracedReminder(
+            self.store,
+            self.bot,
+            scheduler=TracedScheduler(self.clock),
+            delivery=self.delivery,
+            clock=self.clock,
+        )
+        self.user_tasks = {}  # owner ID -> their task IDs, oldest first
+        self.latencies = {}  # command -> seconds
+        self.failures = []
+        self.skipped = 0
+        self.stalls = []
+
+    def command(self, name):
+        return self.bot_module.tree.get_command(name, guild=self.bot_module.guild).callback
+
+    # Follows the change feed so /complete and /remove can pick real IDs
+    async def track_tasks(self, changes):
+        while True:
+            event = await changes.get()
+            if event.task is None:
+                continue
+            owned = self.user_tasks.setdefault(event.task.owner_id, deque())
+            if event.kind == TaskEvent.ADDED:
+                owned.append(event.task.index)
+            elif event.kind == TaskEvent.DELETED and event.task_id in owned:
+                owned.remove(event.task_id)
+
+    async def run_command(self, event):
+        name = event["command"]
+        args = dict(event.get("args") or {})
+        interaction = FakeInteraction(event["user"], event.get("guild", workload.GUILD_ID))
+
+        if name == "create":
+            due = self.clock.today() + timedelta(days=args.pop("due_in_days", 0))
+            call = self.command("create")(
+                interaction, args.get("description", "Load test task"), due.isoformat(), args.get("status", "P")
+            )
+        elif name == "show":
+            call = self.command("show")(interaction, page=args.get("page", 1), status=args.get("status"))
+        elif name == "search":
+            call = self.command("search")(interaction, args.get("query", "task"))
+        elif name in ("complete", "remove"):
+            owned = self.user_tasks.get(event["user"])
+            if not owned:
+                self.skipped += 1
+                return
+            task_id = owned[0] if args.get("which", "oldest") == "oldest" else owned[-1]
+            call = self.command(name)(interaction, str(task_id))
+        else:
+            self.skipped += 1
+            return
+
+        started = time.perf_counter()
+        await call
+        self.latencies.setdefault(name, []).append(time.perf_counter() - started)
+        reply = interaction.reply
+        if reply is None or str(reply).startswith(("❌", "⏳", "Error", "An error")):
+            self.failures.append(f"/{name}: {reply}")
+
+    # Lets reminders that are due go out before the clock moves on
+    async def settle(self):
+        deadline = time.monotonic() + SETTLE_TIMEOUT
+        while time.monotonic() < deadline:
+            due = self.reminder.scheduler.next_fire_time()
+            if (due is None or due > self.clock()) and self.delivery.idle:
+                return
+            await asyncio.sleep(0.005)
+
+    # Jumps to `target`, stopping at every reminder slot on the way
+    async def fast_forward(self, target):
+        while True:
+            await self.settle()
+            due = self.reminder.scheduler.next_fire_time()
+            if due is None or due > target:
+                break
+            self.clock.advance_to(due)
+            self.reminder.scheduler.wake()
+        self.clock.advance_to(target)
+
+    async def replay(self, trace, tail=0):
+        await self.store.setup()
+        stall_watcher = asyncio.create_task(watch_stalls(self.stalls))
+        tracker = asyncio.create_task(self.track_tasks(self.store.subscribe()))
+        self.bot_module.page_cache.start()
+        self.bot_module.search_index.start()
+        # Owners of the preloaded tasks
+        async for task in self.store.iter_tasks():
+            self.user_tasks.setdefault(task.owner_id, deque()).append(task.index)
+        reminders = asyncio.create_task(self.reminder.schedule_all_reminders())
+        # The first sweep times its tasks from when it began, so the clock
+        # must not jump until it's done and the scheduler is running
+        while self.reminder.scheduler.wakeup is None:
+            await asyncio.sleep(0.005)
+
+        started = time.perf_counter()
+        start = self.clock()
+        position = 0
+        while position < len(trace):
+            at = trace[position]["at"]
+            burst = []
+            while position < len(trace) and trace[position]["at"] == at:
+                burst.append(trace[position])
+                position += 1
+            await self.fast_forward(start + at)
+            await asyncio.gather(*(self.run_command(event) for event in burst))
+        end = start + (trace[-1]["at"] if trace else 0) + tail
+        await self.fast_forward(end)
+        await self.settle()
+        wall = time.perf_counter() - started
+
+        for task in (reminders, tracker, stall_watcher):
+            task.cancel()
+        await self.delivery.stop()
+        self.store.shutdown()
+        return self.report(trace, wall, end - start)
+
+    def report(self, trace, wall, simulated):
+        all_latencies = [sample for samples in self.latencies.values() for sample in samples]
+        stalls = [lag for lag in self.stalls if lag >= STALL_THRESHOLD]
+        return {
+            "commands": len(trace),
+            "simulated_hours": round(simulated / 3600, 2),
+            "wall_s": round(wall, 2),
+            "latency": {
+                "all": percentiles(all_latencies),
+                **{name: percentiles(samples) for name, samples in sorted(self.latencies.items())},
+            },
+            "event_loop": {
+                "lag": percentiles(self.stalls),
+                "stalls": len(stalls),
+                "stall_s": round(sum(stalls), 3),
+            },
+            "reminders": {
+                "lateness": percentiles(self.delivery.lateness),
+                "messages": sum(len(messages) for messages in self.bot.sent().values()),
+                "recipients": len(self.bot.sent()),
+            },
+            "skipped": self.skipped,
+            "failures": self.failures[:10],
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay command traffic against a fake gateway")
+    parser.add_argument("--trace", help="JSON-lines trace to replay (default: synthetic)")
+    parser.add_argument("--record", help="write the synthetic trace here and exit")
+    parser.add_argument("--users", type=int, default=200, help="synthetic users")
+    parser.add_argument("--hours", type=int, default=24, help="synthetic trace length")
+    parser.add_argument("--rate", type=float, default=2.0, help="commands per user per hour")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--backend", default="excel", choices=["excel", "sqlite"])
+    parser.add_argument("--tasks", type=int, default=5000, help="tasks preloaded before the run")
+    parser.add_argument(
+        "--global-rate", type=float, default=45, help="DM sends per second (Discord allows 50)"
+    )
+    parser.add_argument("--output", help="write the JSON report here")
+    args = parser.parse_args()
+
+    if args.trace:
+        trace = read_trace(args.trace)
+    else:
+        trace = synthetic_trace(args.users, args.hours, args.rate, seed=args.seed)
+    if args.record:
+        write_trace(args.record, trace)
+        print(f"{len(trace)} commands written to {args.record}", file=sys.stderr)
+        return
+
+    with tempfile.TemporaryDirectory() as workdir:
+        extension = "xlsx" if args.backend == "excel" else "db"
+        file_name = os.path.join(workdir, f"loadtest.{extension}")
+        generate(args.backend, file_name, args.tasks)
+        print(f"Replaying {len(trace)} commands ({args.backend}, {args.tasks} tasks)...", file=sys.stderr)
+        load_test = LoadTest(args.backend, file_name, args.global_rate)
+        # An hour past the last command so its reminders are included
+        report = asyncio.run(load_test.replay(trace, tail=3600))
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            output_file.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
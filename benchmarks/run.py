@@ -0,0 +1,395 @@
+# Benchmarks for the storage backends, the reminder loops and the slash
+# commands, run against synthetic data of a given size.
+#
+#   python -m benchmarks.run --sizes 100,1000,10000 --output results.json
+#   python -m benchmarks.run --sizes 1000000 --backends excel
+#   python -m benchmarks.run --compare results.json
+#
+# Latencies are in milliseconds (median / p95 / max over --repeat runs),
+# memory is the tracemalloc peak in KiB for the operations that allocate in
+# proportion to the task count. Results are printed (or written) as JSON;
+# --compare reports every median that got slower than a saved run.
+
+from contextlib import redirect_stdout
+from datetime import date, timedelta
+from statistics import median
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import FakeAttachment, FakeBot, FakeInteraction
+from benchmarks import workload
+from async_store import AsyncTaskStore
+from database import Task
+from delivery import DeliveryQueue
+from pages import PageCache
+from reminder import Reminder
+from storage import create_storage
+
+DEFAULT_SIZES = "100,1000,10000"
+MAX_SIZE = 1_000_000
+IMPORT_ROWS = 500  # rows per /import run
+REGRESSION_RATIO = 1.25  # --compare flags medians this much slower
+
+
+# Nearest-rank percentile of sorted samples: the smallest sample with at
+# least q of them at or below it (so p95 never falls under the median).
+# Shared with the load test so both reports agree.
+def percentile(samples, q):
+    return samples[max(0, math.ceil(q * len(samples)) - 1)]
+
+
+def summarize(samples):
+    samples = sorted(samples)
+    return {
+        "runs": len(samples),
+        "median_ms": round(median(samples) * 1000, 3),
+        "p95_ms": round(percentile(samples, 0.95) * 1000, 3),
+        "max_ms": round(samples[-1] * 1000, 3),
+    }
+
+
+# Times func(0), func(1), ... and optionally traces the first run's memory
+def measure(func, repeat, trace=False):
+    samples = []
+    peak = None
+    for run in range(repeat):
+        if trace and run == 0:
+            tracemalloc.start()
+        started = time.perf_counter()
+        func(run)
+        samples.append(time.perf_counter() - started)
+        if trace and run == 0:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    result = summarize(samples)
+    if peak is not None:
+        result["peak_kib"] = round(peak / 1024, 1)
+    return result
+
+
+async def measure_async(func, repeat, trace=False):
+    samples = []
+    peak = None
+    for run in range(repeat):
+        if trace and run == 0:
+            tracemalloc.start()
+        started = time.perf_counter()
+        await func(run)
+        samples.append(time.perf_counter() - started)
+        if trace and run == 0:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    result = summarize(samples)
+    if peak is not None:
+        result["peak_kib"] = round(peak / 1024, 1)
+    return result
+
+
+def generate(backend, file_name, size):
+    started = time.perf_counter()
+    if backend == "excel":
+        workload.write_workbook(file_name, size)
+    else:
+        workload.write_database(file_name, size)
+    return round(time.perf_counter() - started, 3)
+
+
+# A storage backend with write-behind effectively off, so the numbers are
+# for the operation itself (flushing is measured separately)
+def open_storage(backend, file_name):
+    return create_storage(
+        backend, file_name, flush_interval=3600, flush_threshold=10**9
+    )
+
+
+def bench_storage(backend, file_name, size, repeat):
+    results = {}
+    storage = open_storage(backend, file_name)
+    results["load"] = measure(lambda run: storage.setup(), 1, trace=True)
+    if backend == "excel":
+        # The first load wrote the snapshot cache, the next one starts from it
+        storage.close()
+        storage = open_storage(backend, file_name)
+        results["load_cached"] = measure(lambda run: storage.setup(), 1, trace=True)
+
+    owners = workload.owner_ids()
+    pending = [task.index for task in storage.get_tasks() if task.status == "P"]
+    today = date.today()
+
+    results["get_tasks"] = measure(lambda run: storage.get_tasks(), repeat, trace=True)
+    results["get_tasks_tenant"] = measure(
+        lambda run: storage.get_tasks(workload.GUILD_ID, owners[run % len(owners)]),
+        repeat,
+    )
+    results["get_page"] = measure(
+        lambda run: storage.get_page(
+            workload.GUILD_ID, owners[run % len(owners)], 0, 10, "P", today
+        ),
+        repeat,
+    )
+    results["get_due_between"] = measure(
+        lambda run: storage.get_due_between(today, today + timedelta(days=3), "P"),
+        repeat,
+    )
+    results["add_tasks"] = measure(
+        lambda run: storage.add_tasks(
+            Task(f"Benchmark task {run}", today, "P", 0, workload.GUILD_ID, owners[0])
+        ),
+        repeat,
+    )
+    results["complete_task"] = measure(
+        lambda run: storage.complete_task(pending[run], "C"), min(repeat, len(pending))
+    )
+    results["delete_task"] = measure(
+        lambda run: storage.delete_task(str(pending[-run - 1])),
+        min(repeat, len(pending)),
+    )
+    results["delete_completed_task"] = measure(
+        lambda run: storage.delete_completed_task(), 1, trace=True
+    )
+    if backend == "excel":
+        # One full compaction of everything above
+        results["flush"] = measure(lambda run: storage.flush(), 1, trace=True)
+
+    storage.close()
+    return results
+
+
+async def bench_reminders(backend, file_name, repeat):
+    results = {}
+    store = AsyncTaskStore(open_storage(backend, file_name))
+    bot = FakeBot()
+    delivery = DeliveryQueue(bot)  # not started: messages only get queued
+    reminder = Reminder(store, bot, delivery=delivery)
+    await store.setup()
+
+    async def sweep(run):
+        await reminder.check_and_update_tasks()
+
+    results["sweep_cold"] = await measure_async(sweep, 1, trace=True)
+    results["sweep_warm"] = await measure_async(sweep, repeat)
+    results["tracked_tasks"] = len(reminder.tasks)
+
+    # Every tracked task's slot comes up at once: one grouped message per
+    # owner and frequency
+    async def send_all(run):
+        reminder.last_sent = {}
+        await reminder.send_due_reminders(list(reminder.tasks), time.time())
+
+    results["send_due_reminders"] = await measure_async(send_all, repeat)
+    results["queued_recipients"] = len(delivery.pending)
+
+    async def clean(run):
+        await reminder.clean_overdue_tasks()
+
+    results["clean_overdue_tasks"] = await measure_async(clean, 1, trace=True)
+
+    store.shutdown()
+    return results
+
+
+# Imports main.py against the given store (once per process) and returns
+# the module with its commands registered
+def load_bot(backend, file_name):
+    os.environ["STORAGE_BACKEND"] = backend
+    os.environ["DATABASE_FILE"] = file_name
+    os.environ.setdefault("TOKEN", "benchmark")
+    import main
+
+    if main.tree.get_command("show", guild=main.guild) is None:
+        main.bot_commands()
+    return main
+
+
+async def bench_commands(backend, file_name, repeat):
+    results = {}
+    bot_module = load_bot(backend, file_name)
+
+    # Point the handlers at a fresh store for this size
+    bot_module.tasks = open_storage(backend, file_name)
+    bot_module.store = AsyncTaskStore(bot_module.tasks)
+    bot_module.page_cache = PageCache(bot_module.store)
+    await bot_module.store.setup()
+
+    def command(name):
+        return bot_module.tree.get_command(name, guild=bot_module.guild).callback
+
+    owners = workload.owner_ids()
+    failures = []
+
+    def interaction(run):
+        return FakeInteraction(owners[run % len(owners)], workload.GUILD_ID)
+
+    def check(name, reply):
+        if reply is None or str(reply).startswith(("❌", "⏳", "Error", "An error")):
+            failures.append(f"/{name}: {reply}")
+
+    async def show(run):
+        bot_module.page_cache.invalidate()
+        user = interaction(run)
+        await command("show")(user, page=1)
+        check("show", user.reply)
+
+    async def show_cached(run):
+        user = interaction(run)
+        await command("show")(user, page=1)
+        check("show", user.reply)
+
+    async def show_filtered(run):
+        bot_module.page_cache.invalidate()
+        user = interaction(run)
+        await command("show")(user, page=1, status="P", due_from=date.today().isoformat())
+        check("show", user.reply)
+
+    async def create(run):
+        user = interaction(run)
+        await command("create")(
+            user, f"Command task {run}", (date.today() + timedelta(days=5)).isoformat()
+        )
+        check("create", user.reply)
+
+    async def complete(run):
+        user = interaction(run)
+        task = await bot_module.store.add_tasks(
+            Task("To complete", date.today(), "P", 0, workload.GUILD_ID, user.user.id)
+        )
+        await command("complete")(user, str(task.index))
+        check("complete", user.reply)
+
+    async def remove(run):
+        user = interaction(run)
+        task = await bot_module.store.add_tasks(
+            Task("To remove", date.today(), "P", 0, workload.GUILD_ID, user.user.id)
+        )
+        await command("remove")(user, str(task.index))
+        check("remove", user.reply)
+
+    csv_data = workload.make_csv(IMPORT_ROWS)
+
+    async def import_csv(run):
+        user = interaction(run)
+        await command("import")(user, FakeAttachment(csv_data))
+        check("import", user.reply)
+
+    results["show"] = await measure_async(show, repeat)
+    results["show_cached"] = await measure_async(show_cached, repeat)
+    results["show_filtered"] = await measure_async(show_filtered, repeat)
+    results["create"] = await measure_async(create, repeat)
+    results["complete"] = await measure_async(complete, repeat)
+    results["remove"] = await measure_async(remove, repeat)
+    results["import"] = await measure_async(import_csv, max(1, repeat // 10), trace=True)
+    results["failures"] = failures[:10]
+
+    bot_module.store.shutdown()
+    return results
+
+
+def run_size(backend, size, repeat, workdir, sections):
+    extension = "xlsx" if backend == "excel" else "db"
+    result = {"backend": backend, "size": size}
+    for section in sections:
+        # Every section starts from the same freshly generated data
+        file_name = os.path.join(workdir, f"{backend}-{size}-{section}.{extension}")
+        result.setdefault("generate_s", generate(backend, file_name, size))
+        print(f"{backend} {size}: {section}...", file=sys.stderr)
+        if section == "storage":
+            result[section] = bench_storage(backend, file_name, size, repeat)
+        elif section == "reminders":
+            result[section] = asyncio.run(bench_reminders(backend, file_name, repeat))
+        else:
+            result[section] = asyncio.run(bench_commands(backend, file_name, repeat))
+    return result
+
+
+# Medians that got slower than in a saved run
+def compare(baseline, current):
+    def medians(report):
+        found = {}
+        for result in report["results"]:
+            for section, ops in result.items():
+                if not isinstance(ops, dict):
+                    continue
+                for op, stats in ops.items():
+                    if isinstance(stats, dict) and "median_ms" in stats:
+                        key = f"{result['backend']}/{result['size']}/{section}/{op}"
+                        found[key] = stats["median_ms"]
+        return found
+
+    old = medians(baseline)
+    regressions = []
+    for key, value in medians(current).items():
+        if old.get(key) and value > old[key] * REGRESSION_RATIO:
+            regressions.append(
+                {"op": key, "before_ms": old[key], "after_ms": value,
+                 "ratio": round(value / old[key], 2)}
+            )
+    return regressions
+
+
+def parse_sizes(text):
+    sizes = [int(size) for size in text.split(",") if size.strip()]
+    for size in sizes:
+        if not 1 <= size <= MAX_SIZE:
+            raise argparse.ArgumentTypeError(f"sizes must be between 1 and {MAX_SIZE}")
+    return sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Task bot benchmarks")
+    parser.add_argument("--sizes", type=parse_sizes, default=parse_sizes(DEFAULT_SIZES))
+    parser.add_argument("--backends", default="excel,sqlite")
+    parser.add_argument(
+        "--sections", default="storage,reminders,commands",
+        help="any of storage, reminders, commands",
+    )
+    parser.add_argument("--repeat", type=int, default=20, help="runs per operation")
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--compare", help="earlier JSON report to check against")
+    args = parser.parse_args()
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "date": date.today().isoformat(),
+            "repeat": args.repeat,
+        },
+        "results": [],
+    }
+    sections = [section.strip() for section in args.sections.split(",")]
+    with tempfile.TemporaryDirectory() as workdir:
+        for backend in args.backends.split(","):
+            for size in args.sizes:
+                # The bot's own progress output would drown the report
+                with open(os.devnull, "w") as quiet, redirect_stdout(quiet):
+                    result = run_size(backend.strip(), size, args.repeat, workdir, sections)
+                report["results"].append(result)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as baseline_file:
+            report["regressions"] = compare(json.load(baseline_file), report)
+
+    text = json.dumps(report, indent=2, default=str)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            output_file.write(text + "\n")
+        print(f"Results written to {args.output}", file=sys.stderr)
+    else:
+        print(text)
+    if report.get("regressions"):
+        print(f"{len(report['regressions'])} regressions found", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""Sharded reminder check: several worker processes on one machine.
+
+    python -m benchmarks.shards --workers 3 --shards 8
+
+Workers share one SQLite task database and one shard-lease file, and send
+reminders through FakeBot instead of a gateway connection. The run has two
+phases:
+
+1. `workers` processes split the shards the way launcher.py does. Once its
+   reminders are out, worker 0 crashes (no lease release); the others stop
+   cleanly.
+2. `workers + 1` processes start with a new split, so every shard changes
+   hands, and new tasks (for new owners) are added.
+
+Every task due today must be reminded exactly once: phase-one tasks in
+phase one only, phase-two tasks in phase two. Exits non-zero otherwise.
+"""
+
+from benchmarks.fakes import FakeBot
+from datetime import date
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+
+LEASE_TTL = 3.0  # short leases so the crashed worker's shards free up quickly
+SAFETY_MARGIN = 1.0
+TASK_PATTERN = re.compile(r"• \*\*(.+?)\*\*")
+
+
+def guild_ids(count, seed=0):
+    rng = random.Random(seed)
+    # Snowflake-like IDs: the shard comes from bits 22 and up
+    return [(rng.randrange(1, 1 << 40) << 22) | rng.randrange(1 << 22) for _ in range(count)]
+
+
+def make_tasks(phase, count, guilds, owners, seed):
+    from database import Task
+
+    rng = random.Random(seed)
+    return [
+        Task(
+            f"phase{phase} task {number}",
+            date.today(),
+            "P",
+            guild_id=rng.choice(guilds),
+            owner_id=rng.choice(owners),
+        )
+        for number in range(count)
+    ]
+
+
+def add_tasks(db_name, tasks):
+    from sqlite_handler import SQLiteHandler
+
+    handler = SQLiteHandler(db_name)
+    handler.setup()
+    handler.add_many_tasks(tasks)
+    handler.close()
+
+
+# Runs in a child process: one worker's reminders for `duration` seconds
+def worker(db_name, leases_name, worker_id, shard_ids, shard_count, duration, crash, output):
+    from async_store import AsyncTaskStore
+    from reminder import Reminder
+    from sharding import ShardCoordinator
+    from sqlite_handler import SQLiteHandler
+
+    async def main():
+        store = AsyncTaskStore(SQLiteHandler(db_name))
+        await store.setup()
+        bot = FakeBot()
+        partition = ShardCoordinator(
+            leases_name, worker_id, shard_ids, shard_count, LEASE_TTL, SAFETY_MARGIN
+        )
+        reminder = Reminder(store, bot, partition=partition)
+        partition.start(store, reminder.rebalance)
+        runner = asyncio.create_task(reminder.schedule_all_reminders())
+
+        await asyncio.sleep(duration)
+        # Let queued messages go out before stopping (or crashing)
+        while len(reminder.delivery) or reminder.delivery.in_flight:
+            await asyncio.sleep(0.1)
+        sent = [
+            name
+            for messages in bot.sent().values()
+            for message in messages
+            for name in TASK_PATTERN.findall(message)
+        ]
+        with open(output, "w", encoding="utf-8") as output_file:
+            json.dump({"worker": worker_id, "held": sorted(partition.held), "sent": sent}, output_file)
+        if crash:
+            os._exit(1)  # leases stay behind until they expire
+        runner.cancel()
+        partition.release()
+        store.shutdown()
+
+    asyncio.run(main())
+
+
+def run_phase(workdir, phase, workers, shard_count, duration, crash_worker=None):
+    outputs = []
+    processes = []
+    for worker_id in range(workers):
+        output = os.path.join(workdir, f"phase{phase}-worker{worker_id}.json")
+        outputs.append(output)
+        process = multiprocessing.Process(
+            target=worker,
+            args=(
+                os.path.join(workdir, "tasks.db"),
+                os.path.join(workdir, "shards.db"),
+                f"{phase}-{worker_id}",
+                list(range(worker_id, shard_count, workers)),
+                shard_count,
+                duration,
+                worker_id == crash_worker,
+                output,
+            ),
+        )
+        process.start()
+        processes.append(process)
+    for process in processes:
+        process.join()
+
+    results = []
+    for output in outputs:
+        with open(output, encoding="utf-8") as output_file:
+            results.append(json.load(output_file))
+    return results
+
+
+def check(results, tasks, phase, label):
+    sent = [name for result in results for name in result["sent"]]
+    expected = {task.description for task in tasks}
+    counts = {}
+    for name in sent:
+        counts[name] = counts.get(name, 0) + 1
+    missing = expected - set(counts)
+    duplicated = sorted(name for name, count in counts.items() if count > 1)
+    stray = sorted(name for name in counts if not name.startswith(f"phase{phase} "))
+    print(
+        f"{label}: {len(expected)} tasks, {len(sent)} reminded, "
+        f"{len(missing)} missing, {len(duplicated)} duplicated, {len(stray)} from another phase"
+    )
+    for result in results:
+        print(f"  worker {result['worker']}: shards {result['held']}, {len(result['sent'])} tasks")
+    return not (missing or duplicated or stray)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sharded reminder check")
+    parser.add_argument("--workers", type=int, default=3)
+    parser.add_argument("--shards", type=int, default=8)
+    parser.add_argument("--guilds", type=int, default=200)
+    parser.add_argument("--tasks", type=int, default=2000, help="tasks per phase")
+    parser.add_argument("--owners", type=int, default=50, help="owners per phase")
+    parser.add_argument("--duration", type=float, default=LEASE_TTL * 2, help="seconds per phase")
+    args = parser.parse_args()
+    if not 1 <= args.workers < args.shards:
+        parser.error("need fewer workers than shards (phase two adds one)")
+
+    guilds = guild_ids(args.guilds)
+    with tempfile.TemporaryDirectory() as workdir:
+        db_name = os.path.join(workdir, "tasks.db")
+        first = make_tasks(1, args.tasks, guilds, range(1000, 1000 + args.owners), 1)
+        add_tasks(db_name, first)
+        started = time.perf_counter()
+        results = run_phase(workdir, 1, args.workers, args.shards, args.duration, crash_worker=0)
+        ok = check(results, first, 1, f"phase 1 ({args.workers} workers, worker 0 crashes)")
+
+        # New owners, so their hourly slot isn't already taken by phase one
+        second = make_tasks(2, args.tasks, guilds, range(2000, 2000 + args.owners), 2)
+        add_tasks(db_name, second)
+        # Long enough for the crashed worker's leases to expire and be taken
+        results = run_phase(
+            workdir, 2, args.workers + 1, args.shards, args.duration + LEASE_TTL
+        )
+        ok = check(results, second, 2, f"phase 2 ({args.workers + 1} workers, rebalanced)") and ok
+        print(f"{time.perf_counter() - started:.1f}s, {'OK' if ok else 'FAILED'}")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
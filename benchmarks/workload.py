@@ -0,0 +1,64 @@
+from datetime import date
+import random
+
+# Synthetic task data for the benchmarks. Due dates are spread from a few
+# days overdue to three months out, and a share of the tasks is completed,
+# so every reminder bucket and the overdue cleanup have work to do.
+
+TENANTS = 20  # owners the tasks are spread across
+GUILD_ID = 1
+OVERDUE_DAYS = 10  # earliest due date, in days before today
+HORIZON_DAYS = 90  # latest due date, in days after today
+COMPLETED_SHARE = 0.2
+
+
+def owner_ids(tenants=TENANTS):
+    return [1000 + owner for owner in range(tenants)]
+
+
+# Task rows as the workbook stores them:
+# description, due date, status, task ID, guild ID, owner ID
+def make_rows(count, tenants=TENANTS, seed=0):
+    rng = random.Random(seed)
+    today = date.today().toordinal()
+    owners = owner_ids(tenants)
+    rows = []
+    for task_id in range(1, count + 1):
+        due = date.fromordinal(today + rng.randint(-OVERDUE_DAYS, HORIZON_DAYS))
+        status = "C" if rng.random() < COMPLETED_SHARE else "P"
+        description = f"Synthetic task {task_id} " + "x" * rng.randint(0, 40)
+        rows.append([description, due, status, task_id, GUILD_ID, rng.choice(owners)])
+    return rows
+
+
+# Writes a workbook (and no snapshot cache) holding `count` tasks
+def write_workbook(file_name, count, seed=0):
+    from database import ExcelHandler
+
+    handler = ExcelHandler(file_name)
+    handler.write_workbook(make_rows(count, seed=seed), count + 1)
+
+
+# Fills a SQLite database with `count` tasks
+def write_database(file_name, count, seed=0):
+    from sqlite_handler import SQLiteHandler
+
+    handler = SQLiteHandler(file_name)
+    handler.setup()
+    handler.add_many(
+        [
+            (task_id, description, due, status, guild_id, owner_id)
+            for description, due, status, task_id, guild_id, owner_id in make_rows(
+                count, seed=seed
+            )
+        ]
+    )
+    handler.close()
+
+
+# CSV body for /import
+def make_csv(count, seed=0):
+    lines = ["description,due_date,status"]
+    for description, due, status, *_ in make_rows(count, seed=seed):
+        lines.append(f"{description},{due.isoformat()},{status}")
+    return "\n".join(lines).encode("utf-8")
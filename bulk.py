@@ -0,0 +1,79 @@
+# Parsing helpers for the bulk commands (/complete, /remove, /import)
+from database import Task
+import csv
+import io
+
+MAX_BULK_IDS = 1000  # cap on how many IDs one command may touch
+MAX_IMPORT_ROWS = 50000
+
+
+# "3,5,9-14" -> [3, 5, 9, 10, 11, 12, 13, 14]
+def parse_id_list(text):
+    task_ids = []
+    for part in text.replace(" ", "").split(","):
+        if not part:
+            continue
+        if "-" in part:
+            start, _, end = part.partition("-")
+            if not (start.isdigit() and end.isdigit()) or int(start) > int(end):
+                raise ValueError(f"Invalid range '{part}'")
+            if int(end) - int(start) >= MAX_BULK_IDS:
+                raise ValueError(f"Too many tasks, the limit is {MAX_BULK_IDS} per command")
+            task_ids.extend(range(int(start), int(end) + 1))
+        elif part.isdigit():
+            task_ids.append(int(part))
+        else:
+            raise ValueError(f"Invalid Task ID '{part}'")
+
+        if len(task_ids) > MAX_BULK_IDS:
+            raise ValueError(f"Too many tasks, the limit is {MAX_BULK_IDS} per command")
+
+    if not task_ids:
+        raise ValueError("No Task IDs given")
+    return list(dict.fromkeys(task_ids))  # drop duplicates, keep order
+
+
+# [3, 5, 9, 10, 11] -> "3, 5, 9-11" (for replies)
+def format_id_list(task_ids):
+    parts = []
+    task_ids = sorted(task_ids)
+    start = previous = None
+    for task_id in task_ids + [None]:
+        if previous is not None and task_id == previous + 1:
+            previous = task_id
+            continue
+        if start is not None:
+            parts.append(str(start) if start == previous else f"{start}-{previous}")
+        start = previous = task_id
+    return ", ".join(parts)
+
+
+# Reads "description,due_date[,status]" rows (a header row is optional).
+# Returns the tasks plus a list of error messages for rows that were skipped.
+def parse_task_csv(text, guild_id, owner_id):
+    tasks = []
+    errors = []
+    for line_number, row in enumerate(csv.reader(io.StringIO(text)), start=1):
+        if not row or not any(cell.strip() for cell in row):
+            continue
+        if line_number == 1 and row[0].strip().lower() in ("description", "task description"):
+            continue  # header
+        if len(row) < 2:
+            errors.append(f"Line {line_number}: expected description,due_date[,status]")
+            continue
+        if len(tasks) >= MAX_IMPORT_ROWS:
+            errors.append(f"Stopped after {MAX_IMPORT_ROWS} tasks")
+            break
+
+        description = row[0].strip()
+        status = row[2].strip().upper() if len(row) > 2 and row[2].strip() else "P"
+        task = Task(description, row[1].strip(), status, guild_id=guild_id, owner_id=owner_id)
+        if not description:
+            errors.append(f"Line {line_number}: empty description")
+        elif task.due_ordinal is None:
+            errors.append(f"Line {line_number}: invalid due date '{row[1].strip()}'")
+        elif status not in ("P", "C"):
+            errors.append(f"Line {line_number}: status must be P or C")
+        else:
+            tasks.append(task)
+    return tasks, errors
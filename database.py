@@ -1,32 +1,116 @@
-import openpyxl
-from openpyxl import Workbook
-from datetime import datetime
+from storage import TaskStorage
+from task_table import TaskTable
+from journal import Journal, fsync_directory
+from metrics import metrics
+from xlsx_export import ChunkedSheet, save_rows
+from datetime import date, datetime
+from functools import lru_cache
+from itertools import islice
+import logging
+import threading
+import pickle
+import time
 import os
 
+logger = logging.getLogger(__name__)
 
+DATE_FORMATS = ["%d-%m-%Y", "%Y-%m-%d", "%d/%m/%Y", "%d-%B-%Y"]
+
+
+# Parses user input or a stored value into a date (None if it isn't one).
+# Memoized: the same few due dates come up again and again.
+@lru_cache(maxsize=4096)
+def parse_date(text):
+    text = text.strip()
+    try:
+        return date.fromisoformat(text)  # fast path for SQLite / ISO input
+    except ValueError:
+        pass
+    # Attempt to parse the date in various common formats
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+# Accepts date/datetime cells as-is and parses strings
+def parse_due_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if isinstance(value, str):
+        return parse_date(value)
+    return None
+
+
+@lru_cache(maxsize=4096)
+def display_date(due):
+    return due.strftime("%d-%B-%Y")  # Output in date-Month-Year format
+
+
+# Immutable, slotted task record. Stores get a new copy via replace()
+# rather than editing one in place, so tasks can be shared between readers.
 class Task:
-    def __init__(self, description, due_date, status, index=0):
-        self.index = index
-        self.description = description
-        self.due_date = self.format_date(due_date)
-        self.status = status
+    __slots__ = (
+        "index",
+        "description",
+        "due",
+        "due_ordinal",
+        "status",
+        "guild_id",
+        "owner_id",
+    )
+
+    def __init__(self, description, due_date, status, index=0, guild_id=0, owner_id=0):
+        due = parse_due_date(due_date)
+        set_field = object.__setattr__
+        set_field(self, "index", index)
+        set_field(self, "description", description)
+        # Parsed once; reminders and filters work on the ordinal. An
+        # unparsable due date is kept as given (due_ordinal is then None).
+        set_field(self, "due", due if due else due_date)
+        set_field(self, "due_ordinal", due.toordinal() if due else None)
+        set_field(self, "status", status)
+        set_field(self, "guild_id", guild_id)  # 0 for tasks created in DMs
+        set_field(self, "owner_id", owner_id)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Task is immutable, use replace()")
+
+    # Copy of the task with some fields changed
+    def replace(self, **changes):
+        fields = {
+            "description": self.description,
+            "due_date": self.due,
+            "status": self.status,
+            "index": self.index,
+            "guild_id": self.guild_id,
+            "owner_id": self.owner_id,
+        }
+        fields.update(changes)
+        return Task(**fields)
+
+    # Partition key: every guild/owner pair has its own task list
+    @property
+    def tenant(self):
+        return (self.guild_id, self.owner_id)
+
+    # Due date for display
+    @property
+    def due_date(self):
+        if self.due_ordinal is None:
+            return "Error formatting date: Invalid date format"
+        return display_date(self.due)
 
     @staticmethod
     def format_date(date_str):
-        try:
-            # Attempt to parse the date in various common formats
-            date_formats = ["%d-%m-%Y", "%Y-%m-%d", "%d/%m/%Y", "%d-%B-%Y"]
-            for fmt in date_formats:
-                try:
-                    parsed_date = datetime.strptime(date_str, fmt)
-                    return parsed_date.strftime(
-                        "%d-%B-%Y"
-                    )  # Output in date-Month-Year format
-                except ValueError:
-                    continue
-            raise ValueError("Invalid date format")  # If no format matches
-        except Exception as e:
-            return f"Error formatting date: {e}"
+        due = parse_due_date(date_str)
+        if due is None:
+            return "Error formatting date: Invalid date format"
+        return display_date(due)
 
     # Output!
     def __str__(self):
@@ -34,146 +118,507 @@ class Task:
         return f"{self.index}.\nTask: '{self.description}'\nDue Date: {self.due_date}\nCurrent status: {self.status}\n"
 
 
-class ExcelHandler:
+# Columns of the "Pending" sheet. New columns go last so older files still
+# line up; rows missing an ID or owner get them the first time they load.
+HEADERS = ["Task Description", "Due Date", "Status", "Task ID", "Guild ID", "Owner ID"]
+
+# Bumped whenever the pickled TaskTable layout changes
+CACHE_VERSION = 1
 
-    def __init__(self, file_name):
+
+class ExcelHandler(TaskStorage):
+
+    def __init__(
+        self, file_name, flush_interval=5.0, flush_threshold=50, default_tenant=(0, 0)
+    ):
         self.file_name = file_name
-        self.workbook = Workbook()
+        # Pickled task table from the last flush, keyed by the workbook's
+        # mtime and size. Starting from it skips parsing the workbook (and
+        # importing openpyxl) entirely.
+        self.cache_name = file_name + ".cache"
+
+        # In-memory task table -- the source of truth. Columnar and indexed
+        # by task ID (with per-tenant partitions), so lookups, completes and
+        # removes by ID are O(1). Due dates are written to the sheet as
+        # native date cells. The sheet is written behind it.
+        self.table = TaskTable()
+        self.next_id = 1  # IDs are never reused, even after deletes
+        self.default_tenant = default_tenant  # owner of rows from older files
 
-    # Set Headers:
-    def set_headers(self, worksheet1):
-        header_text = ["Task Description", "Due Date", "Status"]
-        worksheet1.append(header_text)
-        print(f"Created Sheets {worksheet1.title}")
+        # Every change is appended (and fsync'd) to the journal first; the
+        # workbook is a snapshot compacted from it in the background, so a
+        # crash mid-save can't lose or corrupt tasks.
+        self.journal = Journal(file_name + ".journal")
 
-    # sets up the Workbook!
+        # The sheet XML is kept in chunks of task IDs, and a save only
+        # re-serializes the chunks with changed rows (None = rebuild all)
+        self.sheet = ChunkedSheet()
+        self.changed = None
+        self.lock = threading.RLock()
+        self.save_lock = threading.Lock()
+
+        # Write-behind settings: flush after `flush_interval` seconds or once
+        # `flush_threshold` mutations have piled up, whichever comes first.
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self.dirty = 0
+        self.flush_event = threading.Event()
+        self.stop_event = threading.Event()
+        self.flusher = None
+
+    # sets up the Workbook! The snapshot cache is tried first; the workbook
+    # itself is only parsed when the cache is missing or stale.
     def workbook_setup(self):
         if os.path.exists(self.file_name):
-            self.workbook = openpyxl.load_workbook(self.file_name)
-            print(f"Workbook has been loaded!")
+            with self.lock:
+                if self.load_cache():
+                    logger.info("Loaded %d tasks from the snapshot cache", len(self.table))
+                else:
+                    self.load_workbook()
+                    if not self.dirty:
+                        self.save_cache(self.table.copy(), self.next_id)
+        else:
+            self.write_workbook([], self.next_id)
+            logger.info("New Workbook has been created!")
 
-            # checks for headers in Already existing sheet:
-            if self.workbook:
-                workheet = self.workbook["Pending"]
+        self.recover()
+        self.start_flusher()
 
-        else:
-            del self.workbook["Sheet"]
-            worksheet_pending = self.workbook.create_sheet(title="Pending")
+    # Streams the rows out of the file. Read-only mode parses the sheet
+    # lazily instead of building every cell in memory first.
+    def load_workbook(self):
+        import openpyxl  # Imported here: only needed when the cache is stale
+
+        workbook = openpyxl.load_workbook(self.file_name, read_only=True)
+        try:
+            next_id = self.read_next_id(workbook)
+            self.load_rows(
+                workbook["Pending"].iter_rows(min_row=2, values_only=True), next_id
+            )
+        finally:
+            workbook.close()
+        logger.info("Workbook has been loaded!")
 
-            # headers Setup:
-            self.set_headers(worksheet_pending)
-            self.workbook.save(self.file_name)
-            print(f"New Workbook has been created!")
+    def cache_key(self):
+        stat = os.stat(self.file_name)
+        return (stat.st_mtime_ns, stat.st_size)
 
-    # Writes to the Workbook!
-    def add_tasks(self, task: Task):
-        worksheet = self.workbook["Pending"]
-        row_data = [task.description, task.due_date, task.status]
-        worksheet.append(row_data)
-        self.workbook.save(self.file_name)
-        print(
-            f"DEBUG: Adding task - {task.description}, {task.due_date}, {task.status}"
-        )  # Debugging line
-        return True
-
-    # Reading from the Workbook!
-    def get_tasks(self):
-        tasks_list = []
-        worksheet = self.workbook["Pending"]
-
-        # Reads the Data:
-        for index, row in enumerate(
-            worksheet.iter_rows(min_row=2, values_only=True), start=1
-        ):
+    # Restores the table pickled at the last flush if the workbook hasn't
+    # changed since. The cache is our own file, written next to the workbook.
+    def load_cache(self):
+        if not os.path.exists(self.cache_name):
+            return False
+        try:
+            with open(self.cache_name, "rb") as cache_file:
+                cache = pickle.load(cache_file)
+            if cache["version"] != CACHE_VERSION or cache["key"] != self.cache_key():
+                return False
+            self.table = cache["table"]
+            self.next_id = cache["next_id"]
+            return True
+        except Exception as e:
+            logger.warning("Ignoring unreadable snapshot cache: %s", e)
+            return False
+
+    def save_cache(self, table, next_id):
+        cache = {
+            "version": CACHE_VERSION,
+            "key": self.cache_key(),
+            "next_id": next_id,
+            "table": table,
+        }
+        temp_name = self.cache_name + ".tmp"
+        try:
+            with open(temp_name, "wb") as cache_file:
+                pickle.dump(cache, cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_name, self.cache_name)
+        except Exception as e:
+            logger.error("Error writing snapshot cache: %s", e)
+
+    # Replays the journal over the snapshot that was just loaded
+    def recover(self):
+        with self.lock:
+            replayed = 0
+            for record in self.journal.replay():
+                try:
+                    self.apply_record(record)
+                    replayed += 1
+                except Exception as e:
+                    logger.warning("Skipping journal record %s: %s", record, e)
+            if replayed:
+                logger.info("Recovered %d changes from the journal", replayed)
+                self.mark_dirty(replayed)
+            self.journal.open()
+
+    # Journal records for each kind of change
+    @staticmethod
+    def add_record(task):
+        due = task.due
+        if isinstance(due, date):
+            due = due.isoformat()
+        elif due is not None:
+            due = str(due)
+        return {
+            "op": "add",
+            "id": task.index,
+            "description": task.description,
+            "due": due,
+            "status": task.status,
+            "guild": task.guild_id,
+            "owner": task.owner_id,
+        }
+
+    @staticmethod
+    def status_record(task_id, status):
+        return {"op": "status", "id": task_id, "status": status}
+
+    @staticmethod
+    def delete_record(task_id):
+        return {"op": "delete", "id": task_id}
+
+    # Applies one journal record to the table (idempotent)
+    def apply_record(self, record):
+        task_id = record["id"]
+        if record["op"] == "add":
+            if task_id not in self.table:
+                self.table.insert(
+                    task_id,
+                    record["description"],
+                    parse_due_date(record["due"]) or record["due"],
+                    record["status"],
+                    record["guild"],
+                    record["owner"],
+                )
+            self.next_id = max(self.next_id, task_id + 1)
+        elif record["op"] == "status":
+            self.table.set_status(task_id, record["status"])
+        elif record["op"] == "delete":
+            self.table.remove(task_id)
+        if self.changed is not None:
+            self.changed.add(task_id)
+
+    def setup(self):
+        self.workbook_setup()
+
+    # Builds the task table from the sheet, assigning IDs to old rows
+    def load_rows(self, sheet_rows, next_id=1):
+        self.table = TaskTable()
+        unnumbered = []
+        upgraded = 0
+        for row in sheet_rows:
+            if not row or len(row) < 3 or row[0] is None:
+                continue
+            row = list(row) + [None] * (len(HEADERS) - len(row))
+            description, due_date, status, task_id, guild_id, owner_id = row[:6]
+            if guild_id is None or owner_id is None:
+                guild_id, owner_id = self.default_tenant
+                upgraded += 1
+            # Old files hold "%d-%B-%Y" text; parse it once into a date
+            due_date = parse_due_date(due_date) or due_date
+            row_data = [description, due_date, status, guild_id, owner_id]
+            if isinstance(task_id, int) and task_id not in self.table:
+                self.table.insert(task_id, *row_data)
+            else:
+                unnumbered.append(row_data)
+
+        self.next_id = max(next_id, max(self.table.slots, default=0) + 1)
+        for row_data in unnumbered:
+            self.table.insert(self.next_id, *row_data)
+            self.next_id += 1
+        if unnumbered or upgraded:
+            logger.info(
+                "Upgraded %d rows to the new columns", max(len(unnumbered), upgraded)
+            )
+            self.mark_dirty(max(len(unnumbered), upgraded))
+
+    # The ID counter lives in a hidden "Meta" sheet so it survives restarts
+    @staticmethod
+    def read_next_id(workbook):
+        if "Meta" not in workbook.sheetnames:
+            return 1
+        value = workbook["Meta"]["B1"].value
+        return value if isinstance(value, int) else 1
+
+    # Writes a complete workbook beside the old file and swaps it in, so the
+    # previous snapshot stays intact until the new one is complete
+    def write_workbook(self, rows, next_id):
+        self.replace_workbook(lambda target: save_rows(target, HEADERS, rows, next_id))
+
+    # Writes the new workbook to a temp file with `write(file)`, syncs it,
+    # renames it over the old one and syncs the directory, so after a power
+    # cut the file is either the old snapshot or the new one, never torn
+    def replace_workbook(self, write):
+        temp_name = self.file_name + ".tmp"
+        with open(temp_name, "wb") as temp_file:
+            write(temp_file)
+            temp_file.flush()
+            os.fsync(temp_file.fileno())
+        os.replace(temp_name, self.file_name)
+        fsync_directory(self.file_name)
+
+    # Starts the background write-behind thread
+    def start_flusher(self):
+        if self.flusher and self.flusher.is_alive():
+            return
+        self.stop_event.clear()
+        self.flusher = threading.Thread(
+            target=self.flush_loop, name="excel-flusher", daemon=True
+        )
+        self.flusher.start()
+
+    def flush_loop(self):
+        while not self.stop_event.is_set():
+            self.flush_event.wait(self.flush_interval)
+            self.flush_event.clear()
             try:
-                if row and len(row) >= 3:
-                    description, due_date, status = row
-                    print(f"Task ID: {index}, Description: {description}")
-                    task_obj = Task(
-                        index=index,
-                        description=description,
-                        due_date=due_date,
-                        status=status,
-                    )
-                    tasks_list.append(task_obj)
-                    print(task_obj)
-                else:
-                    print(f"Skipping incomplete row: {row}")
+                self.flush()
             except Exception as e:
-                print(f"Error processing row {index}: {e}")
-                continue
+                logger.exception("Error flushing workbook: %s", e)
+
+    # Records a mutation and wakes the flusher once enough have piled up
+    def mark_dirty(self, count=1):
+        if not count:
+            return
+        self.dirty += count
+        if self.dirty >= self.flush_threshold:
+            self.flush_event.set()
+
+    # Compaction: writes the in-memory table out as a new workbook snapshot
+    # (coalescing all pending mutations), then drops the journal it covers.
+    # Only copying the table happens under the lock; the save runs beside it
+    # and only re-serializes the sheet chunks that changed.
+    def flush(self):
+        with self.save_lock:
+            with self.lock:
+                if not self.dirty:
+                    return False
+                table = self.table.copy()
+                next_id = self.next_id
+                flushed = self.dirty
+                self.dirty = 0
+                changed, self.changed = self.changed, set()
+                self.journal.rotate()
+
+            started = time.perf_counter()
+            try:
+                rebuilt = self.sheet.update(table, changed)
+                self.replace_workbook(
+                    lambda target: self.sheet.save(target, HEADERS, next_id)
+                )
+                # Only once the new snapshot is durable
+                self.journal.discard_rotated()
+            except Exception:
+                # Keep the mutations pending so the next flush retries them;
+                # which rows changed is lost, so the sheet is rebuilt
+                with self.lock:
+                    self.dirty += flushed
+                self.sheet.reset()
+                raise
+
+            self.save_cache(table, next_id)
+            metrics.observe("workbook_flush_seconds", time.perf_counter() - started)
+            logger.info(
+                "Workbook flushed (%d changes, %d tasks, %d chunks rebuilt)",
+                flushed,
+                len(table),
+                rebuilt,
+            )
+            return True
+
+    # Flush-on-shutdown hook
+    def close(self):
+        self.stop_event.set()
+        self.flush_event.set()
+        if self.flusher and self.flusher.is_alive():
+            self.flusher.join()
+        self.flusher = None
+        self.flush()
+        self.journal.close()
 
-        return tasks_list
+    # Write-ahead: log the records, then apply them to the table
+    def commit(self, records):
+        self.journal.append_many(records)
+        for record in records:
+            self.apply_record(record)
+        self.mark_dirty(len(records))
+
+    # Writes to the Workbook! Returns the stored task with its new ID.
+    def add_tasks(self, task: Task):
+        with self.lock:
+            task = task.replace(index=self.next_id)
+            self.commit([self.add_record(task)])
+        logger.debug("Added task %d - %s", task.index, task.description)
+        return task
+
+    # Bulk insert: all tasks go in under one lock, one fsync and one flush
+    def add_many_tasks(self, tasks):
+        with self.lock:
+            stored = [
+                task.replace(index=self.next_id + offset)
+                for offset, task in enumerate(tasks)
+            ]
+            self.commit([self.add_record(task) for task in stored])
+        logger.debug("Added %d tasks", len(stored))
+        return stored
+
+    # Reading from the Workbook! Pass a guild and owner to read only their
+    # partition; without them every task is returned (used by Reminder).
+    def get_tasks(self, guild_id=None, owner_id=None):
+        with self.lock:
+            if guild_id is None and owner_id is None:
+                task_ids = self.table.ordered_ids()
+            else:
+                task_ids = list(self.table.tenant_ids((guild_id, owner_id)))
+            return [self.table.task(task_id) for task_id in task_ids]
+
+    # Streams matching tasks in ID order. Only the matching IDs are taken up
+    # front; each Task is built when the caller reaches it (tasks removed in
+    # the meantime are skipped), so callers can stop early for free. A date
+    # range over every tenant (the reminder sweep, overdue cleanup) is read
+    # from the due-date index and only its k matches are sorted.
+    def iter_tasks(
+        self, guild_id=None, owner_id=None, status=None, due_from=None, due_to=None
+    ):
+        low = due_from.toordinal() if due_from else None
+        high = due_to.toordinal() if due_to else None
+        with self.lock:
+            if guild_id is None and owner_id is None and (low or high):
+                task_ids = sorted(self.table.due_between(low, high, status))
+            else:
+                partition = None
+                if guild_id is not None or owner_id is not None:
+                    partition = self.table.tenant_ids((guild_id, owner_id))
+                task_ids = self.table.select(status, low, high, task_ids=partition)
+
+        for task_id in task_ids:
+            with self.lock:
+                task = self.table.task(task_id)
+            if task is not None:
+                yield task
+
+    # One page of a tenant's tasks plus the total that match the filters.
+    # Unfiltered pages only walk the partition up to the requested slice;
+    # filtered ones are one scan over the partition's status/due columns.
+    def get_page(
+        self, guild_id, owner_id, offset, limit, status=None, due_from=None, due_to=None
+    ):
+        with self.lock:
+            partition = self.table.tenant_ids((guild_id, owner_id))
+            if status is None and due_from is None and due_to is None:
+                total = len(partition)
+                task_ids = list(islice(partition, offset, offset + limit))
+            else:
+                task_ids = self.table.select(
+                    status,
+                    due_from.toordinal() if due_from else None,
+                    due_to.toordinal() if due_to else None,
+                    task_ids=partition,
+                )
+                total = len(task_ids)
+                task_ids = task_ids[offset : offset + limit]
+            return [self.table.task(task_id) for task_id in task_ids], total
+
+    # Tasks due in an inclusive date range (either end open), earliest
+    # first, answered from the sorted due-date index
+    def get_due_between(self, due_from=None, due_to=None, status=None):
+        with self.lock:
+            task_ids = self.table.due_between(
+                due_from.toordinal() if due_from else None,
+                due_to.toordinal() if due_to else None,
+                status,
+            )
+            return [self.table.task(task_id) for task_id in task_ids]
+
+    # Looks up a single task by ID
+    def get_task(self, task_id):
+        with self.lock:
+            return self.table.task(int(task_id))
 
     # Updating Status of the Task
     def complete_task(self, task_id, new_details):
-        worksheet = self.workbook["Pending"]
         task_id = int(task_id)
 
         # Edge Cases fix:
         valid_statuses = ["P", "C"]
         if new_details not in valid_statuses:
-            print(
-                f"Invalid status '{new_details}'. Use 'C' for Completed or 'P' for Pending."
+            logger.warning(
+                "Invalid status '%s'. Use 'C' for Completed or 'P' for Pending.",
+                new_details,
             )
             return
 
-        for index, row in enumerate(worksheet.iter_rows(min_row=2), start=1):
-            if index == task_id:
-                row[2].value = new_details  # Row2 == Status column
-                self.workbook.save(self.file_name)
-                print(f"{task_id} marked as Completed")
+        with self.lock:
+            if task_id in self.table:
+                self.commit([self.status_record(task_id, new_details)])
+                logger.debug("%d marked as Completed", task_id)
                 return
 
+    # Bulk status change in one pass. With remove=True the tasks are taken out
+    # in the same step (what /complete does). `tenant` skips other users' IDs.
+    def complete_tasks(self, task_ids, new_details, remove=False, tenant=None):
+        if new_details not in ["P", "C"]:
+            logger.warning(
+                "Invalid status '%s'. Use 'C' for Completed or 'P' for Pending.",
+                new_details,
+            )
+            return []
+
+        with self.lock:
+            changed = self.owned_tasks(task_ids, tenant)
+            if remove:
+                self.commit([self.delete_record(task.index) for task in changed])
+            else:
+                self.commit(
+                    [self.status_record(task.index, new_details) for task in changed]
+                )
+        logger.debug("%d tasks marked as %s", len(changed), new_details)
+        return [task.replace(status=new_details) for task in changed]
+
+    # Bulk delete; returns the tasks that were removed
+    def delete_tasks(self, task_ids, tenant=None):
+        with self.lock:
+            removed = self.owned_tasks(task_ids, tenant)
+            self.commit([self.delete_record(task.index) for task in removed])
+        logger.debug("Deleted %d tasks", len(removed))
+        return removed
+
+    # Existing tasks among `task_ids` (only `tenant`'s when given)
+    def owned_tasks(self, task_ids, tenant=None):
+        tasks = []
+        for task_id in dict.fromkeys(int(task_id) for task_id in task_ids):
+            task = self.table.task(task_id)
+            if task is not None and (tenant is None or task.tenant == tenant):
+                tasks.append(task)
+        return tasks
+
     # Moving Completed Tasks
     def delete_completed_task(self):
-        pending_worksheet = self.workbook["Pending"]
-        rows_to_delete = []
-
-        for row_index, row in enumerate(
-            pending_worksheet.iter_rows(min_row=2), start=2
-        ):  # Skip header
-            if row[2].value == "C":  # Column 3 = Status
-                rows_to_delete.append(row_index)
+        with self.lock:
+            completed = self.table.select(status="C")
 
-        if not rows_to_delete:
-            print("No completed tasks to delete.")
-            return
+            if not completed:
+                logger.debug("No completed tasks to delete.")
+                return []
 
-        for row_index in reversed(rows_to_delete):
-            pending_worksheet.delete_rows(row_index)
-            print(f"Deleted completed task at row {row_index}")
+            self.commit([self.delete_record(task_id) for task_id in completed])
 
-        self.workbook.save(self.file_name)
-        print("All completed tasks deleted.")
+        logger.debug("All completed tasks deleted (%d).", len(completed))
+        return completed
 
     # Deleting Tasks:
     def delete_task(self, task_id):
         # Validate the task_id
-        if not task_id.isdigit():
-            print(f"Invalid Task ID: '{task_id}'. Please choose Numeric Values only")
+        if not str(task_id).isdigit():
+            logger.warning(
+                "Invalid Task ID: '%s'. Please choose Numeric Values only", task_id
+            )
             return False
 
-        worksheet = self.workbook["Pending"]
-        print(f"Searching for Task ID '{task_id}' in sheet: {worksheet}")
-
-        # Start enumerating from 1 while manually skipping the header
-        task_deleted = False
-        for row_index, row in enumerate(worksheet.iter_rows(min_row=1), start=1):
-            if row_index == 1:  # Skip the header row explicitly
-                continue
-
-            # Check if task_id matches the row index (adjust for Python's indexing)
-            if str(row_index - 1) == str(
-                task_id
-            ):  # Subtract 1 to align with task numbering logic
-                worksheet.delete_rows(row_index)  # Delete the row
-                self.workbook.save(self.file_name)  # Save the updated workbook
-                print(
-                    f"Task ID '{task_id}' successfully deleted from sheet: {worksheet}."
-                )
-                task_deleted = True
-                break
+        with self.lock:
+            if int(task_id) in self.table:
+                self.commit([self.delete_record(int(task_id))])
+                logger.debug("Task ID '%s' successfully deleted.", task_id)
+                return True
 
-        print(f"Task ID '{task_id}' not found in sheet: {worksheet}.")
-        return task_deleted
+        logger.debug("Task ID '%s' not found.", task_id)
+        return False
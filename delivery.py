@@ -0,0 +1,263 @@
+from collections import deque
+from metrics import metrics
+import discord
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_LIMIT = 2000  # Discord's per-message character limit
+
+
+# Token bucket: `rate` tokens per second, up to `capacity` saved up
+class TokenBucket:
+
+    def __init__(self, rate, capacity, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self.updated = clock()
+        self.blocked_until = 0
+
+    def refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return now
+
+    # Seconds until a token is available (0 = take one now)
+    def delay(self):
+        now = self.refill()
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.tokens >= 1:
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    async def acquire(self):
+        while True:
+            wait = self.delay()
+            if wait <= 0:
+                self.tokens -= 1
+                return
+            await asyncio.sleep(wait)
+
+    # Called on a 429 -- nothing goes out until Discord says so
+    def penalize(self, retry_after):
+        self.tokens = 0
+        self.blocked_until = max(self.blocked_until, self.clock() + retry_after)
+
+
+# Splits a long message on line breaks so each part fits in one Discord message
+def split_message(text, limit=MESSAGE_LIMIT):
+    parts = []
+    current = ""
+    for line in text.splitlines(keepends=True):
+        while len(line) > limit:
+            if current:
+                parts.append(current)
+                current = ""
+            parts.append(line[:limit])
+            line = line[limit:]
+        if len(current) + len(line) > limit:
+            parts.append(current)
+            current = ""
+        current += line
+    if current.strip():
+        parts.append(current)
+    return parts
+
+
+# (retry_after, is_global) for a 429. Discord marks limits that apply to the
+# whole bot with an X-RateLimit-Global header (or scope "global").
+def rate_limit_details(error, default_delay):
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    retry_after = getattr(error, "retry_after", None)
+    if retry_after is None:
+        try:
+            retry_after = float(headers.get("Retry-After"))
+        except (TypeError, ValueError):
+            retry_after = None
+    is_global = getattr(error, "is_global", None)
+    if is_global is None:
+        is_global = (
+            str(headers.get("X-RateLimit-Global", "")).lower() == "true"
+            or headers.get("X-RateLimit-Scope") == "global"
+        )
+    return retry_after or default_delay, bool(is_global)
+
+
+# Outbound DM queue for reminders.
+#
+# Messages for the same recipient that are still waiting are merged into one,
+# users and DM channels are resolved once and cached, and every send is paced
+# by a global bucket plus a per-channel bucket matching Discord's limits.
+# Failed sends are retried with exponential backoff; 429s pause the channel's
+# bucket for the time Discord asks for, and the global bucket too when the
+# limit is the bot-wide one, so other channels stop sending as well.
+class DeliveryQueue:
+
+    def __init__(
+        self,
+        bot,
+        workers=4,
+        global_rate=45,  # Discord allows 50 requests/second per bot
+        channel_rate=1,  # and about 5 messages per 5 seconds per channel
+        channel_burst=5,
+        max_retries=5,
+        base_delay=1.0,
+    ):
+        self.bot = bot
+        self.workers = workers
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.channel_rate = channel_rate
+        self.channel_burst = channel_burst
+        self.channel_buckets = {}
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+
+        self.pending = {}  # user ID -> message parts waiting to go out
+        self.order = deque()  # user IDs in the order they were queued
+        self.in_flight = set()  # one send per recipient at a time keeps order
+        self.changed = asyncio.Event()
+        self.channels = {}  # user ID -> cached DM channel
+        self.running = []
+
+    def __len__(self):
+        return len(self.pending)
+
+    # Queues a message; merges with anything still waiting for the same user
+    def enqueue(self, user_id, message):
+        if user_id in self.pending:
+            self.pending[user_id].append(message)
+        else:
+            self.pending[user_id] = [message]
+            self.order.append(user_id)
+        self.changed.set()
+
+    def start(self):
+        if not self.running:
+            self.running = [
+                asyncio.create_task(self.worker()) for _ in range(self.workers)
+            ]
+
+    async def stop(self):
+        for task in self.running:
+            task.cancel()
+        await asyncio.gather(*self.running, return_exceptions=True)
+        self.running = []
+
+    # Waits (at most `timeout` seconds) until everything queued so far has
+    # gone out. Returns how many recipients are still waiting.
+    async def drain(self, timeout):
+        deadline = time.monotonic() + timeout
+        while (self.pending or self.in_flight) and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        return len(self.pending) + len(self.in_flight)
+
+    # Cached user -> DM channel lookup, only hits the API the first time
+    async def resolve(self, user_id):
+        channel = self.channels.get(user_id)
+        if channel is None:
+            user = self.bot.get_user(user_id) or await self.bot.fetch_user(user_id)
+            channel = user.dm_channel or await user.create_dm()
+            self.channels[user_id] = channel
+        return channel
+
+    def channel_bucket(self, user_id):
+        bucket = self.channel_buckets.get(user_id)
+        if bucket is None:
+            bucket = TokenBucket(self.channel_rate, self.channel_burst)
+            self.channel_buckets[user_id] = bucket
+        return bucket
+
+    # Next recipient that has messages and isn't already being sent to
+    def take_next(self):
+        for _ in range(len(self.order)):
+            user_id = self.order.popleft()
+            if user_id in self.in_flight:
+                self.order.append(user_id)
+                continue
+            self.in_flight.add(user_id)
+            return user_id, self.pending.pop(user_id)
+        return None
+
+    async def worker(self):
+        while True:
+            job = self.take_next()
+            if job is None:
+                self.changed.clear()
+                await self.changed.wait()
+                continue
+
+            user_id, messages = job
+            try:
+                await self.deliver(user_id, "\n".join(messages))
+            finally:
+                self.in_flight.discard(user_id)
+                self.changed.set()
+
+    async def deliver(self, user_id, message):
+        started = time.perf_counter()
+        delivered = True
+        for part in split_message(message):
+            if not await self.send_with_retry(user_id, part):
+                delivered = False
+                break
+        metrics.observe("reminder_delivery_seconds", time.perf_counter() - started)
+        metrics.increment(
+            "reminder_messages_total", result="sent" if delivered else "failed"
+        )
+        return delivered
+
+    async def send_with_retry(self, user_id, text):
+        bucket = self.channel_bucket(user_id)
+        for attempt in range(self.max_retries + 1):
+            await bucket.acquire()
+            await self.global_bucket.acquire()
+            try:
+                channel = await self.resolve(user_id)
+                await channel.send(text)
+                return True
+            except discord.Forbidden as e:
+                # DMs closed or the user left -- retrying won't help
+                logger.warning("Cannot DM user %s: %s", user_id, e)
+                self.channels.pop(user_id, None)
+                return False
+            except discord.HTTPException as e:
+                if e.status == 429:
+                    retry_after, is_global = rate_limit_details(e, self.base_delay)
+                    bucket.penalize(retry_after)
+                    if is_global:
+                        self.global_bucket.penalize(retry_after)
+                    metrics.increment(
+                        "discord_rate_limited_total", scope="global" if is_global else "channel"
+                    )
+                    logger.info(
+                        "Rate limited%s sending to %s, retrying in %ss",
+                        " globally" if is_global else "",
+                        user_id,
+                        retry_after,
+                    )
+                    continue
+                error = e
+            except Exception as e:
+                error = e
+
+            if attempt < self.max_retries:
+                delay = self.base_delay * 2**attempt
+                logger.warning(
+                    "Failed to send reminder to %s (%s), retrying in %ss",
+                    user_id,
+                    error,
+                    delay,
+                )
+                self.channels.pop(user_id, None)
+                await asyncio.sleep(delay)
+
+        logger.error(
+            "Giving up on reminder to %s after %d attempts", user_id, self.max_retries + 1
+        )
+        return False
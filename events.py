@@ -0,0 +1,37 @@
+import asyncio
+
+
+# A change to one task, published by the store after a write commits
+class TaskEvent:
+    ADDED = "added"
+    UPDATED = "updated"
+    DELETED = "deleted"
+
+    def __init__(self, kind, task_id, task=None):
+        self.kind = kind
+        self.task_id = task_id
+        self.task = task  # the task as it was; may be None for deletes
+
+    def __repr__(self):
+        return f"TaskEvent({self.kind!r}, {self.task_id!r})"
+
+
+# Fans task events out to every subscriber's queue
+class ChangeFeed:
+
+    def __init__(self):
+        self.subscribers = []
+
+    def subscribe(self):
+        queue = asyncio.Queue()
+        self.subscribers.append(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        if queue in self.subscribers:
+            self.subscribers.remove(queue)
+
+    def publish(self, events):
+        for event in events:
+            for queue in self.subscribers:
+                queue.put_nowait(event)
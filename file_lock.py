@@ -0,0 +1,29 @@
+from contextlib import contextmanager
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: only one bot process per file is supported
+    fcntl = None
+
+# In-process locks per path; flock alone doesn't exclude threads that open
+# the lock file separately on every platform
+thread_locks = {}
+thread_locks_guard = threading.Lock()
+
+
+# Exclusive advisory lock on `path` (created if missing), held for the
+# duration of the block. Lets several worker processes share the archive
+# and recurring-task files.
+@contextmanager
+def file_lock(path):
+    with thread_locks_guard:
+        thread_lock = thread_locks.setdefault(path, threading.Lock())
+    with thread_lock, open(path, "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
@@ -0,0 +1,93 @@
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+
+# Makes a rename or removal in the file's directory durable. Windows can't
+# open a directory to sync it (NTFS journals the rename itself).
+def fsync_directory(file_name):
+    if os.name == "nt":
+        return
+    descriptor = os.open(os.path.dirname(os.path.abspath(file_name)), os.O_RDONLY)
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
+
+
+# Append-only mutation log.
+#
+# Every change to the task table is written as one JSON line and fsync'd
+# before the call returns, so a write costs one small append no matter how
+# big the table is. Compaction rotates the log aside, writes a fresh
+# snapshot, then discards the rotated part. Recovery replays the rotated
+# part (if a crash interrupted compaction) and then the live log on top of
+# the last snapshot. Records are idempotent, so replaying one that already
+# made it into the snapshot is harmless.
+class Journal:
+
+    def __init__(self, file_name):
+        self.file_name = file_name
+        self.rotated_name = file_name + ".old"
+        self.file = None
+
+    def open(self):
+        if self.file is None:
+            self.file = open(self.file_name, "a", encoding="utf-8")
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def append(self, record):
+        self.append_many([record])
+
+    # One write and one fsync for the whole batch
+    def append_many(self, records):
+        if not records:
+            return
+        self.open()
+        self.file.write(
+            "".join(json.dumps(record, separators=(",", ":")) + "\n" for record in records)
+        )
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    # Records from the rotated log, then the live one. A torn last line
+    # (crash mid-append) is skipped.
+    def replay(self):
+        for file_name in (self.rotated_name, self.file_name):
+            if not os.path.exists(file_name):
+                continue
+            with open(file_name, encoding="utf-8") as journal_file:
+                for line in journal_file:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        logger.warning("Skipping damaged journal line in %s", file_name)
+
+    # Starts a new live log; what was logged so far waits in the rotated
+    # file until the snapshot that covers it is safely on disk
+    def rotate(self):
+        self.close()
+        if os.path.exists(self.file_name):
+            if os.path.exists(self.rotated_name):
+                # An earlier compaction failed -- keep both parts
+                with open(self.file_name, encoding="utf-8") as live, open(
+                    self.rotated_name, "a", encoding="utf-8"
+                ) as rotated:
+                    rotated.write(live.read())
+                    rotated.flush()
+                    os.fsync(rotated.fileno())
+                os.remove(self.file_name)
+            else:
+                os.replace(self.file_name, self.rotated_name)
+        self.open()
+
+    # The snapshot now covers the rotated records
+    def discard_rotated(self):
+        if os.path.exists(self.rotated_name):
+            os.remove(self.rotated_name)
@@ -0,0 +1,115 @@
+from bulk import format_id_list
+from dotenv import load_dotenv
+import argparse
+import logging
+import os
+import signal
+import subprocess
+import sys
+import time
+
+# Runs the bot as several worker processes, each serving a share of the
+# gateway shards (and, through shard leases, the reminders of those shards):
+#
+#     python launcher.py --workers 4 --shards 16
+#
+# Worker w gets shards w, w + workers, w + 2 * workers, ... A worker that
+# exits is restarted after a short pause. Workers share the task database,
+# so more than one needs STORAGE_BACKEND=sqlite (the Excel file belongs to
+# a single process).
+
+logger = logging.getLogger("launcher")
+
+RESTART_DELAY = 5.0  # seconds before restarting a worker that exited
+
+
+def shards_for(worker, workers, shard_count):
+    return list(range(worker, shard_count, workers))
+
+
+def worker_env(worker, workers, shard_count):
+    env = dict(os.environ)
+    env["SHARD_COUNT"] = str(shard_count)
+    env["SHARD_IDS"] = format_id_list(shards_for(worker, workers, shard_count)).replace(" ", "")
+    env["WORKER_ID"] = str(worker)
+    return env
+
+
+def start_worker(worker, workers, shard_count, command):
+    process = subprocess.Popen(command, env=worker_env(worker, workers, shard_count))
+    logger.info(
+        "Worker %d started (pid %d, shards %s)",
+        worker,
+        process.pid,
+        format_id_list(shards_for(worker, workers, shard_count)),
+    )
+    return process
+
+
+def run(workers, shard_count, command):
+    processes = {
+        worker: start_worker(worker, workers, shard_count, command)
+        for worker in range(workers)
+    }
+    restarts = {}  # worker -> when to start it again
+    stopping = []
+
+    def stop(signum, frame):
+        stopping.append(signum)
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    while not stopping:
+        time.sleep(0.5)
+        now = time.monotonic()
+        for worker, process in list(processes.items()):
+            if process.poll() is not None:
+                logger.warning(
+                    "Worker %d exited with %s, restarting in %gs",
+                    worker,
+                    process.returncode,
+                    RESTART_DELAY,
+                )
+                del processes[worker]
+                restarts[worker] = now + RESTART_DELAY
+        for worker, when in list(restarts.items()):
+            if when <= now:
+                del restarts[worker]
+                processes[worker] = start_worker(worker, workers, shard_count, command)
+
+    # Workers release their shard leases and flush pending writes on SIGTERM
+    for process in processes.values():
+        process.terminate()
+    for process in processes.values():
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Run the bot as sharded worker processes")
+    parser.add_argument("--workers", type=int, default=2, help="worker processes")
+    parser.add_argument("--shards", type=int, default=None, help="shards in total (default: workers)")
+    parser.add_argument(
+        "command",
+        nargs=argparse.REMAINDER,
+        help="worker command (default: this Python running main.py)",
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level="INFO", format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    shard_count = args.shards or args.workers
+    if not 1 <= args.workers <= shard_count:
+        parser.error("need at least one worker and no more workers than shards")
+    if args.workers > 1 and os.getenv("STORAGE_BACKEND", "excel").lower() != "sqlite":
+        parser.error("several workers need STORAGE_BACKEND=sqlite")
+
+    command = args.command or [sys.executable, os.path.join(os.path.dirname(__file__), "main.py")]
+    run(args.workers, shard_count, command)
+
+
+if __name__ == "__main__":
+    main()
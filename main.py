@@ -1,19 +1,55 @@
-from database import ExcelHandler, Task
+from database import HEADERS, Task, display_date, parse_due_date
+from storage import create_storage
+from async_store import AsyncTaskStore
 from reminder import Reminder
+from pages import PageCache, PageFilter, TaskPageView, render_task
+from search import TaskSearch
+from recurrence import RecurrenceManager, RecurrenceStore, parse_rule
+from archive import TaskArchive
+from sharding import ShardCoordinator
+from bulk import format_id_list, parse_id_list, parse_task_csv
+from metrics import metrics, start_server, watch_loop_lag
+from xlsx_export import export_tasks
 from dotenv import load_dotenv
 from functools import wraps
 import discord
 from discord.ext import commands
 from discord import app_commands
+from datetime import date
+import asyncio
+import io
+import logging
 import os
+import signal
 
 # FILE NAME FOR DATABASE and TOKEN Setup
 load_dotenv()
 TOKEN = str(os.getenv("TOKEN"))
-CHANNEL_ID_general = int(os.getenv("CHANNEL_ID_general"))
-USER_ID = int(os.getenv("USER_ID"))
-GUILD_ID = int(os.getenv("GUILD_ID"))
-file_name = "database.xlsx"
+CHANNEL_ID_general = int(os.getenv("CHANNEL_ID_general") or 0)
+USER_ID = int(os.getenv("USER_ID") or 0)  # optional: bot owner, gets the startup DM
+GUILD_ID = int(os.getenv("GUILD_ID") or 0)  # optional: sync commands to one guild
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "excel")  # excel | sqlite
+file_name = os.getenv("DATABASE_FILE")  # defaults to database.xlsx / database.db
+FLUSH_INTERVAL = float(os.getenv("FLUSH_INTERVAL", "5"))  # seconds
+FLUSH_THRESHOLD = int(os.getenv("FLUSH_THRESHOLD", "50"))  # pending changes
+MAX_IMPORT_BYTES = 5 * 1024 * 1024  # /import attachment size limit
+READY_TIMEOUT = 2.0  # seconds a command waits for tasks to load at startup
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()  # DEBUG logs every write
+METRICS_PORT = int(os.getenv("METRICS_PORT") or 0)  # 0 = no /metrics endpoint
+SEARCH_LIMIT = 10  # /search results shown
+RECURRING_FILE = os.getenv("RECURRING_FILE", "recurring.json")
+ARCHIVE_FILE = os.getenv("ARCHIVE_FILE", "archive.jsonl.gz")  # done and expired tasks
+HISTORY_PAGE = 10  # /history results per page
+DRAIN_TIMEOUT = 20.0  # seconds queued reminders get to go out on shutdown
+
+# Sharding (see launcher.py): SHARD_COUNT shards in total, of which this
+# process serves SHARD_IDS ("0-3,8"; default all). Unset = one unsharded bot.
+SHARD_COUNT = int(os.getenv("SHARD_COUNT") or 0)
+SHARD_IDS = os.getenv("SHARD_IDS")
+WORKER_ID = os.getenv("WORKER_ID") or str(os.getpid())
+SHARD_LEASES_FILE = os.getenv("SHARD_LEASES_FILE", "shards.db")
+
+logger = logging.getLogger(__name__)
 
 
 # Decorator: Restricting commands to the relevant channel
@@ -51,34 +87,204 @@ def only_general_channel():
     return decorator
 
 
+# Closes the bot in order on Ctrl+C or SIGTERM (how launcher.py stops
+# workers): see shut_down()
+class GracefulClose:
+    shutting_down = None  # shut_down(), shared by every close() call
+
+    async def setup_hook(self):
+        await super().setup_hook()
+        try:
+            asyncio.get_running_loop().add_signal_handler(
+                signal.SIGTERM, lambda: asyncio.create_task(self.close())
+            )
+        except NotImplementedError:  # Windows: shut down as on Ctrl+C
+            signal.signal(signal.SIGTERM, signal.default_int_handler)
+
+    async def close(self):
+        if self.shutting_down is None:
+            self.shutting_down = asyncio.ensure_future(shut_down())
+        await self.shutting_down
+        await super().close()
+
+
+class TaskBot(GracefulClose, commands.Bot):
+    pass
+
+
+class ShardedTaskBot(GracefulClose, commands.AutoShardedBot):
+    pass
+
+
 # Initialize bot and database
-bot = commands.Bot(command_prefix="!", intents=discord.Intents.all())
+if SHARD_COUNT:
+    shard_ids = parse_id_list(SHARD_IDS) if SHARD_IDS else list(range(SHARD_COUNT))
+    bot = ShardedTaskBot(
+        command_prefix="!",
+        intents=discord.Intents.all(),
+        shard_count=SHARD_COUNT,
+        shard_ids=shard_ids,
+    )
+    # Leases on our shards, so only one worker runs their reminders
+    partition = ShardCoordinator(SHARD_LEASES_FILE, WORKER_ID, shard_ids, SHARD_COUNT)
+else:
+    bot = TaskBot(command_prefix="!", intents=discord.Intents.all())
+    partition = None
 tree = bot.tree
-tasks = ExcelHandler(file_name)
-reminder = Reminder(tasks, bot, USER_ID)
-tasks.workbook_setup()
-guild = discord.Object(id=GUILD_ID)
+tasks = create_storage(
+    STORAGE_BACKEND,
+    file_name,
+    FLUSH_INTERVAL,
+    FLUSH_THRESHOLD,
+    default_tenant=(GUILD_ID, USER_ID),  # owner of tasks from single-user files
+)
+archive = TaskArchive(ARCHIVE_FILE)  # completed and expired tasks, for /history
+store = AsyncTaskStore(tasks, archive=archive)  # all disk work runs off the
+# event loop, and the task file is only loaded once the bot starts (see on_ready)
+reminder = Reminder(store, bot, partition=partition)
+page_cache = PageCache(store)  # rendered /show pages, dropped on change
+search_index = TaskSearch(store)  # words -> task IDs, for /search and autocomplete
+recurring = RecurrenceManager(
+    store,
+    RecurrenceStore(RECURRING_FILE),
+    owns=partition.owns if partition is not None else None,
+)  # /recur rules
+
+# Queue depths, read whenever the metrics are collected
+metrics.gauge("storage_calls_in_flight", lambda: store.in_flight)
+metrics.gauge("storage_pending_writes", lambda: getattr(tasks, "dirty", 0))
+metrics.gauge("reminder_queue_depth", lambda: len(reminder.delivery))
+metrics.gauge("scheduled_reminders", lambda: len(reminder.scheduler))
+metrics.gauge("page_cache_pages", lambda: len(page_cache.pages))
+metrics.gauge("search_index_tasks", lambda: len(search_index))
+metrics.gauge("recurring_definitions", lambda: len(recurring.recurrences))
+metrics.gauge("archive_batches", lambda: len(archive.segments))
+if partition is not None:
+    metrics.gauge("shards_held", lambda: len(partition.held), worker=WORKER_ID)
+monitoring = []  # loop-lag watcher and metrics server, started once
+
+# Commands are synced to GUILD_ID when it's set (instant, handy for testing)
+# and globally otherwise, so the bot can serve any number of guilds.
+guild = discord.Object(id=GUILD_ID) if GUILD_ID else None
+
+
+# Tasks are partitioned per guild and per user
+def tenant_of(interaction):
+    return (interaction.guild_id or 0, interaction.user.id)
+
+
+# Summary for /complete and /remove, listing any IDs that weren't found
+def bulk_reply(task_ids, changed, action):
+    done = [task.index for task in changed]
+    missing = sorted(set(task_ids) - set(done))
+    message = f"Task {format_id_list(done)} {action}." if done else "No tasks changed."
+    if missing:
+        message += f"\nNot found: {format_id_list(missing)}"
+    return message[:2000]
+
+
+# Autocomplete choices for a task-ID parameter
+def task_choices(interaction, current):
+    return [
+        app_commands.Choice(name=label[:100], value=value[:100])
+        for label, value in search_index.suggest(tenant_of(interaction), current)
+    ]
+
+
+# Answers right away if the tasks are still loading at startup, instead of
+# letting the interaction time out. `loaded` waits on another startup load
+# (an asyncio.Event, e.g. the search index's) instead of the task store.
+async def store_ready(interaction, loaded=None):
+    try:
+        if loaded is None:
+            await store.wait_ready(READY_TIMEOUT)
+        else:
+            await asyncio.wait_for(loaded.wait(), READY_TIMEOUT)
+        return True
+    except asyncio.TimeoutError:
+        await interaction.response.send_message(
+            "⏳ Tasks are still loading, please try again in a moment.",
+            ephemeral=True,
+        )
+        return False
+
+
+# Parses date options (None stays None). Returns the dates, or None after
+# telling the user one of them isn't a date.
+async def date_options(interaction, *values):
+    dates = []
+    for value in values:
+        due = None if value is None else parse_due_date(value)
+        if value is not None and due is None:
+            await interaction.response.send_message(
+                "❌ Error formatting date: Invalid date format", ephemeral=True
+            )
+            return None
+        dates.append(due)
+    return dates
+
+
+# Starts the event-loop lag watcher and, if METRICS_PORT is set, the local
+# Prometheus endpoint
+async def start_monitoring():
+    if monitoring:
+        return
+    monitoring.append(asyncio.create_task(watch_loop_lag(metrics)))
+    if METRICS_PORT:
+        monitoring.append(await start_server(metrics, port=METRICS_PORT))
+
+
+# Shard leases changed hands: reminders and recurring tasks follow them
+async def on_shards_changed(gained, lost):
+    await reminder.rebalance(gained, lost)
+    if gained:
+        await recurring.materialize()
+
+
+# Runs before the gateway connection closes. Reminder marks are saved when a
+# reminder is queued, so the shard leases are given up first (no new
+# reminders are queued after that), then the queued DMs get DRAIN_TIMEOUT
+# seconds to go out: the next lease holder skips what the marks say was sent.
+async def shut_down():
+    if partition is not None:
+        if partition.runner is not None:
+            partition.runner.cancel()  # or it would renew the leases again
+        try:
+            await store.run(partition.release)
+        except Exception as e:
+            logger.exception("Error releasing shard leases: %s", e)
+    waiting = await reminder.delivery.drain(DRAIN_TIMEOUT)
+    if waiting:
+        logger.warning("Shutting down with reminders for %d users still queued", waiting)
 
 
 # Bot event handlers
 @bot.event
 async def on_ready():
+    store.start()  # loads the tasks in the background
+    await start_monitoring()
     await tree.sync(guild=guild)
-    print(f"Logged in as {bot.user}")
+    logger.info("Logged in as %s", bot.user)
 
     general_channel = bot.get_channel(CHANNEL_ID_general)
     if general_channel:
         await general_channel.send("✅ BOT is now active!")
 
-    user_dm = await bot.fetch_user(USER_ID)
-    if user_dm:
-        await user_dm.send("✅ Reminder system is now active!")
-
-    bot.loop.create_task(reminder.refresh_tasks())  # Refresh every 5 minutes
-    bot.loop.create_task(
-        reminder.schedule_all_reminders()
-    )  # Continuously check for new reminders
-    print("Reminder system has started!")
+    if page_cache.changes is None:
+        page_cache.start()
+    if search_index.changes is None:
+        search_index.start()
+    if partition is not None and partition.runner is None:
+        partition.start(store, on_shards_changed)
+    if recurring.runner is None:
+        recurring.start()  # creates the upcoming occurrences of /recur tasks
+    if reminder.runner is None:
+        # Follows task changes, fires reminders when due, and runs the rare
+        # consistency sweep
+        reminder.start()
+        if USER_ID:
+            reminder.delivery.enqueue(USER_ID, "✅ Reminder system is now active!")
+        logger.info("Reminder system has started!")
 
 
 # Handles Relevant Commands:
@@ -88,6 +294,7 @@ def bot_commands():
     @app_commands.describe(
         description="Task description", due_date="Due date", status="Task status"
     )
+    @metrics.timed("command_seconds", command="create")
     async def create_task(
         interaction: discord.Interaction,
         description: str,
@@ -111,17 +318,18 @@ def bot_commands():
                 )
                 return
 
-            # Use existing format_date method to validate and format the date
-            formatted_date = Task.format_date(due_date)
-            if formatted_date.startswith("Error formatting date"):
-                await interaction.response.send_message(
-                    f"❌ {formatted_date}", ephemeral=True
-                )
+            # Validate the date
+            if await date_options(interaction, due_date) is None:
                 return
 
             # Save task
-            new_task = Task(description, due_date, status)
-            tasks.add_tasks(new_task)
+            if not await store_ready(interaction):
+                return
+            guild_id, owner_id = tenant_of(interaction)
+            new_task = Task(
+                description, due_date, status, guild_id=guild_id, owner_id=owner_id
+            )
+            await store.add_tasks(new_task)
             await interaction.response.send_message(
                 f"✅ {description} added successfully!"
             )
@@ -132,71 +340,346 @@ def bot_commands():
             )
 
     # View Tasks In the Sheet!
-    @tree.command(name="show", description="View all tasks", guild=guild)
-    async def view_tasks(interaction: discord.Interaction):
-        all_tasks = tasks.get_tasks()
-        if all_tasks:
-            formatted_tasks = "\n".join(
-                [
-                    f"**{i+1}.** **Task:** '{task.description}'\n   **Due Date:** '{task.due_date}'\n   **Status:** {task.status}\n"
-                    for i, task in enumerate(all_tasks)
-                ]
-            )
-            # Send the formatted output to Discord
-            await interaction.response.send_message(
-                f"\n**ACTIVE TASKS**\n\n{formatted_tasks}"
+    @tree.command(name="show", description="View your tasks", guild=guild)
+    @app_commands.describe(
+        page="Page to open",
+        status="Only show 'P' (Pending) or 'C' (Completed) tasks",
+        due_from="Only show tasks due on or after this date",
+        due_to="Only show tasks due on or before this date",
+    )
+    @metrics.timed("command_seconds", command="show")
+    async def view_tasks(
+        interaction: discord.Interaction,
+        page: int = 1,
+        status: str = None,
+        due_from: str = None,
+        due_to: str = None,
+    ):
+        # Validate filters
+        if status is not None:
+            status = status.upper()
+            if status not in ["P", "C"]:
+                await interaction.response.send_message(
+                    "❌ Status must be 'P' (Pending) or 'C' (Completed).",
+                    ephemeral=True,
+                )
+                return
+
+        dates = await date_options(interaction, due_from, due_to)
+        if dates is None:
+            return
+
+        # Only the requested page is read from the store, and rendered pages
+        # are cached until one of this user's tasks changes
+        if not await store_ready(interaction):
+            return
+        tenant = tenant_of(interaction)
+        page_filter = PageFilter(status, *dates)
+        page = max(1, page)
+        text, page_count = await page_cache.get(tenant, page_filter, page)
+
+        if page_count > 1:
+            view = TaskPageView(
+                page_cache, tenant, page_filter, page, page_count, interaction.user.id
             )
+            await interaction.response.send_message(text, view=view)
         else:
-            await interaction.response.send_message(
-                "No tasks found in the Excel sheet."
-            )
+            await interaction.response.send_message(text)
 
-    # Marking the Tasks Complete
-    @tree.command(name="complete", description="Mark a task as complete", guild=guild)
-    @app_commands.describe(task_index="The task index to mark as complete")
-    async def mark_complete(interaction: discord.Interaction, task_index: int):
+    # Marking the Tasks Complete -- one or many: "3", "3,5,9-14"
+    @tree.command(name="complete", description="Mark tasks as complete", guild=guild)
+    @app_commands.describe(
+        task_index="Task IDs to mark as complete, e.g. 3 or 3,5,9-14"
+    )
+    @metrics.timed("command_seconds", command="complete")
+    async def mark_complete(interaction: discord.Interaction, task_index: str):
         try:
-            tasks.complete_task(task_index, "C")
-            tasks.delete_completed_task()
+            task_ids = parse_id_list(task_index)
+        except ValueError as e:
+            await interaction.response.send_message(f"❌ {e}", ephemeral=True)
+            return
+
+        if not await store_ready(interaction):
+            return
+
+        try:
+            # Completes them and moves them to the archive in a single write
+            completed = await store.archive_tasks(
+                task_ids, "completed", status="C", tenant=tenant_of(interaction)
+            )
             await interaction.response.send_message(
-                f"Task {task_index} marked as 'Completed'."
+                bulk_reply(task_ids, completed, "marked as 'Completed'")
             )
         except Exception as e:
             await interaction.response.send_message(
                 f"Error marking task {task_index} as complete: {str(e)}"
             )
 
-    # Deleting the Tasks:
-    @tree.command(name="remove", description="Remove a task", guild=guild)
-    @app_commands.describe(task_id="The ID of the task to remove")
+    # Deleting the Tasks -- one or many: "3", "3,5,9-14"
+    @tree.command(name="remove", description="Remove tasks", guild=guild)
+    @app_commands.describe(task_id="Task IDs to remove, e.g. 3 or 3,5,9-14")
+    @metrics.timed("command_seconds", command="remove")
     async def delete_task(interaction: discord.Interaction, task_id: str):
-        if not task_id.isdigit():
+        try:
+            task_ids = parse_id_list(task_id)
+        except ValueError as e:
             await interaction.response.send_message(
-                f"Invalid Task ID: '{task_id}'. Please use numeric values only.",
-                ephemeral=True,
+                f"Invalid Task ID: '{task_id}'. {e}.", ephemeral=True
             )
             return
 
-        # Call the delete_task method
+        if not await store_ready(interaction):
+            return
+
         try:
-            task_deleted = tasks.delete_task(task_id)
-            if task_deleted:
-                await interaction.response.send_message(
-                    f"Task ID '{task_id}' successfully deleted"
-                )
-            else:
-                await interaction.response.send_message(
-                    f"Task ID '{task_id}' not found in the sheet."
-                )
+            removed = await store.delete_tasks(task_ids, tenant=tenant_of(interaction))
+            await interaction.response.send_message(
+                bulk_reply(task_ids, removed, "successfully deleted")
+            )
         except Exception as e:
             await interaction.response.send_message(
                 f"An error occurred while deleting the task: {str(e)}"
             )
 
+    # Suggests the user's task IDs as they type, by ID or by description
+    @mark_complete.autocomplete("task_index")
+    async def complete_autocomplete(interaction: discord.Interaction, current: str):
+        return task_choices(interaction, current)
+
+    @delete_task.autocomplete("task_id")
+    async def remove_autocomplete(interaction: discord.Interaction, current: str):
+        return task_choices(interaction, current)
+
+    # Finds tasks by words (or the start of words) in their description
+    @tree.command(name="search", description="Search your tasks", guild=guild)
+    @app_commands.describe(query="Words, or the start of words, to look for")
+    @metrics.timed("command_seconds", command="search")
+    async def search_tasks(interaction: discord.Interaction, query: str):
+        if not await store_ready(interaction, search_index.loaded):
+            return
+
+        found, total = search_index.search(tenant_of(interaction), query, SEARCH_LIMIT)
+        if not found:
+            await interaction.response.send_message(f"No tasks match '{query[:100]}'.")
+            return
+
+        heading = f"\n**SEARCH RESULTS** for '{query[:100]}' ({total} tasks"
+        if total > len(found):
+            heading += f", showing the first {len(found)}"
+        text = heading + ")\n\n" + "\n".join(render_task(task) for task in found)
+        await interaction.response.send_message(text[:2000])
+
+    # Stores a repeating task once; only occurrences in the next few days
+    # become real tasks, so reminders and /show see them like any other
+    @tree.command(name="recur", description="Add a repeating task", guild=guild)
+    @app_commands.describe(
+        description="Task description",
+        rule="daily, weekly, monthly, weekdays, 'every 2 weeks', 'weekly on mon,thu'",
+        start_date="Date of the first occurrence",
+        until="Optional date of the last occurrence",
+    )
+    @metrics.timed("command_seconds", command="recur")
+    async def recur_task(
+        interaction: discord.Interaction,
+        description: str,
+        rule: str,
+        start_date: str,
+        until: str = None,
+    ):
+        if not description.strip():
+            await interaction.response.send_message(
+                "❌ Task description cannot be empty.", ephemeral=True
+            )
+            return
+        try:
+            parsed_rule = parse_rule(rule)
+        except ValueError as e:
+            await interaction.response.send_message(f"❌ {e}", ephemeral=True)
+            return
+
+        dates = await date_options(interaction, start_date, until)
+        if dates is None:
+            return
+        start, last = dates
+        if last is not None and last < start:
+            await interaction.response.send_message(
+                "❌ The last occurrence can't be before the first.", ephemeral=True
+            )
+            return
+
+        if not await store_ready(interaction):
+            return
+        try:
+            guild_id, owner_id = tenant_of(interaction)
+            recurrence = await recurring.add(
+                description, parsed_rule, start, guild_id, owner_id, last
+            )
+            next_date = recurrence.next_occurrence(date.today())
+            message = f"🔁 {description} added ({parsed_rule}, ID R{recurrence.id})."
+            if next_date is not None:
+                message += f" Next: {display_date(next_date)}."
+            await interaction.response.send_message(message)
+        except Exception as e:
+            logger.exception("Error adding recurring task: %s", e)
+            await interaction.response.send_message(
+                f"❌ Failed to add recurring task: {str(e)}", ephemeral=True
+            )
+
+    # Lists the user's repeating tasks with their next occurrence
+    @tree.command(name="recurring", description="View your repeating tasks", guild=guild)
+    @metrics.timed("command_seconds", command="recurring")
+    async def view_recurring(interaction: discord.Interaction):
+        if not await store_ready(interaction, recurring.loaded):
+            return
+
+        definitions = recurring.recurrences.for_tenant(tenant_of(interaction))
+        if not definitions:
+            await interaction.response.send_message("No repeating tasks found.")
+            return
+
+        today = date.today()
+        lines = []
+        for recurrence in definitions:
+            next_date = recurrence.next_occurrence(today)
+            lines.append(
+                f"**R{recurrence.id}**: {recurrence.description} — {recurrence.rule}, "
+                f"next {display_date(next_date) if next_date else 'never'}"
+            )
+        text = "\n**REPEATING TASKS**\n\n" + "\n".join(lines)
+        await interaction.response.send_message(text[:2000])
+
+    # Stops a repeating task; occurrences already created stay as tasks
+    @tree.command(name="unrecur", description="Stop a repeating task", guild=guild)
+    @app_commands.describe(recurrence_id="ID of the repeating task, e.g. R3 or 3")
+    @metrics.timed("command_seconds", command="unrecur")
+    async def stop_recurring(interaction: discord.Interaction, recurrence_id: str):
+        digits = recurrence_id.strip().upper().removeprefix("R")
+        if not digits.isdigit():
+            await interaction.response.send_message(
+                f"Invalid repeating task ID: '{recurrence_id}'.", ephemeral=True
+            )
+            return
+        if not await store_ready(interaction, recurring.loaded):
+            return
+
+        removed = await recurring.remove(int(digits), tenant_of(interaction))
+        if removed is None:
+            await interaction.response.send_message(
+                f"Repeating task R{digits} not found.", ephemeral=True
+            )
+            return
+        await interaction.response.send_message(
+            f"⏹️ {removed.description} will no longer repeat."
+        )
+
+    # Completed and expired tasks, read from the archive rather than the
+    # active task store
+    @tree.command(name="history", description="View your archived tasks", guild=guild)
+    @app_commands.describe(
+        query="Only show tasks with these words (or the start of them)",
+        page="Page to open",
+    )
+    @metrics.timed("command_seconds", command="history")
+    async def view_history(
+        interaction: discord.Interaction, query: str = None, page: int = 1
+    ):
+        if not await store_ready(interaction):
+            return
+
+        tenant = tenant_of(interaction)
+        page = max(1, page)
+        try:
+            found, more = await store.run(
+                archive.history, tenant, query, (page - 1) * HISTORY_PAGE, HISTORY_PAGE
+            )
+        except Exception as e:
+            logger.exception("Error reading the archive: %s", e)
+            await interaction.response.send_message(
+                f"❌ Failed to read your history: {str(e)}", ephemeral=True
+            )
+            return
+
+        if not found:
+            message = "No archived tasks found." if page == 1 else "No more archived tasks."
+            await interaction.response.send_message(message)
+            return
+
+        total = await store.run(archive.count, tenant)
+        heading = f"\n**HISTORY** (page {page}, {total} archived tasks)"
+        if query:
+            heading = f"\n**HISTORY** for '{query[:100]}' (page {page})"
+        lines = [
+            f"{'✅' if entry.reason == 'completed' else '⌛'} **{entry.task.index}**: "
+            f"{entry.task.description} — due {entry.task.due_date}, "
+            f"{entry.reason} {display_date(entry.archived)}"
+            for entry in found
+        ]
+        if more:
+            lines.append(f"\nMore on page {page + 1}.")
+        await interaction.response.send_message((heading + "\n\n" + "\n".join(lines))[:2000])
+
+    # Imports many tasks at once from a CSV attachment
+    @tree.command(name="import", description="Import tasks from a CSV file", guild=guild)
+    @app_commands.describe(file="CSV with description,due_date[,status] rows")
+    @metrics.timed("command_seconds", command="import")
+    async def import_tasks(interaction: discord.Interaction, file: discord.Attachment):
+        if file.size > MAX_IMPORT_BYTES:
+            await interaction.response.send_message(
+                "❌ That file is too large to import.", ephemeral=True
+            )
+            return
+
+        # Acknowledge the interaction immediately to avoid the timeout
+        await interaction.response.defer()
+        try:
+            text = (await file.read()).decode("utf-8-sig")
+            new_tasks, errors = parse_task_csv(text, *tenant_of(interaction))
+            added = await store.add_many_tasks(new_tasks) if new_tasks else []
+
+            message = f"✅ Imported {len(added)} tasks."
+            if errors:
+                message += f"\n⚠️ Skipped {len(errors)} rows:\n" + "\n".join(errors[:10])
+                if len(errors) > 10:
+                    message += f"\n…and {len(errors) - 10} more."
+            await interaction.followup.send(message)
+        except UnicodeDecodeError:
+            await interaction.followup.send(
+                "❌ The file must be UTF-8 encoded CSV.", ephemeral=True
+            )
+        except Exception as e:
+            await interaction.followup.send(
+                f"❌ Failed to import tasks: {str(e)}", ephemeral=True
+            )
+
+    # Sends the user's tasks as an Excel file, built from the live store
+    @tree.command(
+        name="export", description="Download your tasks as an Excel file", guild=guild
+    )
+    @metrics.timed("command_seconds", command="export")
+    async def export_user_tasks(interaction: discord.Interaction):
+        if not await store_ready(interaction):
+            return
+
+        await interaction.response.defer(ephemeral=True)
+        try:
+            user_tasks = await store.get_tasks(*tenant_of(interaction))
+            data = await store.run(export_tasks, user_tasks, HEADERS)
+            await interaction.followup.send(
+                f"📎 Exported {len(user_tasks)} tasks.",
+                file=discord.File(io.BytesIO(data), filename="tasks.xlsx"),
+                ephemeral=True,
+            )
+        except Exception as e:
+            logger.exception("Error exporting tasks: %s", e)
+            await interaction.followup.send(
+                f"❌ Failed to export tasks: {str(e)}", ephemeral=True
+            )
+
     # Clears out all the messages -- Tidys the server
     @tree.command(name="clear", description="Clear messages", guild=guild)
     @app_commands.describe(amount="The number of messages to clear")
     @commands.has_permissions(manage_messages=True)
+    @metrics.timed("command_seconds", command="clear")
     async def clear(interaction: discord.Interaction, amount: int = 100):
         try:
             # Acknowledge the interaction immediately to avoid the timeout
@@ -211,16 +694,38 @@ def bot_commands():
             )
         except Exception as e:
             # Log only if there's an actual error
-            print(f"Error clearing messages: {e}")
+            logger.exception("Error clearing messages: %s", e)
             await interaction.followup.send(
                 "❌ Failed to clear messages. Make sure I have the right permissions.",
                 ephemeral=True,
             )
 
+    # Latency histograms and queue depths, for admins
+    @tree.command(name="stats", description="Show bot performance stats", guild=guild)
+    @app_commands.default_permissions(manage_guild=True)
+    @metrics.timed("command_seconds", command="stats")
+    async def stats(interaction: discord.Interaction):
+        summary = metrics.summary() or "No measurements yet."
+        await interaction.response.send_message(
+            f"```\n{summary[:1900]}\n```", ephemeral=True
+        )
+
 
 def main():
+    logging.basicConfig(
+        level=LOG_LEVEL, format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+    )
     bot_commands()
-    bot.run(TOKEN)
+    try:
+        bot.run(TOKEN, log_handler=None)  # discord.py logs through the root logger
+    finally:
+        # Finish queued disk work and write any pending changes before exiting
+        store.shutdown()
+        if partition is not None:
+            # Hand our shards over now rather than when the leases expire
+            # (already done by shut_down() unless the bot never connected)
+            partition.release()
+            partition.close()
 
 
 if __name__ == "__main__":
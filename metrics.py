@@ -0,0 +1,205 @@
+from bisect import bisect_left
+from functools import wraps
+import asyncio
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds, in seconds
+BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+# Cumulative-bucket histogram (the Prometheus kind). Observing is a bisect
+# and two adds under a lock, cheap enough for every storage call.
+class Histogram:
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        position = bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[position] += 1
+            self.count += 1
+            self.sum += value
+
+    # Upper bound of the bucket holding the q-th quantile (an estimate)
+    def quantile(self, q):
+        with self.lock:
+            target = q * self.count
+            seen = 0
+            for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+                seen += count
+                if count and seen >= target:
+                    return bound
+        return 0.0
+
+
+# Named histograms, counters and gauges, keyed by name plus a sorted tuple
+# of label pairs. Gauges are callbacks read when the metrics are rendered,
+# so queue depths cost nothing until someone looks.
+class Registry:
+
+    def __init__(self):
+        self.histograms = {}
+        self.counters = {}
+        self.gauges = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(name, labels):
+        return (name, tuple(sorted(labels.items())))
+
+    def histogram(self, name, **labels):
+        key = self.key(name, labels)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            with self.lock:
+                histogram = self.histograms.setdefault(key, Histogram())
+        return histogram
+
+    def observe(self, name, value, **labels):
+        self.histogram(name, **labels).observe(value)
+
+    def increment(self, name, amount=1, **labels):
+        key = self.key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def gauge(self, name, func, **labels):
+        self.gauges[self.key(name, labels)] = func
+
+    # Decorator timing an async function into `name`
+    def timed(self, name, **labels):
+        histogram = self.histogram(name, **labels)
+
+        def decorator(func):
+            @wraps(func)
+            async def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    histogram.observe(time.perf_counter() - started)
+
+            return wrapper
+
+        return decorator
+
+    # Prometheus text exposition format
+    def render(self):
+        lines = []
+        typed = set()
+
+        def declare(name, kind):
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in sorted(self.counters.items()):
+            declare(name, "counter")
+            lines.append(f"{name}{format_labels(labels)} {value}")
+        for (name, labels), func in sorted(self.gauges.items()):
+            try:
+                value = func()
+            except Exception as e:
+                logger.debug("Gauge %s failed: %s", name, e)
+                continue
+            declare(name, "gauge")
+            lines.append(f"{name}{format_labels(labels)} {value}")
+        for (name, labels), histogram in sorted(self.histograms.items()):
+            with histogram.lock:
+                counts = list(histogram.counts)
+                total, count = histogram.sum, histogram.count
+            declare(name, "histogram")
+            cumulative = 0
+            for bound, bucket_count in zip(histogram.buckets + ("+Inf",), counts):
+                cumulative += bucket_count
+                bucket_labels = labels + (("le", str(bound)),)
+                lines.append(f"{name}_bucket{format_labels(bucket_labels)} {cumulative}")
+            lines.append(f"{name}_sum{format_labels(labels)} {total:.6f}")
+            lines.append(f"{name}_count{format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    # Short human-readable summary for /stats
+    def summary(self):
+        lines = []
+        for (name, labels), func in sorted(self.gauges.items()):
+            try:
+                lines.append(f"{name}{format_labels(labels)}: {func()}")
+            except Exception:
+                continue
+        for (name, labels), histogram in sorted(self.histograms.items()):
+            if not histogram.count:
+                continue
+            lines.append(
+                f"{name}{format_labels(labels)}: n={histogram.count} "
+                f"p50≤{histogram.quantile(0.5) * 1000:g}ms "
+                f"p99≤{histogram.quantile(0.99) * 1000:g}ms"
+            )
+        return "\n".join(lines)
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    pairs = ",".join(f'{name}="{value}"' for name, value in labels)
+    return "{" + pairs + "}"
+
+
+# Measures how late the event loop wakes up from a sleep. Anything that
+# blocks the loop (disk I/O, a long computation) shows up here.
+async def watch_loop_lag(registry, interval=1.0):
+    histogram = registry.histogram("event_loop_lag_seconds")
+    last_lag = [0.0]
+    registry.gauge("event_loop_lag_last_seconds", lambda: round(last_lag[0], 6))
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - started - interval)
+        last_lag[0] = lag
+        histogram.observe(lag)
+
+
+# Serves GET /metrics on a local port
+async def start_server(registry, host="127.0.0.1", port=9108):
+    async def handle(reader, writer):
+        try:
+            request = await asyncio.wait_for(reader.readline(), 5)
+            while (await asyncio.wait_for(reader.readline(), 5)) not in (b"\r\n", b"\n", b""):
+                pass  # skip the headers
+            parts = request.decode("latin-1").split()
+            if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+                status, body = "200 OK", registry.render()
+            else:
+                status, body = "404 Not Found", "Not found\n"
+            payload = body.encode("utf-8")
+            writer.write(
+                f"HTTP/1.1 {status}\r\n"
+                "Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                f"Content-Length: {len(payload)}\r\n"
+                "Connection: close\r\n\r\n".encode("latin-1") + payload
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError) as e:
+            logger.debug("Metrics request failed: %s", e)
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    logger.info("Metrics served on http://%s:%d/metrics", host, port)
+    return server
+
+
+# Process-wide registry
+metrics = Registry()
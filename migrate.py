@@ -0,0 +1,58 @@
+# One-shot import of an existing database.xlsx into the SQLite backend.
+#
+# Usage: python migrate.py [database.xlsx] [database.db]
+#
+# The workbook is loaded through ExcelHandler, so changes still in
+# database.xlsx.journal (the bot stopped before flushing them) are replayed
+# and imported too, and the ID counter carries over so deleted task IDs
+# aren't handed out again. Rows from files that predate the Guild ID /
+# Owner ID columns are given to the GUILD_ID / USER_ID from .env.
+from database import ExcelHandler
+from sqlite_handler import SQLiteHandler
+from dotenv import load_dotenv
+import sys
+import os
+
+
+# Every task in the workbook (journal replayed) plus the next free task ID
+def read_excel_tasks(file_name, default_tenant=(0, 0)):
+    handler = ExcelHandler(file_name, default_tenant=default_tenant)
+    handler.setup()
+    try:
+        return handler.get_tasks(), handler.next_id
+    finally:
+        handler.close()
+
+
+def migrate(excel_file="database.xlsx", sqlite_file="database.db", default_tenant=None):
+    if default_tenant is None:
+        load_dotenv()
+        default_tenant = (int(os.getenv("GUILD_ID") or 0), int(os.getenv("USER_ID") or 0))
+
+    if not os.path.exists(excel_file):
+        print(f"'{excel_file}' not found, nothing to migrate.")
+        return 0
+
+    store = SQLiteHandler(sqlite_file)
+    store.setup()
+    try:
+        if store.count_tasks():
+            print(f"'{sqlite_file}' already has tasks, refusing to import twice.")
+            return 0
+
+        tasks, next_id = read_excel_tasks(excel_file, default_tenant)
+        imported = store.add_many(
+            [
+                (task.index, task.description, task.due, task.status, task.guild_id, task.owner_id)
+                for task in tasks
+            ]
+        )
+        store.reserve_ids(next_id)
+        print(f"Imported {imported} tasks from '{excel_file}' into '{sqlite_file}'.")
+        return imported
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    migrate(*sys.argv[1:3])
@@ -0,0 +1,144 @@
+from collections import OrderedDict
+import discord
+import asyncio
+
+PAGE_SIZE = 10
+DESCRIPTION_LIMIT = 120  # keeps a full page under Discord's 2000 characters
+
+
+# Filters a /show view was opened with
+class PageFilter:
+    def __init__(self, status=None, due_from=None, due_to=None):
+        self.status = status
+        self.due_from = due_from
+        self.due_to = due_to
+
+    @property
+    def key(self):
+        return (self.status, self.due_from, self.due_to)
+
+    def describe(self):
+        parts = []
+        if self.status:
+            parts.append(f"status {self.status}")
+        if self.due_from:
+            parts.append(f"due from {self.due_from:%d-%B-%Y}")
+        if self.due_to:
+            parts.append(f"due until {self.due_to:%d-%B-%Y}")
+        return ", ".join(parts)
+
+
+def render_task(task):
+    description = task.description
+    if len(description) > DESCRIPTION_LIMIT:
+        description = description[: DESCRIPTION_LIMIT - 1] + "…"
+    return f"**{task.index}.** **Task:** '{description}'\n   **Due Date:** '{task.due_date}'\n   **Status:** {task.status}\n"
+
+
+# Rendered /show pages, keyed by tenant, filter and page number.
+#
+# Pages are built from a single slice read from the store and kept until one
+# of the tenant's tasks changes (the cache follows the store's change feed).
+# Invalidations bump a per-tenant generation, and a page read while its
+# tenant was invalidated is returned but not cached.
+class PageCache:
+
+    def __init__(self, store, max_pages=1024):
+        self.store = store
+        self.max_pages = max_pages
+        self.pages = OrderedDict()  # (tenant, filter key, page) -> (text, page_count)
+        self.changes = None
+        self.generations = {}  # tenant -> invalidations so far
+        self.generation = 0  # invalidations of every tenant at once
+
+    # Returns (text, page_count) for a 1-based page number
+    async def get(self, tenant, page_filter, page):
+        key = (tenant, page_filter.key, page)
+        cached = self.pages.get(key)
+        if cached is not None:
+            self.pages.move_to_end(key)
+            return cached
+
+        generation = (self.generation, self.generations.get(tenant, 0))
+        guild_id, owner_id = tenant
+        tasks, total = await self.store.get_page(
+            guild_id,
+            owner_id,
+            (page - 1) * PAGE_SIZE,
+            PAGE_SIZE,
+            page_filter.status,
+            page_filter.due_from,
+            page_filter.due_to,
+        )
+        page_count = max(1, -(-total // PAGE_SIZE))
+
+        if tasks:
+            heading = f"\n**ACTIVE TASKS** (page {page}/{page_count}, {total} tasks)"
+            if page_filter.describe():
+                heading += f" — {page_filter.describe()}"
+            text = heading + "\n\n" + "\n".join(render_task(task) for task in tasks)
+        elif total:
+            text = f"Page {page} is empty, there are only {page_count} pages."
+        else:
+            text = "No tasks found."
+
+        if generation == (self.generation, self.generations.get(tenant, 0)):
+            self.pages[key] = (text, page_count)
+            if len(self.pages) > self.max_pages:
+                self.pages.popitem(last=False)
+        return text, page_count
+
+    # Drops every cached page of one tenant (or all pages if unknown)
+    def invalidate(self, tenant=None):
+        if tenant is None:
+            self.generation += 1
+            self.pages.clear()
+            return
+        self.generations[tenant] = self.generations.get(tenant, 0) + 1
+        for key in [key for key in self.pages if key[0] == tenant]:
+            del self.pages[key]
+
+    async def watch_changes(self):
+        self.changes = self.store.subscribe()
+        while True:
+            event = await self.changes.get()
+            self.invalidate(event.task.tenant if event.task is not None else None)
+
+    def start(self):
+        return asyncio.create_task(self.watch_changes())
+
+
+# Previous / next buttons under a /show message
+class TaskPageView(discord.ui.View):
+
+    def __init__(self, cache, tenant, page_filter, page, page_count, user_id):
+        super().__init__(timeout=300)
+        self.cache = cache
+        self.tenant = tenant
+        self.page_filter = page_filter
+        self.page = page
+        self.page_count = page_count
+        self.user_id = user_id
+        self.update_buttons()
+
+    def update_buttons(self):
+        self.previous_page.disabled = self.page <= 1
+        self.next_page.disabled = self.page >= self.page_count
+
+    # Only the user who ran /show can flip through their tasks
+    async def interaction_check(self, interaction):
+        return interaction.user.id == self.user_id
+
+    async def show(self, interaction, page):
+        text, self.page_count = await self.cache.get(self.tenant, self.page_filter, page)
+        self.page = min(page, self.page_count)
+        self.update_buttons()
+        await interaction.response.edit_message(content=text, view=self)
+
+    @discord.ui.button(label="◀ Previous", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction, button):
+        await self.show(interaction, max(1, self.page - 1))
+
+    @discord.ui.button(label="Next ▶", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction, button):
+        await self.show(interaction, self.page + 1)
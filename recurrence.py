@@ -0,0 +1,382 @@
+from database import Task, parse_due_date
+from file_lock import file_lock
+from calendar import monthrange
+from datetime import date, timedelta
+import asyncio
+import json
+import logging
+import os
+import re
+
+logger = logging.getLogger(__name__)
+
+HORIZON_DAYS = 7  # occurrences are only created this far ahead
+MAX_PER_PASS = 31  # occurrences one definition may create per pass
+MATERIALIZE_INTERVAL = 3600  # seconds between passes
+LOAD_RETRY = 60  # seconds before retrying an unreadable definitions file
+
+WEEKDAYS = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+UNITS = {"day": "days", "week": "weeks", "month": "months"}
+RULE_PATTERN = re.compile(
+    r"^(?:every\s+(?:(?P<interval>\d+)\s+)?(?P<unit>day|week|month)s?"
+    r"|(?P<named>daily|weekly|monthly|weekdays))"
+    r"(?:\s+on\s+(?P<days>[a-z,\s]+))?$"
+)
+
+
+# How often a task comes back: every `interval` days, weeks or months.
+# Weekly rules may list weekdays ("weekly on mon,thu").
+class Rule:
+
+    def __init__(self, unit, interval=1, weekdays=None):
+        self.unit = unit
+        self.interval = interval
+        self.weekdays = sorted(weekdays) if weekdays else None
+
+    def __str__(self):
+        text = f"every {self.interval} {self.unit}" if self.interval > 1 else {
+            "days": "daily",
+            "weeks": "weekly",
+            "months": "monthly",
+        }[self.unit]
+        if self.weekdays:
+            text += " on " + ",".join(WEEKDAYS[day] for day in self.weekdays)
+        return text
+
+    # Occurrence dates from `start`, lazily and without end, skipping
+    # straight to the first one on or after `after`
+    def occurrences(self, start, after=None):
+        after = after or start
+        if self.unit == "days":
+            yield from self.every(start, after, self.interval)
+        elif self.unit == "weeks" and not self.weekdays:
+            yield from self.every(start, after, 7 * self.interval)
+        elif self.unit == "weeks":
+            week = start - timedelta(days=start.weekday())
+            if after > week:
+                skip = (after - week).days // (7 * self.interval)
+                week += timedelta(weeks=skip * self.interval)
+            while True:
+                for day in self.weekdays:
+                    current = week + timedelta(days=day)
+                    if current >= start and current >= after:
+                        yield current
+                week += timedelta(weeks=self.interval)
+        else:
+            months = 0
+            if after > start:
+                elapsed = (after.year - start.year) * 12 + after.month - start.month
+                months = max(0, elapsed // self.interval * self.interval - self.interval)
+            while True:
+                current = add_months(start, months)
+                if current >= after:
+                    yield current
+                months += self.interval
+
+    @staticmethod
+    def every(start, after, step):
+        count = max(0, -(-(after - start).days // step))
+        current = start + timedelta(days=count * step)
+        while True:
+            yield current
+            current += timedelta(days=step)
+
+
+# Same day of the month `months` later, clamped to the month's last day
+def add_months(start, months):
+    year, month = divmod(start.month - 1 + months, 12)
+    year += start.year
+    month += 1
+    return date(year, month, min(start.day, monthrange(year, month)[1]))
+
+
+# "daily", "weekly", "monthly", "weekdays", "every 2 weeks",
+# "weekly on mon,thu", "every 3 months"
+def parse_rule(text):
+    match = RULE_PATTERN.match(" ".join(str(text).lower().split()))
+    if match is None:
+        raise ValueError(
+            "Use daily, weekly, monthly, weekdays or e.g. 'every 2 weeks' "
+            "or 'weekly on mon,thu'"
+        )
+
+    named = match.group("named")
+    if named == "weekdays":
+        return Rule("weeks", 1, range(5))
+    if named:
+        unit = {"daily": "days", "weekly": "weeks", "monthly": "months"}[named]
+        interval = 1
+    else:
+        unit = UNITS[match.group("unit")]
+        interval = int(match.group("interval") or 1)
+    if not 1 <= interval <= 365:
+        raise ValueError("The interval must be between 1 and 365")
+
+    weekdays = None
+    if match.group("days"):
+        if unit != "weeks":
+            raise ValueError("Weekdays can only be given for weekly rules")
+        names = [name.strip()[:3] for name in match.group("days").split(",") if name.strip()]
+        if not names or any(name not in WEEKDAYS for name in names):
+            raise ValueError("Weekdays are mon, tue, wed, thu, fri, sat and sun")
+        weekdays = {WEEKDAYS.index(name) for name in names}
+    return Rule(unit, interval, weekdays)
+
+
+# A recurring task definition, stored once however often it comes back
+class Recurrence:
+
+    def __init__(
+        self,
+        recurrence_id,
+        description,
+        rule,
+        start,
+        guild_id=0,
+        owner_id=0,
+        until=None,
+        materialized_until=None,
+    ):
+        self.id = recurrence_id
+        self.description = description
+        self.rule = rule
+        self.start = start
+        self.guild_id = guild_id
+        self.owner_id = owner_id
+        self.until = until  # last possible date, or None
+        self.materialized_until = materialized_until  # tasks exist up to here
+
+    @property
+    def tenant(self):
+        return (self.guild_id, self.owner_id)
+
+    # Occurrence dates on or after `after`, up to `until`
+    def occurrences(self, after=None):
+        for day in self.rule.occurrences(self.start, after):
+            if self.until is not None and day > self.until:
+                return
+            yield day
+
+    def next_occurrence(self, after=None):
+        return next(self.occurrences(after), None)
+
+    def to_record(self):
+        return {
+            "id": self.id,
+            "description": self.description,
+            "rule": str(self.rule),
+            "start": self.start.isoformat(),
+            "until": self.until.isoformat() if self.until else None,
+            "guild": self.guild_id,
+            "owner": self.owner_id,
+            "materialized_until": (
+                self.materialized_until.isoformat() if self.materialized_until else None
+            ),
+        }
+
+    @classmethod
+    def from_record(cls, record):
+        return cls(
+            record["id"],
+            record["description"],
+            parse_rule(record["rule"]),
+            parse_due_date(record["start"]),
+            record["guild"],
+            record["owner"],
+            parse_due_date(record["until"]) if record["until"] else None,
+            parse_due_date(record["materialized_until"])
+            if record["materialized_until"]
+            else None,
+        )
+
+
+# Recurring definitions, kept in a small JSON file beside the task store.
+# There are few of them, so the file is rewritten whole (atomically). Every
+# change re-reads the file under a lock first, so several worker processes
+# can share it.
+class RecurrenceStore:
+
+    def __init__(self, file_name):
+        self.file_name = file_name
+        self.lock_name = file_name + ".lock"
+        self.recurrences = {}  # ID -> Recurrence
+        self.next_id = 1
+
+    def __len__(self):
+        return len(self.recurrences)
+
+    def load(self):
+        with file_lock(self.lock_name):
+            self.read()
+        logger.debug("Loaded %d recurring tasks", len(self.recurrences))
+
+    def read(self):
+        recurrences = {}
+        next_id = 1
+        if os.path.exists(self.file_name):
+            with open(self.file_name, encoding="utf-8") as recurrence_file:
+                data = json.load(recurrence_file)
+            next_id = data.get("next_id", 1)
+            for record in data.get("recurrences", []):
+                recurrence = Recurrence.from_record(record)
+                recurrences[recurrence.id] = recurrence
+                next_id = max(next_id, recurrence.id + 1)
+        self.recurrences = recurrences
+        self.next_id = next_id
+
+    # Runs `func(*args)` on the latest definitions and saves the result
+    def modify(self, func, *args):
+        with file_lock(self.lock_name):
+            self.read()
+            result = func(*args)
+            self.save()
+        return result
+
+    def save(self):
+        data = {
+            "next_id": self.next_id,
+            "recurrences": [
+                recurrence.to_record() for recurrence in self.recurrences.values()
+            ],
+        }
+        temp_name = self.file_name + ".tmp"
+        with open(temp_name, "w", encoding="utf-8") as recurrence_file:
+            json.dump(data, recurrence_file, indent=1)
+            recurrence_file.flush()
+            os.fsync(recurrence_file.fileno())
+        os.replace(temp_name, self.file_name)
+
+    def add(self, description, rule, start, guild_id, owner_id, until=None):
+        recurrence = Recurrence(
+            self.next_id, description, rule, start, guild_id, owner_id, until
+        )
+        self.recurrences[recurrence.id] = recurrence
+        self.next_id += 1
+        return recurrence
+
+    def remove(self, recurrence_id, tenant=None):
+        recurrence = self.recurrences.get(recurrence_id)
+        if recurrence is None or (tenant is not None and recurrence.tenant != tenant):
+            return None
+        return self.recurrences.pop(recurrence_id)
+
+    # Moves materialized_until forward: {recurrence ID: date}
+    def advance(self, materialized):
+        for recurrence_id, until in materialized.items():
+            recurrence = self.recurrences.get(recurrence_id)
+            if recurrence is None:
+                continue  # removed meanwhile
+            if recurrence.materialized_until is None or until > recurrence.materialized_until:
+                recurrence.materialized_until = until
+
+    def for_tenant(self, tenant):
+        return [
+            recurrence
+            for recurrence in self.recurrences.values()
+            if recurrence.tenant == tenant
+        ]
+
+
+# Turns the occurrences inside the horizon window into ordinary tasks, so
+# reminders, /show and cleanup handle them like any other. Storage then
+# holds one definition plus at most a window's worth of tasks per rule,
+# never the whole series. With several workers, `owns(guild_id)` limits a
+# worker to the definitions in its shards.
+class RecurrenceManager:
+
+    def __init__(self, store, recurrences, horizon_days=HORIZON_DAYS, owns=None):
+        self.store = store  # AsyncTaskStore
+        self.recurrences = recurrences  # RecurrenceStore
+        self.horizon_days = horizon_days
+        self.owns = owns
+        self.lock = asyncio.Lock()
+        self.loaded = asyncio.Event()
+        self.runner = None
+
+    # New tasks for the occurrences that entered the window since the last
+    # pass, plus how far each definition is then covered. Occurrences
+    # missed while the bot was offline are skipped rather than piled up.
+    def plan(self, today):
+        horizon = today + timedelta(days=self.horizon_days)
+        new_tasks = []
+        materialized = {}
+        for recurrence in self.recurrences.recurrences.values():
+            if self.owns is not None and not self.owns(recurrence.guild_id):
+                continue
+            after = today
+            if recurrence.materialized_until is not None:
+                after = max(after, recurrence.materialized_until + timedelta(days=1))
+            until = horizon
+            count = 0
+            for day in recurrence.occurrences(after):
+                if day > horizon:
+                    break
+                if count == MAX_PER_PASS:
+                    until = day - timedelta(days=1)  # the rest next pass
+                    break
+                new_tasks.append(
+                    Task(
+                        recurrence.description,
+                        day,
+                        "P",
+                        guild_id=recurrence.guild_id,
+                        owner_id=recurrence.owner_id,
+                    )
+                )
+                count += 1
+            if recurrence.materialized_until is None or until > recurrence.materialized_until:
+                materialized[recurrence.id] = until
+        return new_tasks, materialized
+
+    async def materialize(self, today=None):
+        today = today or date.today()
+        async with self.lock:
+            await self.store.run(self.recurrences.load)
+            new_tasks, materialized = self.plan(today)
+            if new_tasks:
+                await self.store.add_many_tasks(new_tasks)
+            if materialized:
+                await self.store.run(
+                    self.recurrences.modify, self.recurrences.advance, materialized
+                )
+        if new_tasks:
+            logger.info("Created %d recurring task occurrences", len(new_tasks))
+        return new_tasks
+
+    async def add(self, description, rule, start, guild_id, owner_id, until=None):
+        async with self.lock:
+            recurrence = await self.store.run(
+                self.recurrences.modify,
+                self.recurrences.add,
+                description,
+                rule,
+                start,
+                guild_id,
+                owner_id,
+                until,
+            )
+        await self.materialize()
+        return recurrence
+
+    async def remove(self, recurrence_id, tenant=None):
+        async with self.lock:
+            return await self.store.run(
+                self.recurrences.modify, self.recurrences.remove, recurrence_id, tenant
+            )
+
+    # Loading is retried with the passes: until the file reads cleanly the
+    # commands report that recurring tasks are still loading
+    async def run(self):
+        while True:
+            try:
+                if not self.loaded.is_set():
+                    await self.store.run(self.recurrences.load)
+                    self.loaded.set()
+                await self.materialize()
+            except Exception as e:
+                logger.exception("Error creating recurring tasks: %s", e)
+            await asyncio.sleep(MATERIALIZE_INTERVAL if self.loaded.is_set() else LOAD_RETRY)
+
+    def start(self):
+        self.runner = asyncio.create_task(self.run())
+        return self.runner
@@ -1,75 +1,151 @@
+from scheduler import ReminderScheduler
+from events import TaskEvent
+from delivery import DeliveryQueue
+from metrics import metrics
 import asyncio
-from datetime import datetime
+from datetime import date, datetime
+import logging
 import time
 
-class Reminder:
-    def __init__(self, excel_handler, bot, USER_ID):
-        self.scheduled_tasks = set()
-        self.excel_handler = excel_handler
-        self.bot = bot
-        self.USER_ID = USER_ID
-        self.running_frequencies = set()  # Keeps track of active reminder loops
-        self.last_sent = {}
+logger = logging.getLogger(__name__)
 
-    async def refresh_tasks(self):
-        while True:
-            await asyncio.sleep(300)  # Wait for 5 minutes
-
-            tasks = self.db.get_tasks()  # Fetch tasks from your database (or Excel)
-            for task in tasks:
-                # Check if this task already has a running reminder
-                if task.index not in self.running_frequencies:
-                    print(f"Scheduling reminder for task: {task.description}")
-                    self.schedule_reminder(task)
-                else:
-                    print(f"Reminder already running for task: {task.description}")
-
-    # Deletes up overdue tasks after 3 days
-    def clean_overdue_tasks(self):
-        print("Cleaning overdue tasks...")
-        current_tasks = self.fetch_pending_tasks()
-        today = datetime.now().date()
-        removed_tasks = []
-
-        print(f"Total pending tasks: {len(current_tasks)}")
-
-        for task in current_tasks:
-            try:
-                due_date = datetime.strptime(task.due_date, "%d-%B-%Y").date()
-            except ValueError:
-                print(
-                    f"Skipping task '{task.description}': Invalid due date format -> {task.due_date}"
-                )
-                continue
-
-            days_overdue = (today - due_date).days
-            print(
-                f"Checking task: {task.description}, Due Date: {due_date}, Overdue by: {days_overdue} days"
-            )
+# Intervals for different frequencies (in seconds)
+INTERVALS = {
+    "Hourly Reminder": 3600,
+    "Every 4 Hours": 14400,
+    "Daily Reminder": 86400,
+    "Weekly Reminder": 604800,
+}
 
-            if days_overdue > 3:
-                removed_tasks.append(task)
-                self.excel_handler.delete_task(
-                    str(task.index)
-                )  # Ensure task ID is passed as string
+# Changes arrive through the store's change feed, the full rescan is only a
+# rare consistency sweep for edits made behind the bot's back.
+SWEEP_INTERVAL = 21600  # 6 hours
 
-        print(f"{len(removed_tasks)} overdue tasks removed.")
+# Overdue cleanup is an index range query, cheap enough to run hourly
+CLEANUP_INTERVAL = 3600
+CLEANUP_BATCH = 500  # overdue tasks archived per write
+LEASE_RETRY = 10  # seconds before retrying a reminder whose shard lease lapsed
 
-    # Loads the Pending tasks from the sheet
-    def fetch_pending_tasks(self):
-        # Directly call the method from the ExcelHandler class
-        pending_tasks = self.excel_handler.get_tasks()
-        print(f"Pending Tasks Fetched: {len(pending_tasks)} tasks found.")
-        return pending_tasks
 
-    def days_until_due(self, due_date):
-        today = datetime.now().date()
+class Reminder:
+    def __init__(
+        self, store, bot, scheduler=None, delivery=None, partition=None, clock=time.time
+    ):
+        self.store = store  # AsyncTaskStore
+        self.bot = bot
+        self.clock = clock  # a virtual clock can stand in when load testing
+        # ShardCoordinator when several workers share the tasks: only tasks
+        # in shards leased to this worker get reminders
+        self.partition = partition
+        # Both define __len__, so an empty one passed in is falsy
+        self.scheduler = scheduler if scheduler is not None else ReminderScheduler(clock)
+        self.delivery = delivery if delivery is not None else DeliveryQueue(bot)
+        self.tasks = {}  # task ID -> Task currently tracked by the scheduler
+        self.last_sent = {}  # slot_key() -> time the last grouped reminder went out
+        self.changes = None  # queue from the store's change feed
+        self.runner = None  # schedule_all_reminders(), once started
+        self.sweeper = None  # refresh_tasks(), once started
+
+    # Consistency sweep -- catches anything the change feed didn't see
+    async def refresh_tasks(self):
+        while True:
+            await asyncio.sleep(SWEEP_INTERVAL)
+            await self.check_and_update_tasks()
 
-        if isinstance(due_date, str):
-            due_date = datetime.strptime(due_date, "%d-%B-%Y").date()
+    # Applies store changes to the schedule as soon as they happen
+    async def watch_changes(self):
+        while True:
+            event = await self.changes.get()
+            try:
+                self.apply_change(event)
+            except Exception as e:
+                logger.exception("Error applying %s: %s", event, e)
+
+    # This worker's share of the tasks (all of them when unsharded)
+    def assigned(self, task):
+        return self.partition is None or self.partition.assigned(task.guild_id)
+
+    def owns(self, task):
+        return self.partition is None or self.partition.owns(task.guild_id)
+
+    # Called when shard leases change hands: drops the tasks of lost shards
+    # and picks up the gained ones, with the reminder times the previous
+    # holder recorded
+    async def rebalance(self, gained, lost):
+        if lost:
+            for task_id, task in list(self.tasks.items()):
+                if not self.assigned(task):
+                    self.forget_task(task_id)
+        if gained:
+            marks = await self.store.run(self.partition.load_marks, gained)
+            for key, sent_at in marks.items():
+                if sent_at > self.last_sent.get(key, 0):
+                    self.last_sent[key] = sent_at
+            # Collected first and scheduled in one go: the scheduler is
+            # already running, and an owner's tasks must share one slot
+            # rather than the first chunk using it up for the rest
+            gained_tasks = [
+                task
+                async for task in self.fetch_pending_tasks()
+                if self.assigned(task) and task.index not in self.tasks
+            ]
+            now = self.clock()
+            for task in gained_tasks:
+                self.schedule_reminder(task, now)
 
-        days_left = (due_date - today).days
-        return days_left
+    def apply_change(self, event):
+        if event.kind == TaskEvent.DELETED:
+            self.forget_task(event.task_id)
+        else:
+            self.schedule_reminder(event.task)
+
+    # Moves completed tasks to the archive, and pending ones 3 days after
+    # they're overdue. They are streamed from the store and moved a batch at
+    # a time, so memory stays bounded however many there are.
+    async def clean_overdue_tasks(self):
+        logger.debug("Cleaning overdue tasks...")
+        # Completed first, so they aren't filed as expired below
+        completed = await self.store.delete_completed_task(
+            owns=self.owns if self.partition is not None else None
+        )
+        for task_id in completed:
+            self.forget_task(task_id)
+        if completed:
+            logger.info("%d completed tasks archived.", len(completed))
+
+        cutoff = date.fromordinal(self.today().toordinal() - 4)
+        removed = 0
+        batch = []
+        async for task in self.store.iter_tasks(due_to=cutoff):
+            if not self.owns(task):
+                continue  # another worker's shard
+            batch.append(task.index)
+            if len(batch) >= CLEANUP_BATCH:
+                removed += await self.delete_overdue(batch)
+                batch = []
+        if batch:
+            removed += await self.delete_overdue(batch)
+
+        logger.info("%d overdue tasks archived.", removed)
+
+    async def delete_overdue(self, task_ids):
+        removed = await self.store.archive_tasks(task_ids, "expired")
+        for task_id in task_ids:
+            self.forget_task(task_id)
+        return len(removed)
+
+    # Streams the Pending tasks that can still get reminders (due today or later)
+    async def fetch_pending_tasks(self):
+        # Reads through the async store so the event loop never blocks on disk
+        async for task in self.store.iter_tasks(status="P", due_from=self.today()):
+            yield task
+
+    def today(self):
+        return date.fromtimestamp(self.clock())
+
+    # Due-date arithmetic works on ordinals precomputed when the task loads
+    def days_until_due(self, due_ordinal):
+        return due_ordinal - self.today().toordinal()
 
     # Sets Reminder Frequency
     def reminder_frequency(self, days_left):
@@ -84,111 +160,172 @@ class Reminder:
         else:
             return "Weekly Reminder"  # Far future tasks
 
-    # Schedules the reminders
-    async def schedule_reminder(self, task):
-        task_description = task.description
-        due_date = task.due_date
-        days_left = self.days_until_due(due_date)
+    # Midnight of the day the task moves into a tighter frequency bucket
+    def next_bucket_change(self, due_ordinal, days_left):
+        for threshold in (7, 3, 0):
+            if days_left > threshold:
+                change_date = date.fromordinal(due_ordinal - threshold)
+                return datetime.combine(change_date, datetime.min.time()).timestamp()
+        return None
+
+    # Tasks sharing a key share a reminder slot: per owner, and per shard as
+    # well when sharded, since shards can move between workers on their own
+    def slot_key(self, task, frequency):
+        if self.partition is None:
+            return (task.owner_id, frequency)
+        return (self.partition.shard_of(task.guild_id), task.owner_id, frequency)
+
+    # Works out when a task should next be reminded (None = never)
+    def next_fire_time(self, task, now):
+        if task.status != "P" or task.due_ordinal is None:
+            return None
+
+        days_left = self.days_until_due(task.due_ordinal)
         frequency = self.reminder_frequency(days_left)
-
-        # Intervals for different frequencies (in seconds)
-        intervals = {
-            "Hourly Reminder": 3600,  # 3600
-            "Every 4 Hours": 14400,  # 14400
-            "Daily Reminder": 86400,  # 86400
-            "Weekly Reminder": 604800,  # 604800
-        }
-        interval = intervals.get(frequency, None)
-
-        if not interval:
-            print(f"Unknown frequency '{frequency}' for task: {task_description}")
+        if frequency is None:
+            return None
+
+        # An owner's tasks in the same bucket share its slot so they go out
+        # as one message
+        slot = self.last_sent.get(self.slot_key(task, frequency), 0) + INTERVALS[frequency]
+        fire_time = max(now, slot)
+
+        # Wake up early if the task moves to a tighter bucket before then
+        bucket_change = self.next_bucket_change(task.due_ordinal, days_left)
+        if bucket_change is not None:
+            fire_time = min(fire_time, bucket_change)
+        return fire_time
+
+    # Schedules the reminders -- places one task in the timer heap
+    def schedule_reminder(self, task, now=None):
+        now = self.clock() if now is None else now
+        if not self.assigned(task):
+            self.forget_task(task.index)
             return
-
-        # Ensure grouped task tracking
-        if frequency not in self.last_sent:
-            self.last_sent[frequency] = 0  # Initialize last sent time
-
-        if frequency not in self.running_frequencies:
-            self.running_frequencies.add(frequency)
+        self.tasks[task.index] = task
+        fire_time = self.next_fire_time(task, now)
+        if fire_time is None:
+            self.scheduler.cancel(task.index)
         else:
-            print(
-                f"Reminder loop for '{frequency}' already running. Skipping duplicate."
-            )
-            return
-
-        while True:
-            current_tasks = self.fetch_pending_tasks()
-
-            grouped_tasks = [
-                t
-                for t in current_tasks
-                if self.days_until_due(t.due_date) >= 0
-                and self.reminder_frequency(self.days_until_due(t.due_date))
-                == frequency
-            ]
-
-            if not grouped_tasks:
-                print(
-                    f"No active tasks to send for frequency '{frequency}'. Ending loop."
-                )
-                self.running_frequencies.discard(frequency)
-                break
-
-            current_time = time.time()
-            last_sent_time = self.last_sent[frequency]
-
-            if current_time - last_sent_time >= interval:
-                # Only send unique reminders once per loop tick
-                unique_task_set = set()
-                message = f"\n📌 **Task Reminders:**\n"
-                for t in grouped_tasks:
-                    if t.description not in unique_task_set:
-                        unique_task_set.add(t.description)
-                        message += (
-                            f"• **{t.description}**\n   Due Date: {t.due_date}\n\n"
-                        )
-
-                try:
-                    user = await self.bot.fetch_user(self.USER_ID)
-                    await user.send(message)
-                    print(
-                        f"Grouped reminder sent for frequency '{frequency}' at {time.ctime(current_time)}."
-                    )
-                except Exception as e:
-                    print(f"Failed to send reminder: {e}")
-
-                self.last_sent[frequency] = current_time
-            else:
-                remaining_time = interval - (current_time - last_sent_time)
-                print(
-                    f"Tasks for frequency '{frequency}' waiting {remaining_time:.1f} seconds before next reminder."
-                )
-
-            await asyncio.sleep(interval)
-
-    # Looks for newly added tasks within the sheet
-    async def check_and_update_tasks(self):
-        while True:
-            new_tasks = self.fetch_pending_tasks()
+            self.scheduler.schedule(task.index, fire_time)
+
+    def forget_task(self, task_id):
+        self.tasks.pop(task_id, None)
+        self.scheduler.cancel(task_id)
+
+    # Called by the scheduler with every task whose slot has come up
+    @metrics.timed("reminder_dispatch_seconds")
+    async def send_due_reminders(self, task_ids, now):
+        grouped_tasks = {}
+        for task_id in task_ids:
+            task = self.tasks.get(task_id)
+            if task is None:
+                continue
+            if not self.owns(task):
+                # Lease lapsed or moving: retry later, rebalance() drops the
+                # task if the shard really went to another worker
+                self.scheduler.schedule(task_id, now + LEASE_RETRY)
+                continue
 
-            for i, task in enumerate(new_tasks):  # Generate task_id dynamically
-                task_id = i + 1  # Task ID based on enumerate()
+            fire_time = self.next_fire_time(task, now)
+            if fire_time is None:
+                continue  # overdue or completed, nothing more to send
+            if fire_time > now:
+                self.scheduler.schedule(task_id, fire_time)  # bucket not due yet
+                continue
 
-                if task_id not in self.scheduled_tasks:
-                    self.scheduled_tasks.add(task_id)
-                    # Introduce staggered delay before scheduling
-                    await asyncio.sleep(i * 3)
-                    asyncio.create_task(self.schedule_reminder(task))
+            frequency = self.reminder_frequency(self.days_until_due(task.due_ordinal))
+            grouped_tasks.setdefault((task.owner_id, frequency), []).append(task)
 
-            await asyncio.sleep(300)  # Check for new tasks every 5 minutes
+        # Other workers taking over a shard must see these as sent
+        if self.partition is not None and grouped_tasks:
+            marks = {
+                self.slot_key(task, frequency) + (now,)
+                for (owner_id, frequency), group in grouped_tasks.items()
+                for task in group
+            }
+            try:
+                await self.store.run(self.partition.save_marks, list(marks))
+            except Exception as e:
+                logger.exception("Error recording reminders, retrying: %s", e)
+                for group in grouped_tasks.values():
+                    for task in group:
+                        self.scheduler.schedule(task.index, now + LEASE_RETRY)
+                return
+
+        # Fans out one grouped message per owner and frequency
+        for (owner_id, frequency), group in grouped_tasks.items():
+            # Only send unique reminders once per tick
+            unique_task_set = set()
+            message = f"\n📌 **Task Reminders:**\n"
+            for t in group:
+                if t.description not in unique_task_set:
+                    unique_task_set.add(t.description)
+                    message += f"• **{t.description}**\n   Due Date: {t.due_date}\n\n"
+
+            await self.send_reminder(owner_id, message)
+            logger.debug(
+                "Grouped reminder queued for %s for frequency '%s' at %s.",
+                owner_id,
+                frequency,
+                time.ctime(now),
+            )
+            metrics.increment("reminders_queued_total", frequency=frequency)
+            for t in group:
+                self.last_sent[self.slot_key(t, frequency)] = now
+            for t in group:
+                self.schedule_reminder(t, now)
+
+    # Hands the message to the delivery queue, which merges everything queued
+    # for the same owner and paces sends to stay under Discord's rate limits
+    async def send_reminder(self, owner_id, message):
+        self.delivery.enqueue(owner_id, message)
+
+    # Looks for new, changed or removed tasks and only reschedules those
+    @metrics.timed("reminder_sweep_seconds")
+    async def check_and_update_tasks(self):
+        now = self.clock()
+        seen = set()
+
+        async for task in self.fetch_pending_tasks():
+            seen.add(task.index)
+            known = self.tasks.get(task.index)
+            if known is None or (
+                known.description,
+                known.due_ordinal,
+                known.status,
+                known.tenant,
+            ) != (task.description, task.due_ordinal, task.status, task.tenant):
+                self.schedule_reminder(task, now)
+
+        for task_id in list(self.tasks):
+            if task_id not in seen:
+                self.forget_task(task_id)
+        logger.debug("Pending Tasks Fetched: %d tasks found.", len(seen))
 
     # Runs the clean_over_due() function
-    async def daily_cleanup(self):
+    async def overdue_cleanup(self):
         while True:
-            self.clean_overdue_tasks()
-            await asyncio.sleep(86400)  # 24 hours
+            await self.clean_overdue_tasks()
+            await asyncio.sleep(CLEANUP_INTERVAL)
+
+    # Starts the reminder loops and the consistency sweep. Only the first
+    # call does anything: on_ready runs again after every gateway reconnect.
+    def start(self):
+        if self.runner is None:
+            self.runner = asyncio.create_task(self.schedule_all_reminders())
+            self.sweeper = asyncio.create_task(self.refresh_tasks())
+        return self.runner
 
     # Runs Everything:
     async def schedule_all_reminders(self):
-        asyncio.create_task(self.daily_cleanup())
-        await self.check_and_update_tasks()
+        # Subscribe before the first sync so no change slips in between
+        if self.changes is None:
+            self.changes = self.store.subscribe()
+        self.delivery.start()
+        asyncio.create_task(self.watch_changes())
+        asyncio.create_task(self.overdue_cleanup())
+        if self.partition is None:
+            await self.check_and_update_tasks()
+        # else rebalance() loads each shard's tasks once its lease is won
+        await self.scheduler.run(self.send_due_reminders)
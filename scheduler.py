@@ -0,0 +1,86 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+# Central timer for all reminders.
+#
+# Keeps a min-heap of (fire_time, seq, key). Rescheduling or cancelling a key
+# just records its new fire time; stale heap entries are skipped when they
+# surface (lazy deletion), so every change is O(log n). The run loop sleeps
+# until the earliest entry is due and is woken early only when a new
+# earliest entry arrives.
+class ReminderScheduler:
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self.heap = []
+        self.fire_times = {}  # key -> current fire time
+        self.counter = itertools.count()
+        self.wakeup = None
+
+    def __len__(self):
+        return len(self.fire_times)
+
+    def __contains__(self, key):
+        return key in self.fire_times
+
+    # Adds or moves `key` so it fires at `fire_time`
+    def schedule(self, key, fire_time):
+        earliest = self.next_fire_time()
+        self.fire_times[key] = fire_time
+        heapq.heappush(self.heap, (fire_time, next(self.counter), key))
+
+        if earliest is None or fire_time < earliest:
+            self.wake()
+
+    def cancel(self, key):
+        self.fire_times.pop(key, None)
+
+    def next_fire_time(self):
+        while self.heap:
+            fire_time, _, key = self.heap[0]
+            if self.fire_times.get(key) == fire_time:
+                return fire_time
+            heapq.heappop(self.heap)  # stale entry
+        return None
+
+    # Removes and returns every key due at `now`
+    def pop_due(self, now):
+        due = []
+        while self.heap and self.heap[0][0] <= now:
+            fire_time, _, key = heapq.heappop(self.heap)
+            if self.fire_times.get(key) == fire_time:
+                del self.fire_times[key]
+                due.append(key)
+        return due
+
+    def wake(self):
+        if self.wakeup:
+            self.wakeup.set()
+
+    # Sleeps until the next entry is due and hands due keys to `callback`
+    async def run(self, callback):
+        self.wakeup = asyncio.Event()
+        while True:
+            fire_time = self.next_fire_time()
+            timeout = None if fire_time is None else max(0, fire_time - self.clock())
+
+            self.wakeup.clear()
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout)
+                continue  # the earliest entry changed, recompute
+            except asyncio.TimeoutError:
+                pass
+
+            now = self.clock()
+            due = self.pop_due(now)
+            if due:
+                try:
+                    await callback(due, now)
+                except Exception as e:
+                    logger.exception("Error running scheduled reminders: %s", e)
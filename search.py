@@ -0,0 +1,173 @@
+from bisect import bisect_left, insort
+from events import TaskEvent
+import asyncio
+import re
+
+TOKEN_PATTERN = re.compile(r"\w+")
+MAX_PREFIX_TOKENS = 500  # distinct words one search term may expand to
+MAX_CHOICES = 25  # Discord's limit for autocomplete suggestions
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(str(text).casefold())
+
+
+# Inverted index over one tenant's task descriptions.
+#
+# `postings` maps each word to the IDs of the tasks containing it, and
+# `tokens` keeps the words sorted so a prefix is a bisect plus a short walk.
+# Every search term is treated as a prefix and all terms must match, so
+# "rep q" finds "Quarterly report". Task IDs are kept sorted too, which lets
+# autocomplete find IDs starting with the digits typed so far by bisecting
+# the ranges 3, 30-39, 300-399, ... instead of scanning.
+class SearchIndex:
+
+    def __init__(self):
+        self.postings = {}  # word -> set of task IDs
+        self.tokens = []  # sorted words
+        self.ids = []  # sorted task IDs
+        self.tasks = {}  # task ID -> Task
+
+    def __len__(self):
+        return len(self.tasks)
+
+    def add(self, task):
+        self.remove(task.index)
+        for token in set(tokenize(task.description)):
+            posting = self.postings.get(token)
+            if posting is None:
+                posting = self.postings[token] = set()
+                insort(self.tokens, token)
+            posting.add(task.index)
+        insort(self.ids, task.index)
+        self.tasks[task.index] = task
+
+    def remove(self, task_id):
+        task = self.tasks.pop(task_id, None)
+        if task is None:
+            return
+        for token in set(tokenize(task.description)):
+            posting = self.postings[token]
+            posting.discard(task_id)
+            if not posting:
+                del self.postings[token]
+                del self.tokens[bisect_left(self.tokens, token)]
+        del self.ids[bisect_left(self.ids, task_id)]
+
+    # IDs of tasks with a word starting with `prefix`
+    def expand(self, prefix):
+        found = set()
+        start = bisect_left(self.tokens, prefix)
+        for position in range(start, min(len(self.tokens), start + MAX_PREFIX_TOKENS)):
+            token = self.tokens[position]
+            if not token.startswith(prefix):
+                break
+            found |= self.postings[token]
+        return found
+
+    # (tasks, total) matching every term of `query`, in ID order
+    def search(self, query, limit=None):
+        matches = None
+        # Longer terms match fewer words, so they narrow the set fastest
+        for term in sorted(set(tokenize(query)), key=len, reverse=True):
+            found = self.expand(term)
+            matches = found if matches is None else matches & found
+            if not matches:
+                return [], 0
+        if matches is None:
+            return [], 0
+        task_ids = sorted(matches)
+        return [self.tasks[task_id] for task_id in task_ids[:limit]], len(task_ids)
+
+    # Tasks whose ID starts with `digits` (shortest IDs first)
+    def with_id_prefix(self, digits, limit):
+        if not self.ids:
+            return []
+        if not digits:
+            return [self.tasks[task_id] for task_id in self.ids[-limit:]]
+        if digits.startswith("0"):
+            return []
+
+        found = []
+        number = int(digits)
+        scale = 1
+        while number * scale <= self.ids[-1] and len(found) < limit:
+            start = bisect_left(self.ids, number * scale)
+            end = bisect_left(self.ids, (number + 1) * scale)
+            found.extend(self.ids[start : min(end, start + limit - len(found))])
+            scale *= 10
+        return [self.tasks[task_id] for task_id in found]
+
+
+# Search indexes for every tenant, kept current from the store's change feed
+class TaskSearch:
+
+    def __init__(self, store):
+        self.store = store
+        self.indexes = {}  # (guild_id, owner_id) -> SearchIndex
+        self.owners = {}  # task ID -> tenant, to find deleted tasks
+        self.changes = None
+        self.loaded = asyncio.Event()
+
+    def __len__(self):
+        return len(self.owners)
+
+    def add(self, task):
+        self.remove(task.index)
+        self.indexes.setdefault(task.tenant, SearchIndex()).add(task)
+        self.owners[task.index] = task.tenant
+
+    def remove(self, task_id):
+        tenant = self.owners.pop(task_id, None)
+        if tenant is None:
+            return
+        index = self.indexes[tenant]
+        index.remove(task_id)
+        if not index.tasks:
+            del self.indexes[tenant]
+
+    def apply_change(self, event):
+        if event.kind == TaskEvent.DELETED:
+            self.remove(event.task_id)
+        else:
+            self.add(event.task)
+
+    # Subscribes first so nothing written during the initial load is missed
+    async def watch_changes(self):
+        self.changes = self.store.subscribe()
+        async for task in self.store.iter_tasks():
+            self.add(task)
+        self.loaded.set()
+        while True:
+            self.apply_change(await self.changes.get())
+
+    def start(self):
+        return asyncio.create_task(self.watch_changes())
+
+    def search(self, tenant, query, limit=None):
+        index = self.indexes.get(tenant)
+        if index is None:
+            return [], 0
+        return index.search(query, limit)
+
+    # Autocomplete for ID-list parameters such as "3,5,9-14": completes the
+    # last entry either as an ID prefix or as words from a description.
+    # Returns (label, value) pairs; the value keeps what came before.
+    def suggest(self, tenant, current):
+        index = self.indexes.get(tenant)
+        if index is None:
+            return []
+        head, _, last = current.rpartition(",")
+        head = head + "," if head else ""
+        if "-" in last:
+            start, _, last = last.partition("-")
+            head += start + "-"
+        last = last.strip()
+
+        if not last or last.isdigit():
+            tasks = index.with_id_prefix(last, MAX_CHOICES)
+        else:
+            tasks = index.search(last, MAX_CHOICES)[0]
+        return [
+            (f"{task.index}: {task.description}", f"{head}{task.index}") for task in tasks
+        ]
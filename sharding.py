@@ -0,0 +1,182 @@
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+LEASE_TTL = 30.0  # seconds a shard lease lasts without being renewed
+SAFETY_MARGIN = 5.0  # stop acting on a shard this long before its lease runs out
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS leases (
+    shard INTEGER PRIMARY KEY,
+    holder TEXT NOT NULL,
+    expires REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS reminder_marks (
+    shard INTEGER NOT NULL,
+    owner_id INTEGER NOT NULL,
+    frequency TEXT NOT NULL,
+    sent_at REAL NOT NULL,
+    PRIMARY KEY (shard, owner_id, frequency)
+);
+"""
+
+
+# Discord's guild -> shard mapping. DMs (guild 0) belong to shard 0.
+def shard_of(guild_id, shard_count):
+    return (guild_id >> 22) % shard_count
+
+
+# Decides which worker process runs the background work (reminders,
+# overdue cleanup, recurring tasks) for each shard.
+#
+# Every worker is configured with the shards it serves on the gateway and
+# tries to hold a lease on each of them in a small SQLite file shared by all
+# workers. A lease is only taken over once it has expired, and a holder
+# stops acting SAFETY_MARGIN seconds before its own lease runs out, so
+# during a rebalance (a worker restarting with other shards, or crashing)
+# two workers never act on the same shard at once. The time each owner was
+# last reminded is kept per shard in the same file, so the new holder picks
+# the reminder slots up where the old one left them.
+class ShardCoordinator:
+
+    def __init__(
+        self,
+        file_name,
+        worker_id,
+        shard_ids,
+        shard_count,
+        ttl=LEASE_TTL,
+        margin=SAFETY_MARGIN,
+        clock=time.time,
+    ):
+        self.file_name = file_name
+        self.worker_id = str(worker_id)
+        self.shard_ids = sorted(set(shard_ids))
+        self.shard_count = shard_count
+        self.ttl = ttl
+        self.margin = margin
+        self.clock = clock
+        self.held = {}  # shard -> when our lease on it expires
+        self.connection = None
+        self.lock = threading.Lock()
+        self.runner = None
+
+    def open(self):
+        with self.lock:
+            if self.connection is not None:
+                return
+            self.connection = sqlite3.connect(
+                self.file_name, timeout=10, check_same_thread=False, isolation_level=None
+            )
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.executescript(SCHEMA)
+
+    def close(self):
+        with self.lock:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
+
+    def shard_of(self, guild_id):
+        return shard_of(guild_id or 0, self.shard_count)
+
+    # The guild's shard is leased to this worker (it may be about to expire)
+    def assigned(self, guild_id):
+        return self.shard_of(guild_id) in self.held
+
+    # Safe to act on the guild right now
+    def owns(self, guild_id):
+        expires = self.held.get(self.shard_of(guild_id))
+        return expires is not None and self.clock() < expires - self.margin
+
+    # Renews our leases and claims any of our shards whose lease is free or
+    # expired. Returns the shards (gained, lost) since the last call.
+    def renew(self):
+        now = self.clock()
+        expires = now + self.ttl
+        held = set()
+        with self.lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                current = {
+                    shard: (holder, until)
+                    for shard, holder, until in self.connection.execute(
+                        "SELECT shard, holder, expires FROM leases"
+                    )
+                }
+                for shard in self.shard_ids:
+                    holder, until = current.get(shard, (None, 0))
+                    if holder in (None, self.worker_id) or until <= now:
+                        self.connection.execute(
+                            "INSERT OR REPLACE INTO leases (shard, holder, expires) VALUES (?, ?, ?)",
+                            (shard, self.worker_id, expires),
+                        )
+                        held.add(shard)
+                self.connection.execute("COMMIT")
+            except Exception:
+                self.connection.execute("ROLLBACK")
+                raise
+
+        previous = set(self.held)
+        self.held = {shard: expires for shard in held}
+        return held - previous, previous - held
+
+    # Gives our shards up at once (clean shutdown), instead of letting the
+    # next worker wait for the leases to expire
+    def release(self):
+        with self.lock:
+            if self.connection is None:
+                return
+            self.connection.execute("DELETE FROM leases WHERE holder = ?", (self.worker_id,))
+        self.held = {}
+
+    # (shard, owner_id, frequency) -> last reminder time, for the given shards
+    def load_marks(self, shards):
+        shards = list(shards)
+        if not shards:
+            return {}
+        placeholders = ",".join("?" * len(shards))
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT shard, owner_id, frequency, sent_at FROM reminder_marks "
+                f"WHERE shard IN ({placeholders})",
+                shards,
+            ).fetchall()
+        return {(shard, owner_id, frequency): sent_at for shard, owner_id, frequency, sent_at in rows}
+
+    # Records reminders as sent: (shard, owner_id, frequency, sent_at) rows
+    def save_marks(self, marks):
+        with self.lock:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO reminder_marks (shard, owner_id, frequency, sent_at) "
+                "VALUES (?, ?, ?, ?)",
+                marks,
+            )
+
+    # Renews the leases every third of their lifetime and hands any change
+    # to `on_change(gained, lost)`. Disk work runs on the store's executor.
+    async def watch(self, store, on_change):
+        await store.run(self.open)
+        while True:
+            try:
+                gained, lost = await store.run(self.renew)
+                if gained or lost:
+                    logger.info(
+                        "Worker %s shards: +%s -%s (holding %s)",
+                        self.worker_id,
+                        sorted(gained),
+                        sorted(lost),
+                        sorted(self.held),
+                    )
+                    await on_change(gained, lost)
+            except Exception as e:
+                logger.exception("Error renewing shard leases: %s", e)
+            await asyncio.sleep(self.ttl / 3)
+
+    def start(self, store, on_change):
+        self.runner = asyncio.create_task(self.watch(store, on_change))
+        return self.runner
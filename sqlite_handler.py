@@ -0,0 +1,400 @@
+from database import Task, parse_due_date
+from storage import TaskStorage
+import logging
+import threading
+import sqlite3
+
+logger = logging.getLogger(__name__)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    description TEXT NOT NULL,
+    due_date TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'P',
+    guild_id INTEGER NOT NULL DEFAULT 0,
+    owner_id INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+# Created after the upgrade step so older databases get the columns first
+INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_tasks_status_due ON tasks (status, due_date);
+CREATE INDEX IF NOT EXISTS idx_tasks_due_date ON tasks (due_date);
+CREATE INDEX IF NOT EXISTS idx_tasks_tenant ON tasks (guild_id, owner_id, id);
+"""
+
+COLUMNS = "id, description, due_date, status, guild_id, owner_id"
+
+# Date-range filters compare due_date as text, which only orders correctly
+# for ISO dates. Rows holding anything else (an unparsable legacy value)
+# never match a range, the same as undated rows in the Excel table.
+ISO_DUE = "due_date = date(due_date)"
+
+
+# Due dates are stored as ISO text (SQLite's native date form) so the index
+# sorts chronologically; Task parses them back with date.fromisoformat
+def to_iso_date(due_date):
+    due = parse_due_date(due_date)
+    return due.isoformat() if due else due_date
+
+
+class SQLiteHandler(TaskStorage):
+
+    def __init__(self, file_name, default_tenant=(0, 0)):
+        self.file_name = file_name
+        self.default_tenant = default_tenant  # owner of rows from older files
+        self.connection = None
+        self.lock = threading.Lock()
+
+    # Opens the database and makes sure the schema exists
+    def setup(self):
+        self.connection = sqlite3.connect(self.file_name, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+        self.upgrade_schema()
+        self.connection.executescript(INDEXES)
+        self.normalize_dates()
+        self.connection.commit()
+        logger.info("SQLite database '%s' is ready!", self.file_name)
+
+    # Adds the tenant columns to databases created before they existed
+    def upgrade_schema(self):
+        columns = {row[1] for row in self.connection.execute("PRAGMA table_info(tasks)")}
+        if "guild_id" in columns:
+            return
+
+        guild_id, owner_id = self.default_tenant
+        with self.connection:
+            self.connection.execute(
+                f"ALTER TABLE tasks ADD COLUMN guild_id INTEGER NOT NULL DEFAULT {int(guild_id)}"
+            )
+            self.connection.execute(
+                f"ALTER TABLE tasks ADD COLUMN owner_id INTEGER NOT NULL DEFAULT {int(owner_id)}"
+            )
+        logger.info("Added tenant columns to the tasks table")
+
+    # Rewrites due dates stored in another format (databases written before
+    # dates were normalized) as ISO text, so range queries see them
+    def normalize_dates(self):
+        rows = self.connection.execute(
+            "SELECT id, due_date FROM tasks WHERE date(due_date) IS NOT due_date"
+        ).fetchall()
+        updates = [
+            (to_iso_date(due_date), task_id)
+            for task_id, due_date in rows
+            if parse_due_date(due_date) is not None
+        ]
+        if updates:
+            with self.connection:
+                self.connection.executemany(
+                    "UPDATE tasks SET due_date = ? WHERE id = ?", updates
+                )
+            logger.info("Converted %d due dates to ISO format", len(updates))
+        if len(rows) > len(updates):
+            logger.warning(
+                "%d tasks have unreadable due dates and are left out of date filters",
+                len(rows) - len(updates),
+            )
+
+    def close(self):
+        with self.lock:
+            if self.connection:
+                self.connection.close()
+                self.connection = None
+
+    # Writes to the Database! Returns the stored task with its new ID.
+    def add_tasks(self, task: Task):
+        with self.lock, self.connection:
+            cursor = self.connection.execute(
+                "INSERT INTO tasks (description, due_date, status, guild_id, owner_id) VALUES (?, ?, ?, ?, ?)",
+                (
+                    task.description,
+                    to_iso_date(task.due),
+                    task.status,
+                    task.guild_id,
+                    task.owner_id,
+                ),
+            )
+        return task.replace(index=cursor.lastrowid)
+
+    # Bulk insert in a single transaction; returns the stored tasks
+    def add_many_tasks(self, tasks):
+        stored = []
+        with self.lock, self.connection:
+            for task in tasks:
+                cursor = self.connection.execute(
+                    "INSERT INTO tasks (description, due_date, status, guild_id, owner_id) VALUES (?, ?, ?, ?, ?)",
+                    (
+                        task.description,
+                        to_iso_date(task.due),
+                        task.status,
+                        task.guild_id,
+                        task.owner_id,
+                    ),
+                )
+                stored.append(task.replace(index=cursor.lastrowid))
+        logger.debug("Added %d tasks", len(stored))
+        return stored
+
+    # Tasks with the given IDs (only `tenant`'s when given), in chunks that
+    # stay under SQLite's bound-parameter limit
+    def select_by_id(self, task_ids, tenant=None):
+        task_ids = [int(task_id) for task_id in task_ids]
+        tasks = []
+        for start in range(0, len(task_ids), 500):
+            chunk = task_ids[start : start + 500]
+            marks = ", ".join("?" * len(chunk))
+            rows = self.connection.execute(
+                f"SELECT {COLUMNS} FROM tasks WHERE id IN ({marks})", chunk
+            ).fetchall()
+            tasks.extend(self.make_task(row) for row in rows)
+        if tenant is not None:
+            tasks = [task for task in tasks if task.tenant == tenant]
+        return tasks
+
+    # Inserts many (task_id, description, due_date, status, guild_id, owner_id)
+    # rows in a single transaction, keeping their IDs (used by the migration).
+    # A task_id of None lets SQLite assign the next one.
+    def add_many(self, rows):
+        with self.lock, self.connection:
+            self.connection.executemany(
+                f"INSERT INTO tasks ({COLUMNS}) VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (task_id, description, to_iso_date(due_date), status, guild_id, owner_id)
+                    for task_id, description, due_date, status, guild_id, owner_id in rows
+                ],
+            )
+        return len(rows)
+
+    # Makes sure IDs handed out from now on start at `next_id` or later, so
+    # IDs the old store already used (and then deleted) are never reused
+    def reserve_ids(self, next_id):
+        with self.lock, self.connection:
+            updated = self.connection.execute(
+                "UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'tasks'",
+                (next_id - 1,),
+            ).rowcount
+            if not updated:
+                self.connection.execute(
+                    "INSERT INTO sqlite_sequence (name, seq) VALUES ('tasks', ?)",
+                    (next_id - 1,),
+                )
+
+    def make_task(self, row):
+        task_id, description, due_date, status, guild_id, owner_id = row
+        return Task(
+            index=task_id,
+            description=description,
+            due_date=due_date,
+            status=status,
+            guild_id=guild_id,
+            owner_id=owner_id,
+        )
+
+    # Reading from the Database! Pass a guild and owner to read only their
+    # partition (served by idx_tasks_tenant); without them every task is returned.
+    def get_tasks(self, guild_id=None, owner_id=None):
+        with self.lock:
+            if guild_id is None and owner_id is None:
+                rows = self.connection.execute(
+                    f"SELECT {COLUMNS} FROM tasks ORDER BY id"
+                ).fetchall()
+            else:
+                rows = self.connection.execute(
+                    f"SELECT {COLUMNS} FROM tasks WHERE guild_id = ? AND owner_id = ? ORDER BY id",
+                    (guild_id, owner_id),
+                ).fetchall()
+
+        return [self.make_task(row) for row in rows]
+
+    # One page of a tenant's tasks plus the total that match the filters
+    def get_page(
+        self, guild_id, owner_id, offset, limit, status=None, due_from=None, due_to=None
+    ):
+        where = "guild_id = ? AND owner_id = ?"
+        params = [guild_id, owner_id]
+        if status is not None:
+            where += " AND status = ?"
+            params.append(status)
+        if due_from is not None or due_to is not None:
+            where += f" AND {ISO_DUE}"
+        if due_from is not None:
+            where += " AND due_date >= ?"
+            params.append(due_from.isoformat())
+        if due_to is not None:
+            where += " AND due_date <= ?"
+            params.append(due_to.isoformat())
+
+        with self.lock:
+            total = self.connection.execute(
+                f"SELECT COUNT(*) FROM tasks WHERE {where}", params
+            ).fetchone()[0]
+            rows = self.connection.execute(
+                f"SELECT {COLUMNS} FROM tasks WHERE {where} ORDER BY id LIMIT ? OFFSET ?",
+                params + [limit, offset],
+            ).fetchall()
+
+        return [self.make_task(row) for row in rows], total
+
+    # Streams matching tasks in ID order, `chunk_size` rows per query.
+    # Keyset pagination (id > last seen) keeps every chunk an index seek, and
+    # the lock is only held while a chunk is read.
+    def iter_tasks(
+        self,
+        guild_id=None,
+        owner_id=None,
+        status=None,
+        due_from=None,
+        due_to=None,
+        chunk_size=500,
+    ):
+        where = "id > ?"
+        params = []
+        if guild_id is not None or owner_id is not None:
+            where += " AND guild_id = ? AND owner_id = ?"
+            params += [guild_id, owner_id]
+        if status is not None:
+            where += " AND status = ?"
+            params.append(status)
+        if due_from is not None or due_to is not None:
+            where += f" AND {ISO_DUE}"
+        if due_from is not None:
+            where += " AND due_date >= ?"
+            params.append(due_from.isoformat())
+        if due_to is not None:
+            where += " AND due_date <= ?"
+            params.append(due_to.isoformat())
+
+        last_id = 0
+        while True:
+            with self.lock:
+                rows = self.connection.execute(
+                    f"SELECT {COLUMNS} FROM tasks WHERE {where} ORDER BY id LIMIT ?",
+                    [last_id] + params + [chunk_size],
+                ).fetchall()
+            for row in rows:
+                yield self.make_task(row)
+            if len(rows) < chunk_size:
+                return
+            last_id = rows[-1][0]
+
+    # Tasks due in an inclusive date range, earliest first (idx_tasks_status_due)
+    def get_due_between(self, due_from=None, due_to=None, status=None):
+        where = f"due_date >= ? AND due_date <= ? AND {ISO_DUE}"
+        params = [
+            due_from.isoformat() if due_from else "0000-00-00",
+            due_to.isoformat() if due_to else "9999-99-99",
+        ]
+        if status is not None:
+            where = "status = ? AND " + where
+            params.insert(0, status)
+
+        with self.lock:
+            rows = self.connection.execute(
+                f"SELECT {COLUMNS} FROM tasks WHERE {where} ORDER BY due_date, id",
+                params,
+            ).fetchall()
+        return [self.make_task(row) for row in rows]
+
+    def get_task(self, task_id):
+        with self.lock:
+            row = self.connection.execute(
+                f"SELECT {COLUMNS} FROM tasks WHERE id = ?", (int(task_id),)
+            ).fetchone()
+        if row is None:
+            return None
+        return self.make_task(row)
+
+    def count_tasks(self):
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM tasks").fetchone()[0]
+
+    # Updating Status of the Task
+    def complete_task(self, task_id, new_details):
+        if new_details not in ["P", "C"]:
+            logger.warning(
+                "Invalid status '%s'. Use 'C' for Completed or 'P' for Pending.",
+                new_details,
+            )
+            return
+
+        with self.lock, self.connection:
+            cursor = self.connection.execute(
+                "UPDATE tasks SET status = ? WHERE id = ?", (new_details, int(task_id))
+            )
+        if cursor.rowcount:
+            logger.debug("%s marked as Completed", task_id)
+
+    # Bulk status change in one transaction. With remove=True the tasks are
+    # deleted instead (what /complete does). `tenant` skips other users' IDs.
+    def complete_tasks(self, task_ids, new_details, remove=False, tenant=None):
+        if new_details not in ["P", "C"]:
+            logger.warning(
+                "Invalid status '%s'. Use 'C' for Completed or 'P' for Pending.",
+                new_details,
+            )
+            return []
+
+        with self.lock, self.connection:
+            tasks = self.select_by_id(task_ids, tenant)
+            if remove:
+                self.connection.executemany(
+                    "DELETE FROM tasks WHERE id = ?", [(task.index,) for task in tasks]
+                )
+            else:
+                self.connection.executemany(
+                    "UPDATE tasks SET status = ? WHERE id = ?",
+                    [(new_details, task.index) for task in tasks],
+                )
+        logger.debug("%d tasks marked as %s", len(tasks), new_details)
+        return [task.replace(status=new_details) for task in tasks]
+
+    # Bulk delete in one transaction; returns the tasks that were removed
+    def delete_tasks(self, task_ids, tenant=None):
+        with self.lock, self.connection:
+            tasks = self.select_by_id(task_ids, tenant)
+            self.connection.executemany(
+                "DELETE FROM tasks WHERE id = ?", [(task.index,) for task in tasks]
+            )
+        logger.debug("Deleted %d tasks", len(tasks))
+        return tasks
+
+    # Removes Completed Tasks
+    def delete_completed_task(self):
+        with self.lock, self.connection:
+            completed = [
+                task_id
+                for (task_id,) in self.connection.execute(
+                    "SELECT id FROM tasks WHERE status = 'C'"
+                )
+            ]
+            self.connection.execute("DELETE FROM tasks WHERE status = 'C'")
+
+        if not completed:
+            logger.debug("No completed tasks to delete.")
+            return []
+        logger.debug("All completed tasks deleted (%d).", len(completed))
+        return completed
+
+    # Deleting Tasks:
+    def delete_task(self, task_id):
+        if not str(task_id).isdigit():
+            logger.warning(
+                "Invalid Task ID: '%s'. Please choose Numeric Values only", task_id
+            )
+            return False
+
+        with self.lock, self.connection:
+            cursor = self.connection.execute(
+                "DELETE FROM tasks WHERE id = ?", (int(task_id),)
+            )
+
+        if cursor.rowcount:
+            logger.debug("Task ID '%s' successfully deleted.", task_id)
+            return True
+
+        logger.debug("Task ID '%s' not found.", task_id)
+        return False
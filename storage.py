@@ -0,0 +1,101 @@
+# Storage interface shared by every task backend.
+#
+# main.py and Reminder only talk to these methods, so a backend can be
+# swapped through config without touching the bot code.
+
+
+class TaskStorage:
+
+    # Opens (or creates) the underlying store
+    def setup(self):
+        raise NotImplementedError
+
+    # Writes anything pending and releases the store
+    def close(self):
+        pass
+
+    # All tasks, or only one (guild_id, owner_id) partition when both are given
+    def get_tasks(self, guild_id=None, owner_id=None):
+        raise NotImplementedError
+
+    # Generator over matching tasks in ID order (same filters as get_page,
+    # the tenant is optional); callers may stop early
+    def iter_tasks(
+        self, guild_id=None, owner_id=None, status=None, due_from=None, due_to=None
+    ):
+        raise NotImplementedError
+
+    # Returns (tasks, total) for one page of a tenant's tasks, optionally
+    # filtered by status and an inclusive due-date range (date objects)
+    def get_page(
+        self, guild_id, owner_id, offset, limit, status=None, due_from=None, due_to=None
+    ):
+        raise NotImplementedError
+
+    # Tasks due in an inclusive date range (dates; None leaves that end
+    # open), earliest first, optionally only with one status
+    def get_due_between(self, due_from=None, due_to=None, status=None):
+        raise NotImplementedError
+
+    # Looks up one task by its stable ID (None if it doesn't exist)
+    def get_task(self, task_id):
+        raise NotImplementedError
+
+    # Stores a new task and returns it with its assigned ID
+    def add_tasks(self, task):
+        raise NotImplementedError
+
+    def complete_task(self, task_id, new_details):
+        raise NotImplementedError
+
+    def delete_task(self, task_id):
+        raise NotImplementedError
+
+    # Bulk versions -- each applies all changes in one transaction/flush.
+    # `tenant` = (guild_id, owner_id) restricts them to that user's tasks.
+    def add_many_tasks(self, tasks):
+        raise NotImplementedError
+
+    # Returns the changed tasks; remove=True deletes them in the same step
+    def complete_tasks(self, task_ids, new_details, remove=False, tenant=None):
+        raise NotImplementedError
+
+    # Returns the removed tasks
+    def delete_tasks(self, task_ids, tenant=None):
+        raise NotImplementedError
+
+    # Removes every completed task and returns their IDs
+    def delete_completed_task(self):
+        raise NotImplementedError
+
+
+DEFAULT_FILES = {
+    "excel": "database.xlsx",
+    "sqlite": "database.db",
+}
+
+
+# Builds the backend selected in config
+def create_storage(
+    backend="excel",
+    file_name=None,
+    flush_interval=5.0,
+    flush_threshold=50,
+    default_tenant=(0, 0),
+):
+    backend = (backend or "excel").lower()
+    file_name = file_name or DEFAULT_FILES.get(backend)
+
+    if backend == "excel":
+        from database import ExcelHandler
+
+        return ExcelHandler(file_name, flush_interval, flush_threshold, default_tenant)
+
+    if backend == "sqlite":
+        from sqlite_handler import SQLiteHandler
+
+        return SQLiteHandler(file_name, default_tenant)
+
+    raise ValueError(
+        f"Unknown storage backend '{backend}'. Use one of: {', '.join(DEFAULT_FILES)}"
+    )
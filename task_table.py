@@ -0,0 +1,230 @@
+from array import array
+from bisect import bisect_left, insort
+from datetime import date
+
+STATUSES = ["P", "C"]
+STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+NO_DATE = 0  # due ordinal for dates that couldn't be parsed (real ones start at 1)
+MAX_ORDINAL = date.max.toordinal()
+
+
+# Sorted due-date index for one status.
+#
+# Each entry is a single int, ordinal << 32 | task ID, kept sorted in a typed
+# array: range queries are two bisects plus the k matches, inserts and
+# removes are a bisect plus one memmove.
+class DueIndex:
+
+    def __init__(self):
+        self.keys = array("q")
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, ordinal, task_id):
+        insort(self.keys, ordinal << 32 | task_id)
+
+    def discard(self, ordinal, task_id):
+        key = ordinal << 32 | task_id
+        position = bisect_left(self.keys, key)
+        if position < len(self.keys) and self.keys[position] == key:
+            del self.keys[position]
+
+    # Task IDs due between two ordinals (inclusive), earliest first
+    def between(self, low, high):
+        start = bisect_left(self.keys, low << 32)
+        end = bisect_left(self.keys, (high + 1) << 32)
+        return [key & 0xFFFFFFFF for key in self.keys[start:end]]
+
+
+# Columnar, array-backed task table.
+#
+# Each field lives in its own typed array (status codes and due-date
+# ordinals as machine ints) instead of one Python object per task, which
+# keeps tens of thousands of tasks compact. Filters such as "pending and due
+# within 3 days" are a single pass over the status/due arrays. Removal swaps
+# the last row into the hole, so every operation by ID is O(1).
+class TaskTable:
+
+    def __init__(self):
+        self.ids = array("q")
+        self.status = array("b")
+        self.due = array("l")
+        self.guild = array("q")
+        self.owner = array("q")
+        self.descriptions = []
+        self.raw_due = {}  # task ID -> original value of an unparsable due date
+        self.slots = {}  # task ID -> position in the arrays
+
+        # Per-tenant partitions: (guild_id, owner_id) -> {task ID: None}, an
+        # ordered set, so one user's /show never walks anyone else's rows.
+        self.tenants = {}
+
+        # Status code -> DueIndex, for "due today / within 3 days / overdue"
+        self.due_index = [DueIndex() for _ in STATUSES]
+
+    def __len__(self):
+        return len(self.slots)
+
+    def __contains__(self, task_id):
+        return task_id in self.slots
+
+    def columns(self):
+        return (self.ids, self.status, self.due, self.guild, self.owner, self.descriptions)
+
+    # Independent copy, cheap enough to take under a lock: the columns are
+    # flat arrays and lists, so it's a handful of memcpys
+    def copy(self):
+        table = TaskTable.__new__(TaskTable)
+        table.ids = array("q", self.ids)
+        table.status = array("b", self.status)
+        table.due = array("l", self.due)
+        table.guild = array("q", self.guild)
+        table.owner = array("q", self.owner)
+        table.descriptions = list(self.descriptions)
+        table.raw_due = dict(self.raw_due)
+        table.slots = dict(self.slots)
+        table.tenants = {tenant: dict(ids) for tenant, ids in self.tenants.items()}
+        table.due_index = []
+        for index in self.due_index:
+            index_copy = DueIndex()
+            index_copy.keys = array("q", index.keys)
+            table.due_index.append(index_copy)
+        return table
+
+    def insert(self, task_id, description, due, status, guild_id, owner_id):
+        if isinstance(due, date):
+            self.due.append(due.toordinal())
+            self.due_index[STATUS_CODES.get(status, 0)].add(due.toordinal(), task_id)
+        else:
+            self.due.append(NO_DATE)
+            self.raw_due[task_id] = due
+        self.slots[task_id] = len(self.ids)
+        self.ids.append(task_id)
+        self.status.append(STATUS_CODES.get(status, 0))
+        self.guild.append(guild_id)
+        self.owner.append(owner_id)
+        self.descriptions.append(description)
+        self.tenants.setdefault((guild_id, owner_id), {})[task_id] = None
+
+    # Removes a row and returns it as a Task (None if the ID is unknown)
+    def remove(self, task_id):
+        slot = self.slots.pop(task_id, None)
+        if slot is None:
+            return None
+        task = self.task_at(slot)
+        self.raw_due.pop(task_id, None)
+        if self.due[slot]:
+            self.due_index[self.status[slot]].discard(self.due[slot], task_id)
+
+        partition = self.tenants.get(task.tenant)
+        if partition is not None:
+            partition.pop(task_id, None)
+            if not partition:
+                del self.tenants[task.tenant]
+
+        # Move the last row into the hole
+        last = len(self.ids) - 1
+        if slot != last:
+            moved_id = self.ids[last]
+            for column in self.columns():
+                column[slot] = column[last]
+            self.slots[moved_id] = slot
+        for column in self.columns():
+            column.pop()
+        return task
+
+    def set_status(self, task_id, status):
+        slot = self.slots.get(task_id)
+        if slot is None:
+            return False
+        code = STATUS_CODES[status]
+        if self.due[slot] and self.status[slot] != code:
+            self.due_index[self.status[slot]].discard(self.due[slot], task_id)
+            self.due_index[code].add(self.due[slot], task_id)
+        self.status[slot] = code
+        return True
+
+    def task(self, task_id):
+        slot = self.slots.get(task_id)
+        return None if slot is None else self.task_at(slot)
+
+    def task_at(self, slot):
+        # Imported here: database imports this module
+        from database import Task
+
+        task_id = self.ids[slot]
+        ordinal = self.due[slot]
+        return Task(
+            self.descriptions[slot],
+            date.fromordinal(ordinal) if ordinal else self.raw_due.get(task_id),
+            STATUSES[self.status[slot]],
+            index=task_id,
+            guild_id=self.guild[slot],
+            owner_id=self.owner[slot],
+        )
+
+    # Sheet row for a task: description, due date, status, guild, owner
+    def row(self, task_id):
+        slot = self.slots[task_id]
+        ordinal = self.due[slot]
+        return [
+            self.descriptions[slot],
+            date.fromordinal(ordinal) if ordinal else self.raw_due.get(task_id),
+            STATUSES[self.status[slot]],
+            self.guild[slot],
+            self.owner[slot],
+        ]
+
+    # Task IDs in insertion order (IDs are handed out monotonically)
+    def ordered_ids(self):
+        return sorted(self.slots)
+
+    def tenant_ids(self, tenant):
+        return self.tenants.get(tenant, {})
+
+    # IDs due between two ordinals (inclusive, either end open), earliest
+    # first, optionally only with one status -- O(log n + k) via the index
+    def due_between(self, due_from=None, due_to=None, status=None):
+        low = 1 if due_from is None else due_from
+        high = MAX_ORDINAL if due_to is None else due_to
+        if status is not None:
+            return self.due_index[STATUS_CODES[status]].between(low, high)
+        matches = []
+        for index in self.due_index:
+            matches.extend(index.between(low, high))
+        matches.sort(key=lambda task_id: self.due[self.slots[task_id]])
+        return matches
+
+    # IDs matching a status and/or an inclusive due-date range (ordinals),
+    # in ID order. `task_ids` narrows the scan to e.g. one tenant's partition.
+    def select(self, status=None, due_from=None, due_to=None, task_ids=None):
+        code = None if status is None else STATUS_CODES[status]
+        dated = due_from is not None or due_to is not None
+        low = 1 if due_from is None else due_from
+        high = MAX_ORDINAL if due_to is None else due_to
+
+        if task_ids is None:
+            ids, codes, dues = self.ids, self.status, self.due
+        else:
+            slots = [self.slots[task_id] for task_id in task_ids]
+            ids = [self.ids[slot] for slot in slots]
+            codes = [self.status[slot] for slot in slots]
+            dues = [self.due[slot] for slot in slots]
+
+        if code is not None and dated:
+            matches = [
+                task_id
+                for task_id, c, d in zip(ids, codes, dues)
+                if c == code and low <= d <= high
+            ]
+        elif code is not None:
+            matches = [task_id for task_id, c in zip(ids, codes) if c == code]
+        elif dated:
+            matches = [task_id for task_id, d in zip(ids, dues) if low <= d <= high]
+        else:
+            matches = list(ids)
+
+        if task_ids is None:
+            matches.sort()
+        return matches
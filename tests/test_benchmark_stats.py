@@ -0,0 +1,22 @@
+from benchmarks.loadtest import percentiles
+from benchmarks.run import percentile, summarize
+
+
+def test_percentile_is_nearest_rank():
+    samples = list(range(1, 101))
+    assert percentile(samples, 0.5) == 50
+    assert percentile(samples, 0.95) == 95
+    assert percentile(samples, 1.0) == 100
+    assert percentile([7], 0.99) == 7
+
+
+def test_p95_never_below_median_for_few_runs():
+    for runs in range(1, 12):
+        result = summarize([0.001 * (run + 1) for run in range(runs)])
+        assert result["median_ms"] <= result["p95_ms"] <= result["max_ms"]
+
+
+def test_load_test_uses_the_same_percentiles():
+    samples = [0.004, 0.001, 0.003, 0.002]
+    assert percentiles(samples)["p50_ms"] == round(percentile(sorted(samples), 0.5) * 1000, 3)
+    assert percentiles(samples)["p99_ms"] == 4.0
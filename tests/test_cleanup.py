@@ -0,0 +1,68 @@
+from datetime import date, timedelta
+import asyncio
+
+from archive import TaskArchive
+from async_store import AsyncTaskStore
+from benchmarks.fakes import FakeBot
+from database import Task
+from reminder import Reminder
+from sqlite_handler import SQLiteHandler
+
+TENANT = (1, 1001)
+
+
+class OneGuildPartition:
+
+    def __init__(self, guild_id):
+        self.guild_id = guild_id
+
+    def assigned(self, guild_id):
+        return guild_id == self.guild_id
+
+    owns = assigned
+
+
+def run_cleanup(tmp_path, tasks, partition=None):
+    async def run():
+        archive = TaskArchive(str(tmp_path / "archive.jsonl.gz"))
+        store = AsyncTaskStore(SQLiteHandler(str(tmp_path / "tasks.db")), archive=archive)
+        try:
+            await store.add_many_tasks(tasks)
+            await Reminder(store, FakeBot(), partition=partition).clean_overdue_tasks()
+            remaining = await store.get_tasks()
+        finally:
+            store.shutdown()
+        return remaining, archive
+
+    return asyncio.run(run())
+
+
+def test_completed_tasks_are_archived_as_completed(tmp_path):
+    today = date.today()
+    remaining, archive = run_cleanup(
+        tmp_path,
+        [
+            Task("Done early", today + timedelta(days=5), "C", 0, *TENANT),
+            Task("Done late", today - timedelta(days=10), "C", 0, *TENANT),
+            Task("Still to do", today + timedelta(days=5), "P", 0, *TENANT),
+            Task("Forgotten", today - timedelta(days=10), "P", 0, *TENANT),
+        ],
+    )
+    assert [task.description for task in remaining] == ["Still to do"]
+    history, _ = archive.history(TENANT)
+    reasons = {item.task.description: item.reason for item in history}
+    assert reasons == {"Done early": "completed", "Done late": "completed", "Forgotten": "expired"}
+
+
+def test_other_workers_completed_tasks_are_left(tmp_path):
+    today = date.today()
+    remaining, archive = run_cleanup(
+        tmp_path,
+        [
+            Task("Mine", today, "C", 0, 1, 1001),
+            Task("Theirs", today, "C", 0, 2, 1002),
+        ],
+        partition=OneGuildPartition(1),
+    )
+    assert [task.description for task in remaining] == ["Theirs"]
+    assert [item.task.description for item in archive.history((1, 1001))[0]] == ["Mine"]
@@ -0,0 +1,47 @@
+from datetime import date
+import asyncio
+
+import pytest
+
+from benchmarks.fakes import FakeInteraction
+
+
+@pytest.fixture
+def bot_module(tmp_path, monkeypatch):
+    monkeypatch.setenv("TOKEN", "test")
+    monkeypatch.setenv("STORAGE_BACKEND", "sqlite")
+    monkeypatch.setenv("DATABASE_FILE", str(tmp_path / "tasks.db"))
+    import main
+
+    monkeypatch.setattr(main, "READY_TIMEOUT", 0.05)
+    return main
+
+
+def test_date_options(bot_module):
+    async def run():
+        good = FakeInteraction(1001)
+        dates = await bot_module.date_options(good, "2026-10-18", None)
+        bad = FakeInteraction(1001)
+        rejected = await bot_module.date_options(bad, "2026-10-18", "someday")
+        return dates, good.reply, rejected, bad.reply
+
+    dates, good_reply, rejected, bad_reply = asyncio.run(run())
+    assert dates == [date(2026, 10, 18), None]
+    assert good_reply is None
+    assert rejected is None
+    assert "Invalid date format" in str(bad_reply)
+
+
+def test_store_ready_waits_on_the_given_event(bot_module):
+    async def run():
+        loaded = asyncio.Event()
+        waiting = FakeInteraction(1001)
+        before = await bot_module.store_ready(waiting, loaded)
+        loaded.set()
+        ready = FakeInteraction(1001)
+        after = await bot_module.store_ready(ready, loaded)
+        return before, waiting.reply, after, ready.reply
+
+    before, waiting_reply, after, ready_reply = asyncio.run(run())
+    assert not before and "still loading" in str(waiting_reply)
+    assert after and ready_reply is None
@@ -0,0 +1,60 @@
+import asyncio
+
+import discord
+
+from delivery import DeliveryQueue
+
+
+class FakeResponse:
+
+    def __init__(self, status, headers):
+        self.status = status
+        self.reason = "Too Many Requests"
+        self.headers = headers
+
+
+def rate_limited(headers):
+    return discord.HTTPException(FakeResponse(429, headers), {"message": "rate limited"})
+
+
+# DM channel that fails its first send with `error`
+class FlakyChannel:
+
+    def __init__(self, error):
+        self.error = error
+        self.sent = []
+
+    async def send(self, text):
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+        self.sent.append(text)
+
+
+def run_send(headers):
+    async def run():
+        queue = DeliveryQueue(bot=None, channel_rate=100, base_delay=0.01)
+        channel = FlakyChannel(rate_limited(headers))
+        queue.channels[1001] = channel
+        penalized = []
+        original = queue.global_bucket.penalize
+        queue.global_bucket.penalize = lambda retry_after: (
+            penalized.append(retry_after),
+            original(retry_after),
+        )
+        assert await queue.send_with_retry(1001, "reminder")
+        return channel.sent, penalized
+
+    return asyncio.run(run())
+
+
+def test_global_rate_limit_pauses_global_bucket():
+    sent, penalized = run_send({"Retry-After": "0.05", "X-RateLimit-Global": "true"})
+    assert sent == ["reminder"]
+    assert penalized == [0.05]
+
+
+def test_channel_rate_limit_leaves_global_bucket():
+    sent, penalized = run_send({"Retry-After": "0.05", "X-RateLimit-Scope": "user"})
+    assert sent == ["reminder"]
+    assert penalized == []
@@ -0,0 +1,47 @@
+from datetime import date
+import os
+
+import database
+from database import ExcelHandler, Task
+
+
+def test_flush_syncs_snapshot_before_dropping_journal(tmp_path, monkeypatch):
+    file_name = str(tmp_path / "database.xlsx")
+    handler = ExcelHandler(file_name, flush_interval=3600, flush_threshold=10**6)
+    handler.setup()
+    handler.add_tasks(Task("Write report", date.today(), "P", 0, 1, 1001))
+
+    events = []
+    real_fsync, real_replace = os.fsync, os.replace
+    real_discard = handler.journal.discard_rotated
+
+    def fsync(descriptor):
+        events.append("fsync")
+        real_fsync(descriptor)
+
+    def replace(source, target):
+        events.append(("replace", os.path.basename(target)))
+        real_replace(source, target)
+
+    def discard_rotated():
+        events.append("discard")
+        real_discard()
+
+    monkeypatch.setattr(os, "fsync", fsync)
+    monkeypatch.setattr(os, "replace", replace)
+    monkeypatch.setattr(database, "fsync_directory", lambda name: events.append("fsync dir"))
+    monkeypatch.setattr(handler.journal, "discard_rotated", discard_rotated)
+    assert handler.flush()
+    monkeypatch.undo()
+    handler.close()
+
+    swap = events.index(("replace", "database.xlsx"))
+    assert events[swap - 1] == "fsync"
+    assert events[swap + 1 : swap + 3] == ["fsync dir", "discard"]
+
+    reopened = ExcelHandler(file_name)
+    reopened.setup()
+    try:
+        assert [task.description for task in reopened.get_tasks()] == ["Write report"]
+    finally:
+        reopened.close()
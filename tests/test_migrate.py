@@ -0,0 +1,113 @@
+from datetime import date, timedelta
+
+from database import ExcelHandler, Task
+from journal import Journal
+from migrate import migrate
+from sqlite_handler import SQLiteHandler
+
+TENANT = (1, 1001)
+
+
+def make_workbook(file_name, count):
+    handler = ExcelHandler(file_name)
+    handler.setup()
+    stored = handler.add_many_tasks(
+        [
+            Task(f"flushed {number}", date.today(), "P", guild_id=TENANT[0], owner_id=TENANT[1])
+            for number in range(count)
+        ]
+    )
+    handler.close()
+    return stored
+
+
+# Leaves records in the journal without a flush, as if the bot had crashed
+def journal_tasks(file_name, first_id, count):
+    journal = Journal(file_name + ".journal")
+    journal.append_many(
+        [
+            ExcelHandler.add_record(
+                Task(
+                    f"journaled {number}",
+                    date.today() + timedelta(days=1),
+                    "P",
+                    first_id + number,
+                    *TENANT,
+                )
+            )
+            for number in range(count)
+        ]
+    )
+    journal.close()
+
+
+def read_sqlite(file_name):
+    store = SQLiteHandler(file_name)
+    store.setup()
+    try:
+        return store.get_tasks()
+    finally:
+        store.close()
+
+
+def test_migrate_replays_unflushed_journal(tmp_path):
+    excel_file = str(tmp_path / "database.xlsx")
+    sqlite_file = str(tmp_path / "database.db")
+    make_workbook(excel_file, 3)
+    journal_tasks(excel_file, 4, 5)
+
+    assert migrate(excel_file, sqlite_file, default_tenant=(0, 0)) == 8
+    tasks = read_sqlite(sqlite_file)
+    assert [task.index for task in tasks] == list(range(1, 9))
+    assert {task.description for task in tasks if task.description.startswith("journaled")} == {
+        f"journaled {number}" for number in range(5)
+    }
+    assert all(task.tenant == TENANT for task in tasks)
+
+
+def test_migrate_replays_journaled_deletes(tmp_path):
+    excel_file = str(tmp_path / "database.xlsx")
+    sqlite_file = str(tmp_path / "database.db")
+    stored = make_workbook(excel_file, 3)
+    journal = Journal(excel_file + ".journal")
+    journal.append_many(
+        [
+            ExcelHandler.delete_record(stored[0].index),
+            ExcelHandler.status_record(stored[1].index, "C"),
+        ]
+    )
+    journal.close()
+
+    assert migrate(excel_file, sqlite_file, default_tenant=(0, 0)) == 2
+    tasks = {task.index: task for task in read_sqlite(sqlite_file)}
+    assert stored[0].index not in tasks
+    assert tasks[stored[1].index].status == "C"
+
+
+def test_migrate_keeps_id_counter(tmp_path):
+    excel_file = str(tmp_path / "database.xlsx")
+    sqlite_file = str(tmp_path / "database.db")
+    stored = make_workbook(excel_file, 3)
+    handler = ExcelHandler(excel_file)
+    handler.setup()
+    handler.delete_task(stored[-1].index)  # the highest ID is gone, not forgotten
+    handler.close()
+
+    assert migrate(excel_file, sqlite_file, default_tenant=(0, 0)) == 2
+    store = SQLiteHandler(sqlite_file)
+    store.setup()
+    try:
+        added = store.add_tasks(Task("after migration", date.today(), "P", 0, *TENANT))
+    finally:
+        store.close()
+    assert added.index == stored[-1].index + 1
+
+
+def test_migrate_refuses_second_import(tmp_path):
+    excel_file = str(tmp_path / "database.xlsx")
+    sqlite_file = str(tmp_path / "database.db")
+    make_workbook(excel_file, 2)
+
+    assert migrate(excel_file, sqlite_file, default_tenant=(0, 0)) == 2
+    assert migrate(excel_file, sqlite_file, default_tenant=(0, 0)) == 0
+    assert len(read_sqlite(sqlite_file)) == 2
@@ -0,0 +1,57 @@
+from datetime import date
+import asyncio
+
+from database import Task
+from pages import PageCache, PageFilter
+
+TENANT = (1, 1001)
+
+
+# get_page reads the tasks at once but only returns when `gate` is set
+class SlowStore:
+
+    def __init__(self):
+        self.tasks = []
+        self.gate = None
+
+    async def get_page(self, guild_id, owner_id, offset, limit, *filters):
+        tasks = list(self.tasks)
+        if self.gate is not None:
+            await self.gate.wait()
+        return tasks[offset : offset + limit], len(tasks)
+
+
+def test_page_read_during_invalidation_is_not_cached():
+    async def run():
+        store = SlowStore()
+        cache = PageCache(store)
+        store.gate = asyncio.Event()
+        reading = asyncio.create_task(cache.get(TENANT, PageFilter(), 1))
+        await asyncio.sleep(0)
+
+        store.tasks.append(Task("Write report", date.today(), "P", 1, *TENANT))
+        cache.invalidate(TENANT)
+        store.gate.set()
+        stale, _ = await reading
+        store.gate = None
+        fresh, _ = await cache.get(TENANT, PageFilter(), 1)
+        return stale, fresh
+
+    stale, fresh = asyncio.run(run())
+    assert stale == "No tasks found."
+    assert "Write report" in fresh
+
+
+def test_other_tenants_invalidation_keeps_page_cached():
+    async def run():
+        store = SlowStore()
+        cache = PageCache(store)
+        store.gate = asyncio.Event()
+        reading = asyncio.create_task(cache.get(TENANT, PageFilter(), 1))
+        await asyncio.sleep(0)
+        cache.invalidate((1, 2002))
+        store.gate.set()
+        await reading
+        return cache.pages
+
+    assert len(asyncio.run(run())) == 1
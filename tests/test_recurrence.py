@@ -0,0 +1,237 @@
+from datetime import date, timedelta
+import asyncio
+
+import pytest
+
+from async_store import AsyncTaskStore
+from recurrence import MAX_PER_PASS, RecurrenceManager, RecurrenceStore, add_months, parse_rule
+from sqlite_handler import SQLiteHandler
+
+TENANT = (1, 1001)
+MONDAY = date(2026, 10, 12)
+
+
+def first(rule, start, count, after=None):
+    occurrences = parse_rule(rule).occurrences(start, after)
+    return [next(occurrences) for _ in range(count)]
+
+
+def days(start, *offsets):
+    return [start + timedelta(days=offset) for offset in offsets]
+
+
+# Rule frequencies
+
+
+def test_daily():
+    assert first("daily", MONDAY, 3) == days(MONDAY, 0, 1, 2)
+
+
+def test_every_n_days():
+    assert first("every 3 days", MONDAY, 3) == days(MONDAY, 0, 3, 6)
+    assert first("every 3 days", MONDAY, 2, after=MONDAY + timedelta(days=4)) == days(
+        MONDAY, 6, 9
+    )
+
+
+def test_weekly():
+    assert first("weekly", MONDAY, 3) == days(MONDAY, 0, 7, 14)
+
+
+def test_every_n_weeks():
+    assert first("every 2 weeks", MONDAY, 3) == days(MONDAY, 0, 14, 28)
+    assert first("every 2 weeks", MONDAY, 1, after=MONDAY + timedelta(days=1)) == days(
+        MONDAY, 14
+    )
+
+
+def test_weekly_on_days():
+    # Starts on a Wednesday: the Monday of that week is already past
+    wednesday = MONDAY + timedelta(days=2)
+    assert first("weekly on mon,thu", wednesday, 4) == days(MONDAY, 3, 7, 10, 14)
+
+
+def test_every_n_weeks_on_days():
+    assert first("every 2 weeks on tue,fri", MONDAY, 4) == days(MONDAY, 1, 4, 15, 18)
+    assert first(
+        "every 2 weeks on tue,fri", MONDAY, 2, after=MONDAY + timedelta(days=5)
+    ) == days(MONDAY, 15, 18)
+
+
+def test_weekdays():
+    saturday = MONDAY + timedelta(days=5)
+    assert first("weekdays", saturday, 6) == days(MONDAY, 7, 8, 9, 10, 11, 14)
+
+
+def test_monthly():
+    start = date(2026, 1, 15)
+    assert first("monthly", start, 3) == [date(2026, 1, 15), date(2026, 2, 15), date(2026, 3, 15)]
+    assert first("monthly", start, 1, after=date(2026, 6, 16)) == [date(2026, 7, 15)]
+
+
+def test_monthly_clamps_to_month_end():
+    start = date(2026, 1, 31)
+    assert first("monthly", start, 4) == [
+        date(2026, 1, 31),
+        date(2026, 2, 28),
+        date(2026, 3, 31),
+        date(2026, 4, 30),
+    ]
+    assert add_months(date(2027, 12, 31), 2) == date(2028, 2, 29)
+
+
+def test_every_n_months():
+    start = date(2026, 11, 30)
+    assert first("every 3 months", start, 3) == [
+        date(2026, 11, 30),
+        date(2027, 2, 28),
+        date(2027, 5, 30),
+    ]
+    assert first("every 3 months", start, 1, after=date(2027, 3, 1)) == [date(2027, 5, 30)]
+
+
+def test_rule_text_round_trips():
+    for text in ["daily", "weekly", "monthly", "every 2 weeks", "weekly on mon,thu", "every 3 months"]:
+        assert str(parse_rule(text)) == text
+    assert str(parse_rule("weekdays")) == "weekly on mon,tue,wed,thu,fri"
+    assert str(parse_rule(" Every  1 DAY ")) == "daily"
+
+
+@pytest.mark.parametrize(
+    "text", ["hourly", "every 0 days", "every 400 days", "daily on mon", "weekly on funday"]
+)
+def test_invalid_rules(text):
+    with pytest.raises(ValueError):
+        parse_rule(text)
+
+
+# Materialization
+
+
+class Harness:
+
+    def __init__(self, tmp_path):
+        self.db_name = str(tmp_path / "tasks.db")
+        self.file_name = str(tmp_path / "recurring.json")
+
+    # A fresh store and manager, as after a restart
+    def manager(self):
+        store = AsyncTaskStore(SQLiteHandler(self.db_name))
+        return store, RecurrenceManager(store, RecurrenceStore(self.file_name))
+
+    def add(self, rule, start, until=None):
+        definitions = RecurrenceStore(self.file_name)
+        return definitions.modify(
+            definitions.add, "Water plants", parse_rule(rule), start, *TENANT, until
+        )
+
+    def materialize(self, today):
+        async def run():
+            store, manager = self.manager()
+            try:
+                await manager.materialize(today)
+                return await store.get_tasks(*TENANT)
+            finally:
+                store.shutdown()
+
+        return sorted(task.due for task in asyncio.run(run()))
+
+
+@pytest.fixture
+def harness(tmp_path):
+    return Harness(tmp_path)
+
+
+def test_horizon_includes_its_last_day(harness):
+    harness.add("daily", MONDAY)
+    assert harness.materialize(MONDAY) == days(MONDAY, *range(8))
+
+
+def test_occurrence_past_horizon_waits(harness):
+    harness.add("every 8 days", MONDAY)
+    assert harness.materialize(MONDAY) == [MONDAY]
+    assert harness.materialize(MONDAY + timedelta(days=1)) == days(MONDAY, 0, 8)
+
+
+def test_future_start_is_not_created_early(harness):
+    harness.add("weekly", MONDAY + timedelta(days=10))
+    assert harness.materialize(MONDAY) == []
+    assert harness.materialize(MONDAY + timedelta(days=3)) == days(MONDAY, 10)
+
+
+def test_restart_does_not_duplicate(harness):
+    harness.add("daily", MONDAY)
+    first_pass = harness.materialize(MONDAY)
+    assert harness.materialize(MONDAY) == first_pass
+    # A day later only the day that entered the window is added
+    assert harness.materialize(MONDAY + timedelta(days=1)) == days(MONDAY, *range(9))
+
+
+def test_window_advance_after_downtime_skips_missed_days(harness):
+    harness.add("daily", MONDAY)
+    harness.materialize(MONDAY)
+    later = MONDAY + timedelta(days=20)
+    created = harness.materialize(later)
+    assert created == days(MONDAY, *range(8)) + days(later, *range(8))
+
+
+def test_until_ends_the_series(harness):
+    harness.add("daily", MONDAY, until=MONDAY + timedelta(days=2))
+    assert harness.materialize(MONDAY) == days(MONDAY, 0, 1, 2)
+    assert harness.materialize(MONDAY + timedelta(days=5)) == days(MONDAY, 0, 1, 2)
+
+
+def test_materialized_until_is_saved(harness):
+    recurrence = harness.add("weekly", MONDAY)
+    harness.materialize(MONDAY)
+    definitions = RecurrenceStore(harness.file_name)
+    definitions.load()
+    assert definitions.recurrences[recurrence.id].materialized_until == MONDAY + timedelta(days=7)
+
+
+def test_pass_is_capped_and_resumes(tmp_path):
+    store = RecurrenceStore(str(tmp_path / "recurring.json"))
+    store.add("Stretch", parse_rule("daily"), MONDAY, *TENANT)
+    manager = RecurrenceManager(None, store, horizon_days=MAX_PER_PASS + 9)
+
+    new_tasks, materialized = manager.plan(MONDAY)
+    assert len(new_tasks) == MAX_PER_PASS
+    assert materialized[1] == MONDAY + timedelta(days=MAX_PER_PASS - 1)
+
+    store.advance(materialized)
+    new_tasks, materialized = manager.plan(MONDAY)
+    assert [task.due for task in new_tasks] == days(MONDAY, *range(MAX_PER_PASS, MAX_PER_PASS + 10))
+
+
+def test_other_shards_are_left_alone(tmp_path):
+    store = RecurrenceStore(str(tmp_path / "recurring.json"))
+    store.add("Mine", parse_rule("daily"), MONDAY, 1, 1001)
+    store.add("Theirs", parse_rule("daily"), MONDAY, 2, 1002)
+    manager = RecurrenceManager(None, store, owns=lambda guild_id: guild_id == 1)
+    new_tasks, materialized = manager.plan(MONDAY)
+    assert {task.description for task in new_tasks} == {"Mine"}
+    assert list(materialized) == [1]
+
+
+def test_unreadable_file_is_retried(harness, monkeypatch):
+    import recurrence
+
+    monkeypatch.setattr(recurrence, "LOAD_RETRY", 0.01)
+    with open(harness.file_name, "w", encoding="utf-8") as recurrence_file:
+        recurrence_file.write('{"next_id": 2, "recurrences": [')  # torn write
+
+    async def run():
+        store, manager = harness.manager()
+        runner = manager.start()
+        try:
+            await asyncio.sleep(0.1)
+            assert not manager.loaded.is_set()
+            assert not runner.done()
+            with open(harness.file_name, "w", encoding="utf-8") as recurrence_file:
+                recurrence_file.write('{"next_id": 1, "recurrences": []}')
+            await asyncio.wait_for(manager.loaded.wait(), 1)
+        finally:
+            runner.cancel()
+            store.shutdown()
+
+    asyncio.run(run())
@@ -0,0 +1,31 @@
+import asyncio
+
+from async_store import AsyncTaskStore
+from benchmarks.fakes import FakeBot
+from reminder import Reminder
+from sqlite_handler import SQLiteHandler
+
+
+def test_start_runs_the_loops_once(tmp_path):
+    async def run():
+        store = AsyncTaskStore(SQLiteHandler(str(tmp_path / "tasks.db")))
+        reminder = Reminder(store, FakeBot())
+        before = len(asyncio.all_tasks())
+        first = reminder.start()
+        await asyncio.sleep(0.1)
+        started = len(asyncio.all_tasks()) - before
+        wakeup = reminder.scheduler.wakeup
+
+        # on_ready again, as after a gateway reconnect
+        assert reminder.start() is first
+        await asyncio.sleep(0.1)
+        try:
+            return started, len(asyncio.all_tasks()) - before, wakeup is reminder.scheduler.wakeup
+        finally:
+            for task in asyncio.all_tasks() - {asyncio.current_task()}:
+                task.cancel()
+            store.shutdown()
+
+    started, running, same_wakeup = asyncio.run(run())
+    assert running == started
+    assert same_wakeup
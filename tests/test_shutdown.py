@@ -0,0 +1,67 @@
+import asyncio
+import os
+
+import pytest
+
+from async_store import AsyncTaskStore
+from benchmarks.fakes import FakeBot
+from delivery import DeliveryQueue
+from sqlite_handler import SQLiteHandler
+
+
+@pytest.fixture
+def bot_module(tmp_path, monkeypatch):
+    monkeypatch.setenv("TOKEN", "test")
+    monkeypatch.setenv("STORAGE_BACKEND", "sqlite")
+    monkeypatch.setenv("DATABASE_FILE", str(tmp_path / "tasks.db"))
+    import main
+
+    return main
+
+
+class FakePartition:
+
+    def __init__(self, events):
+        self.events = events
+        self.runner = None
+
+    def release(self):
+        self.events.append("released")
+
+
+def test_shut_down_releases_leases_then_drains_reminders(bot_module, tmp_path, monkeypatch):
+    events = []
+    bot = FakeBot()
+
+    async def run():
+        store = AsyncTaskStore(SQLiteHandler(str(tmp_path / "tasks.db")))
+        partition = FakePartition(events)
+        partition.runner = asyncio.create_task(asyncio.sleep(3600))
+        delivery = DeliveryQueue(bot)
+        monkeypatch.setattr(bot_module, "store", store)
+        monkeypatch.setattr(bot_module, "partition", partition)
+        monkeypatch.setattr(bot_module.reminder, "delivery", delivery)
+
+        delivery.start()
+        for user_id in range(1000, 1010):
+            delivery.enqueue(user_id, "📌 reminder")
+        try:
+            await bot_module.shut_down()
+            await asyncio.sleep(0)
+            return partition.runner.cancelled()
+        finally:
+            await delivery.stop()
+            store.shutdown()
+
+    assert asyncio.run(run())
+    assert events == ["released"]
+    assert sorted(bot.sent()) == list(range(1000, 1010))
+
+
+def test_drain_gives_up_after_timeout():
+    async def run():
+        delivery = DeliveryQueue(FakeBot())  # workers never started
+        delivery.enqueue(1001, "📌 reminder")
+        return await delivery.drain(0.2)
+
+    assert asyncio.run(run()) == 1
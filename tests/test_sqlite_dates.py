@@ -0,0 +1,42 @@
+from datetime import date, timedelta
+
+from sqlite_handler import SQLiteHandler
+
+
+def open_with_rows(file_name, due_dates):
+    store = SQLiteHandler(file_name)
+    store.setup()
+    with store.connection:
+        store.connection.executemany(
+            "INSERT INTO tasks (description, due_date, status) VALUES (?, ?, 'P')",
+            [(f"task {number}", due) for number, due in enumerate(due_dates)],
+        )
+    store.close()
+    store = SQLiteHandler(file_name)
+    store.setup()
+    return store
+
+
+def test_legacy_dates_are_converted_to_iso(tmp_path):
+    later = date.today() + timedelta(days=30)
+    store = open_with_rows(str(tmp_path / "tasks.db"), [later.strftime("%d-%B-%Y")])
+    try:
+        stored = store.connection.execute("SELECT due_date FROM tasks").fetchone()[0]
+        assert stored == later.isoformat()
+        assert [task.due for task in store.iter_tasks(due_from=date.today())] == [later]
+    finally:
+        store.close()
+
+
+def test_unreadable_dates_stay_out_of_ranges(tmp_path):
+    today = date.today()
+    store = open_with_rows(str(tmp_path / "tasks.db"), ["some day", today.isoformat()])
+    try:
+        overdue = list(store.iter_tasks(due_to=today - timedelta(days=4)))
+        assert overdue == []
+        assert [task.due for task in store.iter_tasks(due_to=today)] == [today]
+        assert [task.due for task in store.get_due_between(due_to=today)] == [today]
+        assert store.get_page(0, 0, 0, 10, due_to=today)[1] == 1
+        assert len(store.get_tasks()) == 2
+    finally:
+        store.close()
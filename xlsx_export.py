@@ -0,0 +1,173 @@
+from datetime import date
+from xml.sax.saxutils import escape
+import io
+import re
+import zipfile
+
+# Minimal XLSX writer for the task sheet.
+#
+# The "Pending" sheet body is kept as pre-serialized XML, one chunk per
+# CHUNK_ROWS task IDs. After a change only the chunks holding changed IDs
+# are rebuilt; the rest are reused byte for byte, and saving is joining the
+# chunks and zipping. Rows carry no "r" attribute (it's optional), so a
+# chunk doesn't depend on how many rows come before it. Strings are written
+# inline and dates as serial numbers with a date style, which Excel and
+# openpyxl both read back as dates.
+
+CHUNK_ROWS = 1000  # task IDs per chunk
+COMPRESS_LEVEL = 1  # deflate level: the sheet is mostly repeated markup
+EXCEL_EPOCH = date(1899, 12, 30).toordinal()
+DATE_STYLE = 1  # index into cellXfs below
+INVALID_XML = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>
+<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>
+<Override PartName="/xl/worksheets/sheet2.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>
+<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>
+</Types>"""
+
+ROOT_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>
+</Relationships>"""
+
+WORKBOOK = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">
+<sheets>
+<sheet name="Pending" sheetId="1" r:id="rId1"/>
+<sheet name="Meta" sheetId="2" state="hidden" r:id="rId2"/>
+</sheets>
+</workbook>"""
+
+WORKBOOK_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>
+<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet2.xml"/>
+<Relationship Id="rId3" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>
+</Relationships>"""
+
+STYLES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">
+<numFmts count="1"><numFmt numFmtId="164" formatCode="dd\\-mmmm\\-yyyy"/></numFmts>
+<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>
+<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>
+<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>
+<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>
+<cellXfs count="2">
+<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>
+<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>
+</cellXfs>
+<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>
+</styleSheet>"""
+
+SHEET_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    "<sheetData>"
+)
+SHEET_END = "</sheetData></worksheet>"
+
+
+def cell_xml(value):
+    if value is None:
+        return "<c/>"
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f"<c><v>{value}</v></c>"
+    if isinstance(value, date):
+        return f'<c s="{DATE_STYLE}"><v>{value.toordinal() - EXCEL_EPOCH}</v></c>'
+    text = escape(INVALID_XML.sub("", str(value)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def row_xml(values):
+    return "<row>" + "".join(cell_xml(value) for value in values) + "</row>"
+
+
+def sheet_xml(body_parts):
+    return SHEET_START + "".join(body_parts) + SHEET_END
+
+
+# Writes the whole workbook: the "Pending" sheet from pre-serialized row XML
+# and the hidden "Meta" sheet holding the ID counter. `target` is a file
+# name or a binary file object.
+def save(target, header, body_parts, next_id):
+    with zipfile.ZipFile(
+        target, "w", zipfile.ZIP_DEFLATED, compresslevel=COMPRESS_LEVEL
+    ) as archive:
+        archive.writestr("[Content_Types].xml", CONTENT_TYPES)
+        archive.writestr("_rels/.rels", ROOT_RELS)
+        archive.writestr("xl/workbook.xml", WORKBOOK)
+        archive.writestr("xl/_rels/workbook.xml.rels", WORKBOOK_RELS)
+        archive.writestr("xl/styles.xml", STYLES)
+        archive.writestr(
+            "xl/worksheets/sheet1.xml", sheet_xml([row_xml(header), *body_parts])
+        )
+        archive.writestr(
+            "xl/worksheets/sheet2.xml", sheet_xml([row_xml(["next_id", next_id])])
+        )
+
+
+# One-off workbook from a list of rows (exports, new files)
+def save_rows(target, header, rows, next_id):
+    save(target, header, [row_xml(row) for row in rows], next_id)
+
+
+# Workbook bytes holding just the given tasks (on-demand exports)
+def export_tasks(tasks, header):
+    rows = [
+        [task.description, task.due, task.status, task.index, task.guild_id, task.owner_id]
+        for task in tasks
+    ]
+    buffer = io.BytesIO()
+    save_rows(buffer, header, rows, max((task.index for task in tasks), default=0) + 1)
+    return buffer.getvalue()
+
+
+# The task sheet, serialized in chunks of task IDs
+class ChunkedSheet:
+
+    def __init__(self, chunk_rows=CHUNK_ROWS):
+        self.chunk_rows = chunk_rows
+        self.chunks = {}  # chunk number -> XML of its rows
+        self.built = False
+
+    def chunk_of(self, task_id):
+        return task_id // self.chunk_rows
+
+    # Re-serializes the chunks holding `changed` task IDs from `table`
+    # (a TaskTable); everything when `changed` is None or nothing is built
+    # yet. Returns how many chunks were rebuilt.
+    def update(self, table, changed=None):
+        if changed is None or not self.built:
+            self.chunks = {}
+            dirty = {self.chunk_of(task_id) for task_id in table.slots}
+            self.built = True
+        else:
+            dirty = {self.chunk_of(task_id) for task_id in changed}
+
+        for chunk in dirty:
+            first = chunk * self.chunk_rows
+            rows = []
+            for task_id in range(first, first + self.chunk_rows):
+                if task_id in table.slots:
+                    row = table.row(task_id)
+                    rows.append(row_xml(row[:3] + [task_id] + row[3:]))
+            if rows:
+                self.chunks[chunk] = "".join(rows)
+            else:
+                self.chunks.pop(chunk, None)
+        return len(dirty)
+
+    # Drops everything so the next update rebuilds the whole sheet
+    def reset(self):
+        self.chunks = {}
+        self.built = False
+
+    def save(self, target, header, next_id):
+        save(target, header, [self.chunks[chunk] for chunk in sorted(self.chunks)], next_id)